@@ -0,0 +1,113 @@
+"""
+bench_culling.py - Frustum culling and picking with the mesh BVH, and frame time with culling on and off
+
+The CPU part sorts a large grid mesh spatially, builds its BVH, then, for
+cameras framing the whole mesh and zoomed in on it, times culling, reports
+the share of triangles left to draw, and times a pick through the pane
+centre. The GPU part renders the same views uncapped with culling on and
+off; it needs a Vulkan driver, an X11 display and compiled shaders
+(vulkan/shaders/build_shaders.py). Without a GPU use lavapipe:
+
+    VK_ICD_FILENAMES=/usr/share/vulkan/icd.d/lvp_icd.x86_64.json \
+        python3 benchmarks/bench_culling.py [triangles]
+
+Pass --cpu to skip the GPU part.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_mesh_upload import grid_mesh, run_for
+from mesh.bvh import MeshBVH, spatial_order
+from vulkan.camera import Camera
+
+TRIANGLES = 10_000_000
+# Zoom steps (mouse wheel notches) towards the mesh from the framing view
+ZOOMS = (0, 8, 16, 24)
+ASPECT = 16 / 9
+REPEATS = 20
+SECONDS = 2.0
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def cameras(bvh):
+    """(zoom, camera) looking down at the mesh at an angle, closer with each zoom."""
+    views = []
+    for steps in ZOOMS:
+        camera = Camera(pitch=45.0)
+        camera.frame(*bvh.bounds())
+        camera.zoom(steps)
+        views.append((steps, camera))
+    return views
+
+def bench_cpu(positions, triangles):
+    sort, (positions, triangles) = timed(spatial_order, positions, triangles)
+    build, bvh = timed(MeshBVH, positions, triangles)
+    print(f"{len(triangles)} triangles: spatial sort {sort:.2f} s, BVH build {build:.2f} s, "
+          f"{bvh.chunk_count} chunks of {bvh.chunk_triangles}")
+    print(f"{'zoom':>5} {'cull ms':>8} {'chunks':>7} {'draws':>6} {'visible %':>10} {'pick ms':>8}")
+    for steps, camera in cameras(bvh):
+        planes = camera.frustum_planes(ASPECT)
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            commands = bvh.draw_commands(bvh.cull(planes))
+        cull = (time.perf_counter() - start) / REPEATS
+        visible = int(commands["index_count"].sum()) // 3
+        pick, _ = timed(bvh.pick, *camera.ray(ASPECT, 0.5, 0.5))
+        print(f"{steps:>5} {cull * 1000:>8.2f} {int(bvh.cull(planes).sum()):>7} {len(commands):>6} "
+              f"{visible / len(triangles) * 100:>10.1f} {pick * 1000:>8.2f}")
+    return positions, triangles, bvh
+
+def bench_gpu(positions, triangles, bvh):
+    from PySide6.QtWidgets import QApplication
+    from vulkan.geometry import Mesh
+    from vulkan.vulkan_widget import VulkanWidget
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = VulkanWidget()
+    widget.resize(1280, 720)
+    widget.show()
+    deadline = time.perf_counter() + 30
+    while not widget.initialized and not widget.init_error and time.perf_counter() < deadline:
+        app.processEvents()
+    if not widget.initialized:
+        print("Vulkan did not initialize:", widget.init_error or "timed out")
+        return 1
+    widget.set_uncapped(True)
+    mesh = Mesh(widget.context, positions, triangles, bvh=bvh)
+    widget.set_meshes([mesh], frame=False)
+    print(f"multiDrawIndirect: {'yes' if widget.context.multi_draw_indirect else 'no'}")
+    print(f"{'zoom':>5} {'culling':>8} {'triangles':>11} {'fps':>7} {'ms/frame':>9}")
+    for steps, camera in cameras(bvh):
+        widget.cameras[0].copy_from(camera)
+        for culling in (False, True):
+            widget.set_culling(culling)
+            run_for(app, 0.5)
+            widget.reset_frame_stats()
+            run_for(app, SECONDS)
+            frames = widget.frame_stats()
+            print(f"{steps:>5} {'on' if culling else 'off':>8} {frames['triangles']:>11} "
+                  f"{frames['rendered'] / SECONDS:>7.1f} {frames['frame_ms']:>9.2f}")
+    widget.set_meshes([])
+    mesh.destroy()
+    return 0
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--cpu"]
+    positions, indices = grid_mesh(int(args[0]) if args else TRIANGLES)
+    positions, triangles, bvh = bench_cpu(positions, indices.reshape(-1, 3))
+    if "--cpu" in sys.argv:
+        return 0
+    print()
+    return bench_gpu(positions, triangles, bvh)
+
+if __name__ == "__main__":
+    sys.exit(main())
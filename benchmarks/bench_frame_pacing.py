@@ -0,0 +1,64 @@
+"""
+bench_frame_pacing.py - Frame pacing accuracy of the old 16 ms QTimer and FramePacer
+
+Measures the achieved rate and the spread of frame intervals while the
+event loop also handles simulated work. Rendering is not involved, so this
+runs without a Vulkan driver.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_frame_pacing.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+from vulkan.frame_pacer import FramePacer
+
+SECONDS = 3.0
+# Simulated per-frame work on the GUI thread (seconds)
+FRAME_WORK = 0.004
+
+def measure(app, source, connect):
+    """Run the event loop, recording when ``source`` delivers frames."""
+    stamps = []
+
+    def on_frame():
+        stamps.append(time.perf_counter())
+        end = stamps[-1] + FRAME_WORK
+        while time.perf_counter() < end:
+            pass
+
+    connect(on_frame)
+    end = time.perf_counter() + SECONDS
+    while time.perf_counter() < end:
+        app.processEvents()
+    source.stop()
+    intervals = [(b - a) * 1000 for a, b in zip(stamps, stamps[1:])]
+    return len(stamps) / SECONDS, statistics.mean(intervals), statistics.pstdev(intervals), max(intervals)
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    print(f"{'source':<30} {'target':>7} {'fps':>7} {'mean ms':>8} {'stdev ms':>9} {'max ms':>7}")
+    results = []
+    for fps in (60, 120, 144):
+        # What set_max_fps used to do
+        timer = QTimer()
+        timer.start(int(1000 / fps))
+        results.append((f"QTimer({int(1000 / fps)}) (before)", fps, measure(app, timer, timer.timeout.connect)))
+        pacer = FramePacer(fps)
+        pacer.start()
+        results.append((f"FramePacer({fps})", fps, measure(app, pacer, pacer.frame_due.connect)))
+    pacer = FramePacer()
+    pacer.set_uncapped(True)
+    pacer.start()
+    results.append(("FramePacer uncapped", "-", measure(app, pacer, pacer.frame_due.connect)))
+    for name, target, (fps, mean, stdev, worst) in results:
+        print(f"{name:<30} {target:>7} {fps:>7.1f} {mean:>8.2f} {stdev:>9.2f} {worst:>7.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+bench_frames_in_flight.py - Frame time and GUI-thread blocked time per frames-in-flight count
+
+One frame in flight is the old behaviour: every frame waits for the
+previous one to finish on the GPU. Needs a Vulkan driver and an X11 display;
+without a GPU use lavapipe:
+
+    VK_ICD_FILENAMES=/usr/share/vulkan/icd.d/lvp_icd.x86_64.json \
+        python3 benchmarks/bench_frames_in_flight.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication
+from vulkan.vulkan_widget import VulkanWidget, MAX_FRAMES_IN_FLIGHT
+
+SECONDS = 3.0
+
+def run_for(app, seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        app.processEvents()
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = VulkanWidget()
+    widget.resize(1280, 720)
+    widget.show()
+    deadline = time.perf_counter() + 30
+    while not widget.initialized and not widget.init_error and time.perf_counter() < deadline:
+        app.processEvents()
+    if not widget.initialized:
+        print("Vulkan did not initialize:", widget.init_error or "timed out")
+        return 1
+    # Render as fast as the event loop allows
+    widget.set_uncapped(True)
+    print(f"{'in flight':>9} {'frames':>7} {'busy':>8} {'fps':>7} {'cpu ms/frame':>13} {'blocked ms/frame':>17} {'max blocked':>12}")
+    for count in range(1, MAX_FRAMES_IN_FLIGHT + 1):
+        widget.set_frames_in_flight(count)
+        run_for(app, 0.5)
+        widget.reset_frame_stats()
+        run_for(app, SECONDS)
+        stats = widget.frame_stats()
+        print(f"{count:>9} {stats['rendered']:>7} {stats['busy']:>8} {stats['rendered'] / SECONDS:>7.1f} "
+              f"{stats['frame_ms']:>13.2f} {stats['blocked_ms']:>17.2f} {stats['max_blocked_ms']:>12.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+bench_lod.py - Levels of detail: build time, size, triangles drawn and frame time at rest and while orbiting
+
+The CPU part builds the levels of a large grid mesh, then, for cameras
+framing the whole mesh and zoomed in on it, reports the triangles left
+after culling at full detail, at rest (LOD_PIXEL_ERROR) and while the
+camera moves (INTERACTIVE_PIXEL_ERROR), and the time to select levels and
+write the draw commands. The GPU part renders the same views uncapped in
+the three modes; it needs a Vulkan driver, an X11 display and compiled
+shaders (vulkan/shaders/build_shaders.py). Without a GPU use lavapipe:
+
+    VK_ICD_FILENAMES=/usr/share/vulkan/icd.d/lvp_icd.x86_64.json \
+        python3 benchmarks/bench_lod.py [triangles]
+
+Pass --cpu to skip the GPU part.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_culling import ASPECT, REPEATS, SECONDS, TRIANGLES, cameras, timed
+from bench_mesh_upload import grid_mesh, run_for
+from mesh.bvh import MeshBVH, spatial_order
+from mesh.lod import MeshLOD
+from vulkan.vulkan_widget import INTERACTIVE_PIXEL_ERROR, LOD_PIXEL_ERROR
+
+HEIGHT = 720
+MODES = (("full", None), ("rest", LOD_PIXEL_ERROR), ("moving", INTERACTIVE_PIXEL_ERROR))
+
+def bench_cpu(positions, triangles):
+    positions, triangles = spatial_order(positions, triangles)
+    bvh = MeshBVH(positions, triangles)
+    build, lod = timed(MeshLOD, positions, triangles, bvh)
+    print(f"{len(triangles)} triangles: levels built in {build:.2f} s, "
+          f"{lod.nbytes / (positions.nbytes + triangles.nbytes) * 100:.0f} % extra memory")
+    print("triangles per level:", " ".join(str(count) for count in lod.level_triangles()))
+    print(f"{'zoom':>5} {'mode':>7} {'triangles':>11} {'draws':>6} {'select ms':>10}")
+    for steps, camera in cameras(bvh):
+        visible = bvh.cull(camera.frustum_planes(ASPECT))
+        for mode, tolerance in MODES:
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                if tolerance is None:
+                    commands = bvh.draw_commands(visible)
+                else:
+                    commands = lod.draw_commands(visible, lod.select(camera.eye(), camera.pixels_per_unit(HEIGHT),
+                                                                     tolerance))
+            select = (time.perf_counter() - start) / REPEATS
+            print(f"{steps:>5} {mode:>7} {int(commands['index_count'].sum()) // 3:>11} {len(commands):>6} "
+                  f"{select * 1000:>10.2f}")
+    return positions, triangles, bvh, lod
+
+def bench_gpu(positions, triangles, bvh, lod):
+    from PySide6.QtWidgets import QApplication
+    from vulkan.geometry import Mesh
+    from vulkan.vulkan_widget import VulkanWidget
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = VulkanWidget()
+    widget.resize(HEIGHT * 16 // 9, HEIGHT)
+    widget.show()
+    deadline = time.perf_counter() + 30
+    while not widget.initialized and not widget.init_error and time.perf_counter() < deadline:
+        app.processEvents()
+    if not widget.initialized:
+        print("Vulkan did not initialize:", widget.init_error or "timed out")
+        return 1
+    widget.set_uncapped(True)
+    mesh = Mesh(widget.context, positions, triangles, bvh=bvh, lod=lod)
+    widget.set_meshes([mesh], frame=False)
+    print(f"{'zoom':>5} {'mode':>7} {'triangles':>11} {'fps':>7} {'ms/frame':>9}")
+    for steps, camera in cameras(bvh):
+        widget.cameras[0].copy_from(camera)
+        for mode, tolerance in MODES:
+            widget.set_lod(tolerance is not None)
+            # Hold the moving state for the whole measurement
+            widget._interacting = mode == "moving"
+            run_for(app, 0.5)
+            widget.reset_frame_stats()
+            run_for(app, SECONDS)
+            frames = widget.frame_stats()
+            print(f"{steps:>5} {mode:>7} {frames['triangles']:>11} {frames['rendered'] / SECONDS:>7.1f} "
+                  f"{frames['frame_ms']:>9.2f}")
+    widget._interacting = False
+    widget.set_meshes([])
+    mesh.destroy()
+    return 0
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--cpu"]
+    positions, indices = grid_mesh(int(args[0]) if args else TRIANGLES)
+    meshes = bench_cpu(positions, indices.reshape(-1, 3))
+    if "--cpu" in sys.argv:
+        return 0
+    print()
+    return bench_gpu(*meshes)
+
+if __name__ == "__main__":
+    sys.exit(main())
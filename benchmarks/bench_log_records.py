@@ -0,0 +1,59 @@
+"""
+bench_log_records.py - Memory per retained log record, formatted strings vs LogStore
+
+Run from the repository root:
+    python3 benchmarks/bench_log_records.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from ui.log_model import LogStore, LEVELS, LEVEL_TAGS
+
+RECORDS = 1_000_000
+BATCH = 10_000
+
+def batches():
+    for first in range(0, RECORDS, BATCH):
+        seqs = np.arange(first, first + BATCH)
+        messages = [f"solver step {i} residual={i * 1e-6:.6e}" for i in range(first, first + BATCH)]
+        yield seqs % len(LEVELS), seqs % 2 + 1, messages
+
+def formatted_strings():
+    lines = []
+    for levels, sources, messages in batches():
+        for level, source, message in zip(levels.tolist(), sources.tolist(), messages):
+            lines.append(f"{LEVEL_TAGS[level]} [{('Primary', 'Secondary')[source - 1]}] {message}")
+    return lines
+
+def log_store():
+    store = LogStore(RECORDS)
+    store.source_id("Primary")
+    store.source_id("Secondary")
+    now = time.monotonic()
+    for levels, sources, messages in batches():
+        store.extend(np.full(len(messages), now), levels.astype(np.int8), sources.astype(np.int16), messages)
+    return store
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, memory
+
+def main():
+    print(f"{'layout':<20} {'seconds':>8} {'MB':>8} {'bytes/record':>13}")
+    for name, build in [("formatted strings", formatted_strings), ("LogStore", log_store)]:
+        elapsed, memory = measure(build)
+        print(f"{name:<20} {elapsed:>8.2f} {memory / 2**20:>8.1f} {memory / RECORDS:>13.1f}")
+
+if __name__ == "__main__":
+    main()
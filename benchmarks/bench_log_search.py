@@ -0,0 +1,56 @@
+"""
+bench_log_search.py - Filter bar latency of the indexed log search
+
+Reports, per query, the time spent on the GUI thread for the keystroke that
+starts the search (the first slice) and the wall time until all matches are in.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_log_search.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PySide6.QtWidgets import QApplication
+from ui.log_model import LEVEL_RANK
+from ui.log_window import LogWindow
+
+LINES = 1_000_000
+WORDS = ["solver", "mesh", "residual", "converged", "iteration", "warning", "timestep", "pressure", "velocity", "boundary"]
+QUERIES = ["step 123456 ", "step 99999", "converged", "velocity boundary", "zz"]
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = LogWindow()
+    window.set_retention(LINES)
+    window.show()
+    rng = random.Random(0)
+    source = window.model.store.source_id("Primary")
+    start = time.perf_counter()
+    for first in range(0, LINES, 10_000):
+        messages = [
+            f"{rng.choice(WORDS)} {rng.choice(WORDS)} step {i} value={rng.random():.5f}"
+            for i in range(first, first + 10_000)
+        ]
+        appended = window.model.append_records(
+            np.full(10_000, time.monotonic()), np.full(10_000, LEVEL_RANK["info"], dtype=np.int8),
+            np.full(10_000, source, dtype=np.int16), messages)
+        window.search.on_appended(appended, 10_000)
+    app.processEvents()
+    print(f"ingested {LINES} lines in {time.perf_counter() - start:.1f} s")
+    print(f"{'query':<22} {'keystroke ms':>13} {'complete ms':>12} {'matches':>9}")
+    for query in QUERIES:
+        start = time.perf_counter()
+        window.filter_logs(query)
+        keystroke = time.perf_counter() - start
+        while window.search.is_searching():
+            app.processEvents()
+        complete = time.perf_counter() - start
+        print(f"{query!r:<22} {keystroke * 1000:>13.2f} {complete * 1000:>12.1f} {window.model.rowCount():>9}")
+
+if __name__ == "__main__":
+    main()
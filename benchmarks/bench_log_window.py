@@ -0,0 +1,63 @@
+"""
+bench_log_window.py - Append throughput and memory of the log window, with and without the disk spool
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_log_window.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication
+from ui.log_window import LogWindow
+from ui.log_spool import LogSpool
+
+SIZES = [10_000, 100_000, 1_000_000]
+# In-memory retention when spooling; the rest of the history is paged from disk
+SPOOL_RETENTION = 100_000
+
+def bench(app, count, spool_dir=None):
+    spool = LogSpool(spool_dir) if spool_dir else None
+    window = LogWindow(spool=spool)
+    window.set_retention(min(count, SPOOL_RETENTION) if spool is not None else count)
+    window.show()
+    app.processEvents()
+    start = time.perf_counter()
+    for i in range(count):
+        window.append_log(f"solver step {i} residual={i * 1e-6:.6e}", source="Primary")
+        if i % 10_000 == 9_999:
+            # What the 50 ms flush timer does in the running application
+            window.flush()
+    window.flush()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    memory = window.model.store.nbytes()
+    disk = spool.nbytes() if spool is not None else 0
+    assert window.model.rowCount() == count
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    if spool is not None:
+        spool.close()
+    return elapsed, memory, disk
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    print(f"{'spool':>6} {'lines':>10} {'seconds':>9} {'lines/s':>12} {'MB':>8} {'bytes/line':>11} {'disk MB':>8}")
+    for spooled in (False, True):
+        for count in SIZES:
+            spool_dir = tempfile.mkdtemp() if spooled else None
+            try:
+                elapsed, memory, disk = bench(app, count, spool_dir)
+            finally:
+                if spool_dir:
+                    shutil.rmtree(spool_dir)
+            print(f"{'yes' if spooled else 'no':>6} {count:>10} {elapsed:>9.2f} {count / elapsed:>12.0f} "
+                  f"{memory / 2**20:>8.1f} {memory / count:>11.1f} {disk / 2**20:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+bench_mesh_cache.py - Reopening a mesh: ASCII import vs. the memory-mapped mesh cache
+
+For each size, writes a grid mesh as OBJ, imports it and builds its BVH
+and levels of detail (as a cache miss does), stores them in a temporary
+mesh cache, then reopens them from the cache. "open" is what the loader waits for; "touch" additionally reads
+every page of the arrays, as the GPU upload does. The page cache is warm,
+so "touch" is a lower bound for a cold disk.
+
+    python3 benchmarks/bench_mesh_cache.py [triangles ...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_mesh_import import grid_mesh, write_obj
+from mesh.bvh import MeshBVH
+from mesh.cache import MeshCache, source_key
+from mesh.importers import load_mesh
+from mesh.lod import MeshLOD
+
+TRIANGLES = (100_000, 1_000_000, 4_000_000)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or TRIANGLES
+    directory = tempfile.mkdtemp()
+    try:
+        cache = MeshCache(os.path.join(directory, "cache"))
+        print(f"{'triangles':>10} {'OBJ MB':>8} {'import s':>9} {'write s':>8} {'cache MB':>9} "
+              f"{'open ms':>8} {'touch ms':>9} {'speedup':>8}")
+        for triangles in sizes:
+            path = os.path.join(directory, f"grid{triangles}.obj")
+            write_obj(path, *grid_mesh(triangles))
+            key = source_key(path)
+            imported, data = timed(load_mesh, path)
+            built, data.bvh = timed(MeshBVH, data.positions, data.triangles)
+            imported += built
+            built, data.lod = timed(MeshLOD, data.positions, data.triangles, data.bvh)
+            imported += built
+            written, entry = timed(cache.put, path, key, data)
+            opened, cached = timed(cache.get, path, key)
+            touched, _ = timed(lambda: (float(np.sum(cached.positions)), int(np.sum(cached.triangles))))
+            assert np.array_equal(cached.positions, data.positions) and np.array_equal(cached.triangles, data.triangles)
+            print(f"{data.triangle_count:>10} {os.path.getsize(path) / 1e6:>8.1f} {imported:>9.2f} {written:>8.2f} "
+                  f"{os.path.getsize(entry) / 1e6:>9.1f} {opened * 1000:>8.2f} {(opened + touched) * 1000:>9.1f} "
+                  f"{imported / (opened + touched):>7.0f}x")
+            del cached
+            os.remove(path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+bench_mesh_import.py - Mesh import throughput (MB/s) by file format, serial and with the process pool
+
+Generates wavy grid meshes as OBJ, ASCII and binary STL, and Gmsh 2.2 and
+4.1 files in a temporary directory, then times mesh.importers.load_mesh
+with one worker and with one worker per CPU. A line-by-line Python OBJ
+parser is timed as the baseline the vectorized readers replace.
+
+    python3 benchmarks/bench_mesh_import.py [triangles ...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mesh.importers import load_mesh
+
+TRIANGLES = (100_000, 1_000_000)
+# Rows formatted per string when writing the files
+WRITE_BATCH = 200_000
+
+def grid_mesh(triangles):
+    """A wavy n x n grid with about ``triangles`` triangles: (positions, (M, 3) indices)."""
+    n = max(1, int((triangles / 2) ** 0.5))
+    u, v = np.meshgrid(np.linspace(-1, 1, n + 1), np.linspace(-1, 1, n + 1))
+    positions = np.stack([u, 0.1 * np.sin(6 * u) * np.cos(6 * v), v], axis=-1).reshape(-1, 3)
+    corner = (np.arange(n)[:, None] * (n + 1) + np.arange(n)).reshape(-1)
+    indices = np.stack([corner, corner + n + 1, corner + 1, corner + 1, corner + n + 1, corner + n + 2], axis=-1)
+    return positions, indices.reshape(-1, 3)
+
+def write_rows(f, fmt, table):
+    """Write one ``fmt`` line per row of ``table``, formatting a batch of rows per call."""
+    for start in range(0, len(table), WRITE_BATCH):
+        batch = table[start:start + WRITE_BATCH]
+        f.write(((fmt + "\n") * len(batch)) % tuple(batch.reshape(-1).tolist()))
+
+def write_obj(path, positions, triangles):
+    with open(path, "w") as f:
+        f.write("# generated by bench_mesh_import.py\n")
+        write_rows(f, "v %.6f %.6f %.6f", positions)
+        write_rows(f, "f %d %d %d", triangles + 1)
+
+def write_ascii_stl(path, positions, triangles):
+    corners = positions[triangles].reshape(-1, 9)
+    with open(path, "w") as f:
+        f.write("solid grid\n")
+        write_rows(f, " facet normal 0 0 0\n  outer loop\n   vertex %.6e %.6e %.6e\n   vertex %.6e %.6e %.6e\n"
+                      "   vertex %.6e %.6e %.6e\n  endloop\n endfacet", corners)
+        f.write("endsolid grid\n")
+
+def write_binary_stl(path, positions, triangles):
+    records = np.zeros(len(triangles), dtype=[("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+    records["vertices"] = positions[triangles]
+    with open(path, "wb") as f:
+        f.write(b"generated by bench_mesh_import.py".ljust(80, b" "))
+        f.write(np.uint32(len(triangles)).tobytes())
+        records.tofile(f)
+
+def write_msh2(path, positions, triangles):
+    nodes = np.column_stack([np.arange(1, len(positions) + 1), positions])
+    elements = np.column_stack([np.arange(1, len(triangles) + 1), triangles + 1])
+    with open(path, "w") as f:
+        f.write(f"$MeshFormat\n2.2 0 8\n$EndMeshFormat\n$Nodes\n{len(positions)}\n")
+        write_rows(f, "%d %.6f %.6f %.6f", nodes)
+        f.write(f"$EndNodes\n$Elements\n{len(triangles)}\n")
+        write_rows(f, "%d 2 2 0 1 %d %d %d", elements)
+        f.write("$EndElements\n")
+
+def write_msh4(path, positions, triangles):
+    n, m = len(positions), len(triangles)
+    elements = np.column_stack([np.arange(1, m + 1), triangles + 1])
+    with open(path, "w") as f:
+        f.write(f"$MeshFormat\n4.1 0 8\n$EndMeshFormat\n$Nodes\n1 {n} 1 {n}\n2 1 0 {n}\n")
+        write_rows(f, "%d", np.arange(1, n + 1)[:, None])
+        write_rows(f, "%.6f %.6f %.6f", positions)
+        f.write(f"$EndNodes\n$Elements\n1 {m} 1 {m}\n2 1 2 {m}\n")
+        write_rows(f, "%d %d %d %d", elements)
+        f.write("$EndElements\n")
+
+FORMATS = (
+    ("OBJ", ".obj", write_obj),
+    ("ASCII STL", ".stl", write_ascii_stl),
+    ("binary STL", ".stl", write_binary_stl),
+    ("Gmsh 2.2", ".msh", write_msh2),
+    ("Gmsh 4.1", ".msh", write_msh4),
+)
+
+def naive_obj(path):
+    """Line-by-line parsing, as a plain Python importer would do it."""
+    positions, triangles = [], []
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == "v":
+                positions.append([float(x) for x in parts[1:4]])
+            elif parts[0] == "f":
+                corners = [int(p.split("/")[0]) - 1 for p in parts[1:]]
+                for i in range(1, len(corners) - 1):
+                    triangles.append((corners[0], corners[i], corners[i + 1]))
+    return np.array(positions, dtype=np.float32), np.array(triangles, dtype=np.uint32)
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or TRIANGLES
+    workers = os.cpu_count() or 1
+    directory = tempfile.mkdtemp()
+    try:
+        print(f"{'format':<11} {'triangles':>10} {'MB':>8} {'1 worker s':>11} {'MB/s':>7} "
+              f"{f'{workers} workers s':>12} {'MB/s':>7} {'vertices':>10}")
+        for triangles in sizes:
+            positions, indices = grid_mesh(triangles)
+            for name, ext, write in FORMATS:
+                path = os.path.join(directory, f"grid{ext}")
+                write(path, positions, indices)
+                mb = os.path.getsize(path) / 1e6
+                serial, mesh = timed(load_mesh, path, workers=1)
+                parallel, _ = timed(load_mesh, path, workers=workers)
+                print(f"{name:<11} {mesh.triangle_count:>10} {mb:>8.1f} {serial:>11.2f} {mb / serial:>7.1f} "
+                      f"{parallel:>12.2f} {mb / parallel:>7.1f} {mesh.vertex_count:>10}")
+                if name == "OBJ":
+                    naive, _ = timed(naive_obj, path)
+                    print(f"{'OBJ naive':<11} {mesh.triangle_count:>10} {mb:>8.1f} {naive:>11.2f} {mb / naive:>7.1f}")
+                os.remove(path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
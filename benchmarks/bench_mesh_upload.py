@@ -0,0 +1,73 @@
+"""
+bench_mesh_upload.py - Mesh upload throughput, memory blocks used, and draw time by mesh size
+
+Uploads grid meshes through the staging buffer into device-local memory,
+then renders each one uncapped. Needs a Vulkan driver, an X11 display and
+compiled shaders (vulkan/shaders/build_shaders.py); without a GPU use
+lavapipe:
+
+    VK_ICD_FILENAMES=/usr/share/vulkan/icd.d/lvp_icd.x86_64.json \
+        python3 benchmarks/bench_mesh_upload.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication
+from vulkan.geometry import Mesh
+from vulkan.vulkan_widget import VulkanWidget
+
+TRIANGLES = (100_000, 1_000_000, 10_000_000, 30_000_000)
+SECONDS = 2.0
+
+def grid_mesh(triangles):
+    """A wavy n x n grid with about ``triangles`` triangles."""
+    n = max(1, int((triangles / 2) ** 0.5))
+    u, v = np.meshgrid(np.linspace(-1, 1, n + 1, dtype=np.float32), np.linspace(-1, 1, n + 1, dtype=np.float32))
+    positions = np.stack([u, 0.1 * np.sin(6 * u) * np.cos(6 * v), v], axis=-1).reshape(-1, 3)
+    corner = (np.arange(n, dtype=np.uint32)[:, None] * (n + 1) + np.arange(n, dtype=np.uint32)).reshape(-1)
+    indices = np.stack([corner, corner + n + 1, corner + 1, corner + 1, corner + n + 1, corner + n + 2], axis=-1)
+    return positions, indices.reshape(-1)
+
+def run_for(app, seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        app.processEvents()
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = VulkanWidget()
+    widget.resize(1280, 720)
+    widget.show()
+    deadline = time.perf_counter() + 30
+    while not widget.initialized and not widget.init_error and time.perf_counter() < deadline:
+        app.processEvents()
+    if not widget.initialized:
+        print("Vulkan did not initialize:", widget.init_error or "timed out")
+        return 1
+    widget.set_uncapped(True)
+    print(f"{'triangles':>11} {'MB':>8} {'upload s':>9} {'MB/s':>8} {'blocks':>7} {'buffers':>8} {'fps':>7} {'ms/frame':>9}")
+    for triangles in TRIANGLES:
+        positions, indices = grid_mesh(triangles)
+        start = time.perf_counter()
+        mesh = Mesh(widget.context, positions, indices)
+        upload = time.perf_counter() - start
+        stats = widget.context.allocator.stats()
+        widget.set_meshes([mesh])
+        run_for(app, 0.5)
+        widget.reset_frame_stats()
+        run_for(app, SECONDS)
+        frames = widget.frame_stats()
+        widget.set_meshes([])
+        mesh.destroy()
+        mb = mesh.nbytes / 2**20
+        print(f"{mesh.triangle_count:>11} {mb:>8.1f} {upload:>9.3f} {mb / upload:>8.0f} {stats['blocks']:>7} "
+              f"{stats['allocations']:>8} {frames['rendered'] / SECONDS:>7.1f} {frames['frame_ms']:>9.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
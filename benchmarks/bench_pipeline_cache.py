@@ -0,0 +1,70 @@
+"""
+bench_pipeline_cache.py - Pipeline creation time without, with a cold and with a warm pipeline cache
+
+Each run is a fresh interpreter creating VulkanWidget's device objects
+(no window is needed). The pipeline cache lives in a temporary directory:
+"cold" runs start without a cache file, "warm" runs load the one the
+previous run saved. Mesa's own on-disk shader cache is disabled so only
+ours is measured. Needs a Vulkan driver; without a GPU use lavapipe:
+
+    VK_ICD_FILENAMES=/usr/share/vulkan/icd.d/lvp_icd.x86_64.json \
+        python3 benchmarks/bench_pipeline_cache.py
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+def child(cache_dir):
+    """Create the device objects once and report how long the pipeline took."""
+    sys.path.insert(0, ROOT)
+    import profiler
+    from PySide6.QtWidgets import QApplication
+    from vulkan import pipeline_cache
+    from vulkan.vulkan_widget import VulkanWidget
+    pipeline_cache.CACHE_DIR = cache_dir
+    app = QApplication(sys.argv)
+    trace = profiler.start(trace_imports=False)
+    widget = VulkanWidget()
+    widget._create_device_objects()
+    spans = {event["name"]: event["dur"] / 1e6 for event in trace.events if event["ph"] == "X"}
+    print(json.dumps({"pipeline": spans["create render pass and pipeline"],
+                      "loaded": widget.pipeline_cache.loaded}))
+
+def run(cache_dir):
+    env = dict(os.environ, MESA_SHADER_CACHE_DISABLE="true", MESA_GLSL_CACHE_DISABLE="true")
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", cache_dir],
+                         env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        cold, warm = [], []
+        for _ in range(RUNS):
+            shutil.rmtree(directory)
+            os.makedirs(directory)
+            cold.append(run(directory))
+            warm.append(run(directory))
+    except subprocess.CalledProcessError as e:
+        print("Vulkan did not initialize:", e.stderr.strip().splitlines()[-1:])
+        return 1
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print(f"{RUNS} runs, median ms")
+    for name, runs in (("cold", cold), ("warm", warm)):
+        loaded = sum(r["loaded"] for r in runs)
+        print(f"{name:<6} {statistics.median(r['pipeline'] for r in runs) * 1000:>8.2f}  (cache loaded {loaded}/{RUNS})")
+    return 0
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        child(sys.argv[sys.argv.index("--child") + 1])
+    else:
+        sys.exit(main())
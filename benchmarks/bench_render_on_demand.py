@@ -0,0 +1,78 @@
+"""
+bench_render_on_demand.py - Paints and CPU time of VulkanWidget per interaction pattern
+
+Continuous is the old behaviour (a frame every deadline, changed or not).
+Without a Vulkan driver the widget paints its placeholder, which still shows
+how often the widget wakes up and paints.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_render_on_demand.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QObject, QEvent
+from PySide6.QtWidgets import QApplication, QLabel, QStackedWidget
+from vulkan.vulkan_widget import VulkanWidget
+
+SECONDS = 3.0
+# Simulated camera drag: one mouse move per this many seconds
+DRAG_INTERVAL = 1 / 30
+
+class PaintCounter(QObject):
+    def __init__(self):
+        super().__init__()
+        self.paints = 0
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            self.paints += 1
+        return False
+
+def measure(app, widget, counter, on_step=None):
+    counter.paints = 0
+    widget.reset_frame_stats()
+    cpu = time.process_time()
+    end = time.perf_counter() + SECONDS
+    next_step = 0.0
+    while time.perf_counter() < end:
+        if on_step and time.perf_counter() >= next_step:
+            on_step()
+            next_step = time.perf_counter() + DRAG_INTERVAL
+        app.processEvents()
+        # An idle event loop sleeps; don't measure our own polling
+        time.sleep(0.001)
+    stats = widget.frame_stats()
+    return counter.paints / SECONDS, stats["skipped"], (time.process_time() - cpu) * 1000 / SECONDS
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    stack = QStackedWidget()
+    widget = VulkanWidget()
+    stack.addWidget(widget)
+    stack.addWidget(QLabel("other page"))
+    stack.resize(800, 600)
+    stack.show()
+    counter = PaintCounter()
+    widget.installEventFilter(counter)
+    # Let initialization finish or fail before measuring
+    deadline = time.perf_counter() + 30
+    while not widget.initialized and not widget.init_error and time.perf_counter() < deadline:
+        app.processEvents()
+    results = []
+    widget.begin_animation()
+    results.append(("continuous (before)", measure(app, widget, counter)))
+    widget.end_animation()
+    results.append(("idle", measure(app, widget, counter)))
+    results.append(("camera drag 30 Hz", measure(app, widget, counter, widget.request_frame)))
+    stack.setCurrentIndex(1)
+    results.append(("hidden page, scene updates", measure(app, widget, counter, widget.request_frame)))
+    print(f"{'pattern':<28} {'paints/s':>9} {'skipped':>8} {'cpu ms/s':>9}")
+    for name, (paints, skipped, cpu) in results:
+        print(f"{name:<28} {paints:>9.1f} {skipped:>8} {cpu:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+bench_settings.py - Latency of settings reads and saves, before and after the in-memory store
+
+Run from the repository root:
+    python3 benchmarks/bench_settings.py
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings import SettingsStore, SETTINGS_FILE
+
+SAVES = 200
+
+def main():
+    store = SettingsStore(SETTINGS_FILE)
+    cases = [
+        ("parse settings.json (before)", store.read_file, 2_000),
+        ("load_settings() (after)", store.data, 200_000),
+        ("get('performance.max_fps')", lambda: store.get("performance.max_fps"), 200_000),
+        ("get_int('performance.max_fps')", lambda: store.get_int("performance.max_fps"), 200_000),
+    ]
+    print(f"{'access':<34} {'us/call':>10}")
+    for name, call, number in cases:
+        best = min(timeit.repeat(call, number=number, repeat=5)) / number
+        print(f"{name:<34} {best * 1e6:>10.2f}")
+    bench_saves()
+
+def bench_saves():
+    """A burst of project opens, each adding a recent file and saving."""
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "settings.json")
+        shutil.copy(SETTINGS_FILE, path)
+        data = SettingsStore(path).data()
+        start = time.perf_counter()
+        for i in range(SAVES):
+            data["recent_files"].insert(0, f"/projects/{i}.simproj")
+            # Before: add_recent_file() and its caller both rewrote the file in place
+            for _ in range(2):
+                with open(path, "w") as f:
+                    json.dump(data, f, indent=4)
+        before = time.perf_counter() - start
+        store = SettingsStore(path)
+        writes = []
+        write = store._write
+        store._write = lambda text: (writes.append(text), write(text))
+        data = store.data()
+        start = time.perf_counter()
+        for i in range(SAVES):
+            data["recent_files"].insert(0, f"/projects/{i}.simproj")
+            store.commit()
+        after = time.perf_counter() - start
+        store.flush()
+    finally:
+        shutil.rmtree(directory)
+    print(f"\n{SAVES} project opens          {'GUI thread ms':>14} {'file writes':>12}")
+    print(f"{'synchronous saves (before)':<28} {before * 1000:>14.1f} {2 * SAVES:>12}")
+    print(f"{'write-behind saves (after)':<28} {after * 1000:>14.1f} {len(writes):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+bench_startup.py - Time from process start to the first paint of PrimaryMainWindow
+
+Each run starts a fresh interpreter, so nothing is cached between runs. The
+run happens in a temporary directory holding a copy of settings.json.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_startup.py
+"""
+import time
+
+START = time.perf_counter()
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 7
+# Modules that should only load once the workflow window is opened
+DEFERRED = ["ui.secondary_window", "vulkan.vulkan_widget", "psutil"]
+
+def child():
+    """Start the application as main.py does and report when the window first paints."""
+    sys.path.insert(0, ROOT)
+    from PySide6.QtCore import QObject, QEvent, QTimer
+    from PySide6.QtWidgets import QApplication
+    from ui.main_window import PrimaryMainWindow
+    from ui.theme import apply_theme
+    imported = time.perf_counter()
+    timings = {}
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and "paint" not in timings:
+                timings["paint"] = time.perf_counter()
+                QTimer.singleShot(0, app.quit)
+            return False
+
+    app = QApplication(sys.argv)
+    apply_theme(app)
+    window = PrimaryMainWindow()
+    constructed = time.perf_counter()
+    watcher = FirstPaint()
+    window.installEventFilter(watcher)
+    window.show()
+    app.exec()
+    print(json.dumps({
+        "imports": imported - START,
+        "window": constructed - imported,
+        "first_paint": timings["paint"] - START,
+        "loaded": [name for name in DEFERRED if name in sys.modules],
+    }))
+    window.log_window.close()
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(ROOT, "settings.json"), directory)
+        runs = []
+        for _ in range(RUNS):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=directory,
+                                 capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(out.strip().splitlines()[-1]))
+    finally:
+        shutil.rmtree(directory)
+    print(f"{RUNS} runs, median ms")
+    for key in ("imports", "window", "first_paint"):
+        print(f"{key:<12} {statistics.median(run[key] for run in runs) * 1000:>8.1f}")
+    print("deferred modules loaded at startup:", ", ".join(runs[0]["loaded"]) or "none")
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        child()
+    else:
+        main()
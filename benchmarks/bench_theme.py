@@ -0,0 +1,67 @@
+"""
+bench_theme.py - Cost of applying themes to a large widget tree, per backend
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_theme.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication, QWidget, QGridLayout, QLabel, QLineEdit, QPushButton, QComboBox
+from ui.theme import apply_theme, get_qss, BACKENDS
+
+ROWS = 500
+
+def build_form(rows):
+    """A dense form: label, line edit, combo box and button per row."""
+    form = QWidget()
+    layout = QGridLayout(form)
+    for row in range(rows):
+        layout.addWidget(QLabel(f"Parameter {row}"), row, 0)
+        layout.addWidget(QLineEdit(str(row)), row, 1)
+        combo = QComboBox()
+        combo.addItems(["linear", "quadratic", "cubic"])
+        layout.addWidget(combo, row, 2)
+        layout.addWidget(QPushButton("Reset"), row, 3)
+    return form
+
+def timed(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    form = build_form(ROWS)
+    form.show()
+    app.processEvents()
+    print(f"{len(app.allWidgets())} widgets")
+    apply_theme(app, "dark", "qss")
+    cases = [
+        ("setStyleSheet, same theme (before)", lambda: app.setStyleSheet(get_qss("dark"))),
+        ("apply_theme, same theme (after)", lambda: apply_theme(app, "dark", "qss")),
+    ]
+    print(f"{'operation':<38} {'ms':>9}")
+    for name, call in cases:
+        elapsed = timed(call) + timed(app.processEvents)
+        print(f"{name:<38} {elapsed * 1000:>9.1f}")
+    print()
+    print(f"{'backend':<10} {'apply':>9} {'switch':>9} {'paint':>9} {'relayout':>9}  (ms)")
+    for backend in BACKENDS:
+        apply = timed(lambda: apply_theme(app, "dark", backend)) + timed(app.processEvents)
+        switch = timed(lambda: apply_theme(app, "light", backend)) + timed(app.processEvents)
+        form.grab()
+        paint = min(timed(form.grab) for _ in range(3))
+        width = form.width()
+        relayout = 0.0
+        for i in range(3):
+            form.resize(width + 40 * (1 - i % 2 * 2), form.height())
+            relayout += timed(lambda: (form.layout().activate(), app.processEvents()))
+        print(f"{backend:<10} {apply * 1000:>9.1f} {switch * 1000:>9.1f} {paint * 1000:>9.1f} {relayout / 3 * 1000:>9.1f}")
+        apply_theme(app, "dark", backend)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+bench_viewports.py - Frame time of VulkanWidget with 1, 2 and 4 viewport panes
+
+All panes are recorded into one command buffer and submitted once, so
+frame time should stay close to the single-pane case. Needs a Vulkan driver
+and an X11 display; without a GPU use lavapipe:
+
+    VK_ICD_FILENAMES=/usr/share/vulkan/icd.d/lvp_icd.x86_64.json \
+        python3 benchmarks/bench_viewports.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication
+from vulkan.camera import PANE_LAYOUTS
+from vulkan.vulkan_widget import VulkanWidget
+
+SECONDS = 3.0
+
+def run_for(app, seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        app.processEvents()
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = VulkanWidget()
+    widget.resize(1280, 720)
+    widget.show()
+    deadline = time.perf_counter() + 30
+    while not widget.initialized and not widget.init_error and time.perf_counter() < deadline:
+        app.processEvents()
+    if not widget.initialized:
+        print("Vulkan did not initialize:", widget.init_error or "timed out")
+        return 1
+    # Render as fast as the event loop allows
+    widget.set_uncapped(True)
+    print(f"{'panes':>5} {'linked':>7} {'frames':>7} {'fps':>7} {'cpu ms/frame':>13} {'blocked ms/frame':>17}")
+    for panes in PANE_LAYOUTS:
+        for linked in (True, False):
+            widget.set_pane_count(panes)
+            widget.set_cameras_linked(linked)
+            run_for(app, 0.5)
+            widget.reset_frame_stats()
+            run_for(app, SECONDS)
+            stats = widget.frame_stats()
+            print(f"{panes:>5} {str(linked):>7} {stats['rendered']:>7} {stats['rendered'] / SECONDS:>7.1f} "
+                  f"{stats['frame_ms']:>13.2f} {stats['blocked_ms']:>17.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
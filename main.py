@@ -1,13 +1,29 @@
 import sys
-from PySide6 import QtWidgets
+import profiler
+
+# --profile[=trace.json] starts profiling before the imports below, so they are timed too
+PROFILE = next((arg for arg in sys.argv[1:] if arg.partition("=")[0] == "--profile"), None)
+if __name__ == "__main__" and PROFILE:
+    profiler.start()
+
+from PySide6 import QtWidgets, QtCore
 from ui.main_window import PrimaryMainWindow
 from ui.theme import apply_theme
+from settings import subscribe, flush_settings
 
 def main():
     app = QtWidgets.QApplication(sys.argv)
-    apply_theme(app)  # Apply modern theme at startup
+    stall_monitor = profiler.watch_event_loop(app)
+    if profiler.active():
+        app.aboutToQuit.connect(lambda: profiler.finish(PROFILE.partition("=")[2] or None))
+    with profiler.span("apply_theme"):
+        apply_theme(app)  # Apply modern theme at startup
+    subscribe("theme", lambda theme: apply_theme(app))
+    subscribe("theme_backend", lambda backend: apply_theme(app))
+    app.aboutToQuit.connect(flush_settings)
     window = PrimaryMainWindow()
     window.show()
+    QtCore.QTimer.singleShot(0, lambda: profiler.instant("event loop started"))
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,7 @@
+"""
+mesh - Mesh import: vectorized OBJ, STL and Gmsh readers producing arrays ready for GPU upload,
+and the spatial index (bvh.py) and levels of detail (lod.py) built over them
+
+Kept free of Qt so the parsers can run in worker processes; the threaded
+front end the GUI uses is ui/mesh_loader.py.
+"""
@@ -0,0 +1,222 @@
+"""
+bvh.py - Spatial index of a mesh: triangle chunks in Morton order under a bounding volume hierarchy
+
+``spatial_order`` sorts the triangles of a mesh along a Morton (Z-order)
+curve through their centroids; the importers apply it, so consecutive
+triangles are close in space. MeshBVH then cuts the triangles into chunks
+of CHUNK_TRIANGLES consecutive triangles, each one compact region of the
+surface and one range of the index buffer. The hierarchy above the
+chunks is implicit: level 0 holds the chunk boxes, and each box of the
+next level encloses two consecutive boxes of the level below. Neighbours
+in Morton order are neighbours in space, so no split search is needed and
+each level is built with one vectorized min/max.
+"""
+import numpy as np
+
+CHUNK_TRIANGLES = 4096
+# Bits per axis of the Morton codes (3 x 21 bits fit a uint64)
+MORTON_BITS = 21
+# Triangles whose bounds are computed per vectorized step
+BOUNDS_BATCH = 1 << 20
+# Candidate chunks whose triangles are ray-tested per step while picking
+PICK_BATCH = 16
+# VkDrawIndexedIndirectCommand
+DRAW_COMMAND = np.dtype([("index_count", "<u4"), ("instance_count", "<u4"), ("first_index", "<u4"),
+                         ("vertex_offset", "<i4"), ("first_instance", "<u4")])
+
+def spread_bits(values):
+    """Insert two zero bits after each of the low 21 bits of ``values`` (uint64)."""
+    x = values & np.uint64(0x1FFFFF)
+    x = (x | x << np.uint64(32)) & np.uint64(0x1F00000000FFFF)
+    x = (x | x << np.uint64(16)) & np.uint64(0x1F0000FF0000FF)
+    x = (x | x << np.uint64(8)) & np.uint64(0x100F00F00F00F00F)
+    x = (x | x << np.uint64(4)) & np.uint64(0x10C30C30C30C30C3)
+    x = (x | x << np.uint64(2)) & np.uint64(0x1249249249249249)
+    return x
+
+def morton_codes(points, lo, hi):
+    """64-bit Morton codes of ``points`` quantized within the box ``lo``..``hi``."""
+    scale = ((1 << MORTON_BITS) - 1) / np.maximum(np.asarray(hi, np.float64) - lo, 1e-30)
+    cells = np.clip((points - lo) * scale, 0, (1 << MORTON_BITS) - 1).astype(np.uint64)
+    return spread_bits(cells[:, 0]) | spread_bits(cells[:, 1]) << np.uint64(1) | spread_bits(cells[:, 2]) << np.uint64(2)
+
+def spatial_order(positions, triangles):
+    """Reorder triangles along a Morton curve, and vertices by first use in that order.
+
+    Returns new (positions, triangles) arrays of the same dtypes.
+    """
+    if len(triangles) == 0:
+        return positions, triangles
+    lo, hi = positions.min(axis=0), positions.max(axis=0)
+    centroids = np.empty((len(triangles), 3), dtype=np.float32)
+    for start in range(0, len(triangles), BOUNDS_BATCH):
+        batch = triangles[start:start + BOUNDS_BATCH]
+        centroids[start:start + len(batch)] = positions[batch].mean(axis=1)
+    triangles = triangles[np.argsort(morton_codes(centroids, lo, hi), kind="stable")]
+    # Renumber vertices in the order the sorted triangles first use them
+    corners = triangles.reshape(-1)
+    first_use = np.full(len(positions), len(corners), dtype=np.int64)
+    np.minimum.at(first_use, corners, np.arange(len(corners)))
+    order = np.argsort(first_use, kind="stable")
+    rank = np.empty(len(order), dtype=triangles.dtype)
+    rank[order] = np.arange(len(order), dtype=triangles.dtype)
+    return np.ascontiguousarray(positions[order]), np.ascontiguousarray(rank[triangles])
+
+def classify_boxes(lo, hi, planes):
+    """(outside, inside) masks of boxes against ``planes``, (P, 4) rows of a·x + d >= 0 inside.
+
+    Conservative: a box straddling the frustum's corner may count as
+    intersecting while lying outside, never the other way round.
+    """
+    normals, offsets = planes[:, :3], planes[:, 3]
+    positive = normals >= 0
+    # The box corners furthest along and against each plane normal
+    far = np.where(positive, hi[:, None, :], lo[:, None, :])
+    near = np.where(positive, lo[:, None, :], hi[:, None, :])
+    outside = np.any(np.einsum("kpi,pi->kp", far, normals) + offsets < 0, axis=1)
+    inside = np.all(np.einsum("kpi,pi->kp", near, normals) + offsets >= 0, axis=1)
+    return outside, inside
+
+def ray_boxes(origin, inverse_direction, lo, hi):
+    """(entry, exit) distances of the ray through each box; it misses where entry > exit."""
+    # 0 * inf (ray parallel to a slab, starting on its plane) is NaN, which nanmax/nanmin skip
+    with np.errstate(invalid="ignore"):
+        t1 = (lo - origin) * inverse_direction
+        t2 = (hi - origin) * inverse_direction
+    entry = np.maximum(np.nanmax(np.minimum(t1, t2), axis=1), 0.0)
+    return entry, np.nanmin(np.maximum(t1, t2), axis=1)
+
+def ray_triangles(origin, direction, a, b, c):
+    """Distance along the ray to each triangle (a, b, c corner arrays), inf where it misses (Moller-Trumbore)."""
+    edge1, edge2 = b - a, c - a
+    p = np.cross(direction, edge2)
+    det = np.einsum("ij,ij->i", edge1, p)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inverse_det = 1.0 / det
+        s = origin - a
+        u = np.einsum("ij,ij->i", s, p) * inverse_det
+        q = np.cross(s, edge1)
+        v = (q @ direction) * inverse_det
+        t = np.einsum("ij,ij->i", edge2, q) * inverse_det
+    hit = (np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return np.where(hit, t, np.inf)
+
+def chunk_runs(mask):
+    """(starts, ends) of the runs of consecutive true entries of ``mask``; ends are exclusive."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def indirect_commands(first, last):
+    """DRAW_COMMAND array drawing the triangles ``first``..``last`` (exclusive) of each range."""
+    commands = np.zeros(len(first), dtype=DRAW_COMMAND)
+    commands["index_count"] = (last - first) * 3
+    commands["instance_count"] = 1
+    commands["first_index"] = first * 3
+    return commands
+
+class MeshBVH:
+    """Chunks of ``chunk_triangles`` consecutive triangles under an implicit binary BVH.
+
+    ``positions`` and ``triangles`` are kept (not copied) for picking;
+    they may be memory maps. ``chunk_bounds``, the (lo, hi) chunk boxes of
+    an earlier build over the same triangles (``levels[0]``), skips reading
+    them, so a mesh from the cache is only read where a pick needs it.
+    """
+    def __init__(self, positions, triangles, chunk_triangles=CHUNK_TRIANGLES, chunk_bounds=None):
+        self.positions = positions
+        self.triangles = triangles
+        self.triangle_count = len(triangles)
+        self.chunk_triangles = chunk_triangles
+        self.chunk_count = -(-len(triangles) // chunk_triangles)
+        lo, hi = chunk_bounds or self._chunk_bounds()
+        self.levels = [(lo, hi)]
+        while len(lo) > 1:
+            if len(lo) % 2:
+                lo, hi = np.vstack([lo, lo[-1:]]), np.vstack([hi, hi[-1:]])
+            lo, hi = np.minimum(lo[0::2], lo[1::2]), np.maximum(hi[0::2], hi[1::2])
+            self.levels.append((lo, hi))
+
+    def _chunk_bounds(self):
+        chunk_triangles = self.chunk_triangles
+        lo = np.empty((self.chunk_count, 3), dtype=np.float32)
+        hi = np.empty((self.chunk_count, 3), dtype=np.float32)
+        batch_chunks = max(1, BOUNDS_BATCH // chunk_triangles)
+        for first in range(0, self.chunk_count, batch_chunks):
+            last = min(first + batch_chunks, self.chunk_count)
+            corners = self.positions[self.triangles[first * chunk_triangles:last * chunk_triangles]].reshape(-1, 3)
+            # Chunk boundaries in corners; the last chunk may be short
+            starts = (np.arange(first, last) - first) * chunk_triangles * 3
+            lo[first:last] = np.minimum.reduceat(corners, starts)
+            hi[first:last] = np.maximum.reduceat(corners, starts)
+        return lo, hi
+
+    def bounds(self):
+        lo, hi = self.levels[-1]
+        return lo[0], hi[0]
+
+    def cull(self, planes):
+        """Mask of the chunks at least partly inside the frustum ``planes`` (Camera.frustum_planes)."""
+        visible = np.zeros(self.chunk_count, dtype=bool)
+        if self.chunk_count == 0:
+            return visible
+        # Chunks below fully visible nodes, marked as +1/-1 at range ends
+        marks = np.zeros(self.chunk_count + 1, dtype=np.int32)
+        nodes = np.arange(len(self.levels[-1][0]))
+        for level in range(len(self.levels) - 1, -1, -1):
+            lo, hi = self.levels[level]
+            outside, inside = classify_boxes(lo[nodes], hi[nodes], planes)
+            full = nodes[inside]
+            np.add.at(marks, full << level, 1)
+            np.add.at(marks, np.minimum((full + 1) << level, self.chunk_count), -1)
+            partial = nodes[~outside & ~inside]
+            if level == 0:
+                visible[partial] = True
+                break
+            children = np.concatenate([partial * 2, partial * 2 + 1])
+            nodes = np.sort(children[children < len(self.levels[level - 1][0])])
+        return visible | (np.cumsum(marks[:-1]) > 0)
+
+    def draw_commands(self, visible):
+        """VkDrawIndexedIndirectCommand array drawing the chunks of mask ``visible``.
+
+        Runs of consecutive visible chunks are merged into one command.
+        """
+        starts, ends = chunk_runs(visible)
+        return indirect_commands(starts * self.chunk_triangles,
+                                 np.minimum(ends * self.chunk_triangles, self.triangle_count))
+
+    def pick(self, origin, direction):
+        """Nearest triangle the ray from ``origin`` along ``direction`` hits, as (triangle, distance), or None.
+
+        Chunk boxes the ray enters are visited nearest first, and
+        triangle tests stop once the next box starts beyond the best hit.
+        """
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        with np.errstate(divide="ignore"):
+            inverse = 1.0 / direction
+        nodes = np.arange(len(self.levels[-1][0]))
+        for level in range(len(self.levels) - 1, -1, -1):
+            lo, hi = self.levels[level]
+            entry, exit_ = ray_boxes(origin, inverse, lo[nodes], hi[nodes])
+            nodes = nodes[entry <= exit_]
+            if level == 0:
+                entry = entry[entry <= exit_]
+                break
+            children = np.concatenate([nodes * 2, nodes * 2 + 1])
+            nodes = children[children < len(self.levels[level - 1][0])]
+        order = np.argsort(entry)
+        chunks, entry = nodes[order], entry[order]
+        best, best_triangle = np.inf, None
+        for start in range(0, len(chunks), PICK_BATCH):
+            if entry[start] > best:
+                break
+            batch = chunks[start:start + PICK_BATCH]
+            index = (batch[:, None] * self.chunk_triangles + np.arange(self.chunk_triangles)).reshape(-1)
+            index = index[index < self.triangle_count]
+            corners = self.positions[self.triangles[index]].astype(np.float64)
+            t = ray_triangles(origin, direction, corners[:, 0], corners[:, 1], corners[:, 2])
+            nearest = int(np.argmin(t))
+            if t[nearest] < best:
+                best, best_triangle = float(t[nearest]), int(index[nearest])
+        return None if best_triangle is None else (best_triangle, best)
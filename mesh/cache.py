@@ -0,0 +1,225 @@
+"""
+cache.py - Memory-mapped binary cache of imported meshes
+
+An imported mesh is written once as a fixed-layout header followed by its
+raw arrays, each starting on a page boundary: the vertices and triangles,
+already in spatial order, the chunk boxes of its BVH and its levels of
+detail. Reopening the unchanged source file maps those arrays with
+np.memmap instead of parsing it again: opening reads one header, the
+chunk boxes and the levels' chunk offsets, and the other arrays' pages
+are only read from disk when something touches them, such as the upload
+to the GPU.
+"""
+import hashlib
+import logging
+import os
+import struct
+import threading
+import time
+import numpy as np
+from mesh.bvh import MeshBVH
+from mesh.data import MeshData
+from mesh.lod import MeshLOD
+from profiler import span
+
+# Per-user cache directory, used unless the settings name another one
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "simGUI", "meshes")
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+FILE_MAGIC = b"SGMC"
+# Bump when the layout, or what the importers produce, changes; older
+# entries then miss and are replaced
+FILE_VERSION = 4
+# magic, version, source size, source mtime (ns), source fingerprint,
+# vertex count, triangle count, vertices in the source, positions offset,
+# triangles offset, format name, triangles per BVH chunk (0: no BVH), chunk
+# count, chunk boxes offset (all lower corners, then all upper corners),
+# levels of detail (0: none), their vertex count, triangle count, and
+# offsets of their positions, triangles, chunk offsets and errors
+FILE_HEADER = struct.Struct("<4sIQq32sQQQQQ16sQQQQQQQQQQ")
+# Arrays start on page boundaries so they map without copying
+ALIGNMENT = 4096
+# The fingerprint hashes this many bytes from the start and the end of the source
+SAMPLE_BYTES = 64 * 1024
+SUFFIX = ".mesh"
+
+log = logging.getLogger(__name__)
+
+def align_up(value, alignment):
+    return (value + alignment - 1) // alignment * alignment
+
+def source_key(path):
+    """(size, mtime_ns, fingerprint) identifying the current contents of the file at ``path``.
+
+    The fingerprint hashes the file's first and last SAMPLE_BYTES, which
+    catches files replaced by a copy with the same size and time without
+    reading gigabytes.
+    """
+    st = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        digest.update(f.read(SAMPLE_BYTES))
+        if st.st_size > SAMPLE_BYTES:
+            f.seek(max(SAMPLE_BYTES, st.st_size - SAMPLE_BYTES))
+            digest.update(f.read(SAMPLE_BYTES))
+    return st.st_size, st.st_mtime_ns, digest.digest()
+
+class MeshCache:
+    """Cached meshes as files in ``directory``, together at most ``max_bytes``.
+
+    Each source path has one entry, named after a hash of the path, which
+    is only used while the source's ``source_key`` still matches. Opening
+    an entry refreshes its modification time, and ``put`` deletes the least
+    recently used entries once the directory holds more than ``max_bytes``.
+    Entries are written to a temporary file and renamed into place, so
+    several threads and processes may share the directory.
+    """
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or CACHE_DIR
+        self.max_bytes = max_bytes
+
+    def entry_path(self, source):
+        name = hashlib.sha256(os.path.abspath(source).encode("utf-8", "surrogateescape")).hexdigest()[:32]
+        return os.path.join(self.directory, name + SUFFIX)
+
+    def get(self, source, key):
+        """MeshData of ``source`` with memory-mapped arrays, or None if the entry is missing or stale.
+
+        ``key`` is the source's current ``source_key``.
+        """
+        start = time.perf_counter()
+        path = self.entry_path(source)
+        try:
+            with open(path, "rb") as f:
+                header = f.read(FILE_HEADER.size)
+            entry_size = os.path.getsize(path)
+        except OSError:
+            return None
+        if len(header) < FILE_HEADER.size:
+            return None
+        (magic, version, size, mtime_ns, fingerprint, vertex_count, triangle_count, source_vertices,
+         positions_offset, triangles_offset, fmt, chunk_triangles, chunk_count, bounds_offset, level_count,
+         lod_vertices, lod_triangles, lod_positions_offset, lod_triangles_offset, lod_offsets_offset,
+         errors_offset) = FILE_HEADER.unpack(header)
+        if magic != FILE_MAGIC or version != FILE_VERSION or (size, mtime_ns, fingerprint) != key:
+            return None
+        coarser = max(level_count - 1, 0)
+        if entry_size < max(triangles_offset + triangle_count * 12, bounds_offset + chunk_count * 24,
+                            lod_positions_offset + lod_vertices * 12, lod_triangles_offset + lod_triangles * 12,
+                            lod_offsets_offset + coarser * (chunk_count + 1) * 8, errors_offset + coarser * 8):
+            # Truncated, e.g. by a full disk
+            return None
+        with span("open cached mesh"):
+            positions = _map(path, np.float32, positions_offset, vertex_count)
+            triangles = _map(path, np.uint32, triangles_offset, triangle_count)
+            data = MeshData(positions, triangles, source, fmt.rstrip(b"\0").decode(), size, source_vertices,
+                            cached=True)
+            if chunk_triangles:
+                # Read, not mapped: the boxes are small, and every cull reads them all
+                lo, hi = np.fromfile(path, np.float32, chunk_count * 6, offset=bounds_offset).reshape(2, chunk_count, 3)
+                data.bvh = MeshBVH(positions, triangles, chunk_triangles, chunk_bounds=(lo, hi))
+            if data.bvh is not None and level_count:
+                # Likewise the chunk offsets and errors; the levels are only read by the upload
+                built = (_map(path, np.float32, lod_positions_offset, lod_vertices),
+                         _map(path, np.uint32, lod_triangles_offset, lod_triangles),
+                         np.fromfile(path, np.int64, coarser * (chunk_count + 1), offset=lod_offsets_offset)
+                         .reshape(coarser, chunk_count + 1),
+                         np.fromfile(path, np.float64, coarser, offset=errors_offset))
+                data.lod = MeshLOD(positions, triangles, data.bvh, built=built)
+        self._touch(path)
+        data.seconds = time.perf_counter() - start
+        return data
+
+    def put(self, source, key, data):
+        """Store ``data``, imported from ``source`` while it had ``key``; returns the entry path or None.
+
+        ``data.bvh`` and ``data.lod``, if set, are stored with the mesh and
+        restored by ``get``; the levels of detail need the BVH. Meshes
+        larger than the whole cache are not stored.
+        """
+        positions = np.ascontiguousarray(data.positions, dtype=np.float32)
+        triangles = np.ascontiguousarray(data.triangles, dtype=np.uint32)
+        bvh = data.bvh
+        chunk_triangles = bvh.chunk_triangles if bvh is not None else 0
+        bounds = np.concatenate(bvh.levels[0]).astype(np.float32) if bvh is not None else np.empty((0, 3), np.float32)
+        lod = data.lod if bvh is not None else None
+        level_count = lod.level_count if lod is not None else 0
+        if lod is not None:
+            levels = [np.ascontiguousarray(lod.positions, dtype=np.float32),
+                      np.ascontiguousarray(lod.triangles, dtype=np.uint32),
+                      np.ascontiguousarray(lod.offsets, dtype=np.int64),
+                      np.ascontiguousarray(lod.errors, dtype=np.float64)]
+        else:
+            levels = [np.empty((0, 3), np.float32), np.empty((0, 3), np.uint32), np.empty(0, np.int64),
+                      np.empty(0, np.float64)]
+        arrays = [positions, triangles, bounds, *levels]
+        offsets = []
+        end = FILE_HEADER.size
+        for array in arrays:
+            offsets.append(align_up(end, ALIGNMENT))
+            end = offsets[-1] + array.nbytes
+        if end > self.max_bytes:
+            return None
+        size, mtime_ns, fingerprint = key
+        positions_offset, triangles_offset, bounds_offset, *levels_offsets = offsets
+        header = FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, size, mtime_ns, fingerprint, len(positions),
+                                  len(triangles), data.source_vertices, positions_offset, triangles_offset,
+                                  (data.format or "").encode()[:16], chunk_triangles, len(bounds) // 2,
+                                  bounds_offset, level_count, len(levels[0]), len(levels[1]), *levels_offsets)
+        path = self.entry_path(source)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with span("write cached mesh"), open(tmp, "wb") as f:
+                f.write(header)
+                for array, offset in zip(arrays, offsets):
+                    f.seek(offset)
+                    array.tofile(f)
+                # Empty arrays at the end still lie within the file
+                f.truncate(end)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        self.prune(keep=path)
+        return path
+
+    def prune(self, keep=None):
+        """Delete least recently used entries until the directory holds at most ``max_bytes``.
+
+        ``keep`` (a path) is never deleted. Open memory maps of deleted
+        entries stay valid.
+        """
+        try:
+            entries = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                       for entry in os.scandir(self.directory) if entry.name.endswith(SUFFIX)]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                log.warning("Could not evict cached mesh %s: %s", path, e)
+                continue
+            total -= size
+
+    @staticmethod
+    def _touch(path):
+        # The modification time orders entries for eviction; access times
+        # are not updated on many mounts
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+def _map(path, dtype, offset, rows):
+    if rows == 0:
+        return np.empty((0, 3), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(rows, 3))
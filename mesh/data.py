@@ -0,0 +1,82 @@
+"""
+data.py - Imported meshes as compact arrays, and vertex welding
+"""
+import numpy as np
+
+# Odd 64-bit multipliers mixing the three coordinate bit patterns into one key
+HASH_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+
+class MeshData:
+    """A triangle mesh as compact, C-contiguous arrays ready for GPU upload.
+
+    ``positions`` is (N, 3) float32 and ``triangles`` (M, 3) uint32; pass
+    them to vulkan.geometry.Mesh as they are. ``source_vertices`` is the
+    vertex count the file stored before welding. Meshes opened from the
+    mesh cache are ``cached``, and their arrays are read-only memory maps.
+    ``bvh`` and ``lod`` are the mesh.bvh.MeshBVH and mesh.lod.MeshLOD the
+    loader builds, or the mesh cache restores, for culling, picking and
+    levels of detail.
+    """
+    def __init__(self, positions, triangles, path=None, format=None, file_size=0, source_vertices=None, seconds=0.0,
+                 cached=False):
+        self.positions = positions
+        self.triangles = triangles
+        self.path = path
+        self.format = format
+        self.file_size = file_size
+        self.source_vertices = len(positions) if source_vertices is None else source_vertices
+        self.seconds = seconds
+        self.cached = cached
+        self.bvh = None
+        self.lod = None
+
+    @property
+    def vertex_count(self):
+        return len(self.positions)
+
+    @property
+    def triangle_count(self):
+        return len(self.triangles)
+
+    @property
+    def nbytes(self):
+        return self.positions.nbytes + self.triangles.nbytes
+
+    def bounds(self):
+        if not len(self.positions):
+            return np.zeros(3, np.float32), np.zeros(3, np.float32)
+        return self.positions.min(axis=0), self.positions.max(axis=0)
+
+def weld(positions, triangles):
+    """Merge vertices with identical coordinates and drop what the GPU would not use.
+
+    Vertices are grouped by a 64-bit hash of their coordinate bits, so one
+    integer per vertex is sorted instead of rows of three floats; a hash
+    collision is detected afterwards and falls back to grouping the exact
+    bytes. Unreferenced vertices and triangles that collapsed to a line or
+    point are removed, and vertices keep the order they first appear in so
+    neighbouring triangles stay close in memory. Returns (positions,
+    triangles) as C-contiguous float32 (N, 3) and uint32 (M, 3) arrays.
+    """
+    positions = np.ascontiguousarray(positions, dtype=np.float32).reshape(-1, 3)
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    # Adding zero turns -0.0 into 0.0, so the two weld together
+    bits = (positions + np.float32(0)).view(np.uint32)
+    keys = bits.astype(np.uint64) * HASH_MULTIPLIERS
+    keys = keys[:, 0] ^ keys[:, 1] ^ keys[:, 2]
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    if not np.array_equal(bits[first][inverse], bits):
+        rows = np.ascontiguousarray(bits).view(np.dtype((np.void, 12))).reshape(-1)
+        _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    # Renumber the groups by first appearance instead of hash order
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    triangles = rank[inverse.reshape(-1)][triangles]
+    keep = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 2] != triangles[:, 0])
+    triangles = triangles[keep]
+    used = np.zeros(len(order), dtype=bool)
+    used[triangles] = True
+    remap = np.cumsum(used, dtype=np.int64) - 1
+    positions = positions[first[order][used]]
+    return np.ascontiguousarray(positions), np.ascontiguousarray(remap[triangles], dtype=np.uint32)
@@ -0,0 +1,426 @@
+"""
+importers.py - OBJ, STL and Gmsh .msh readers, and the chunked parallel parsing they share
+
+``load_mesh`` picks the reader by file extension and returns a MeshData
+with welded vertices, its triangles in spatial order (mesh/bvh.py). ASCII input is split at line boundaries into chunks
+that the vectorized routines of mesh/text.py parse; inputs of at least
+PARALLEL_MIN_BYTES are parsed by a pool of worker processes. Progress is
+reported and cancellation honoured between chunks.
+"""
+import mmap
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from mesh import text
+from mesh.bvh import spatial_order
+from mesh.data import MeshData, weld
+from profiler import span
+
+# ASCII input is parsed in chunks of about this many bytes, cut at newlines
+CHUNK_BYTES = 8 * 1024 * 1024
+# Inputs at least this large are parsed by a process pool; below it,
+# starting the workers costs more than they save
+PARALLEL_MIN_BYTES = 48 * 1024 * 1024
+# Binary STL triangles read per step
+STL_BATCH = 1 << 20
+STL_RECORD = np.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+SLASH = ord("/")
+
+# Gmsh element type -> (nodes per element, shape); higher-order elements
+# list their corner nodes first, so only those are used
+ELEMENT_TYPES = {
+    1: (2, "line"), 2: (3, "triangle"), 3: (4, "quadrangle"), 4: (4, "tetrahedron"),
+    5: (8, "hexahedron"), 6: (6, "prism"), 7: (5, "pyramid"), 8: (3, "line"),
+    9: (6, "triangle"), 10: (9, "quadrangle"), 11: (10, "tetrahedron"), 12: (27, "hexahedron"),
+    13: (18, "prism"), 14: (14, "pyramid"), 15: (1, "point"), 16: (8, "quadrangle"),
+    17: (20, "hexahedron"), 18: (15, "prism"), 19: (13, "pyramid"),
+}
+# Faces of each shape as corner indices in Gmsh's node ordering
+SHAPE_FACES = {
+    "triangle": [(0, 1, 2)],
+    "quadrangle": [(0, 1, 2, 3)],
+    "tetrahedron": [(0, 2, 1), (0, 1, 3), (0, 3, 2), (1, 2, 3)],
+    "hexahedron": [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)],
+    "prism": [(0, 2, 1), (3, 4, 5), (0, 1, 4, 3), (1, 2, 5, 4), (2, 0, 3, 5)],
+    "pyramid": [(0, 3, 2, 1), (0, 1, 4), (1, 2, 4), (2, 3, 4), (3, 0, 4)],
+}
+VOLUME_SHAPES = {"tetrahedron", "hexahedron", "prism", "pyramid"}
+
+class LoadCancelled(Exception):
+    """Raised by load_mesh once its ``cancelled()`` callback returned true."""
+
+class ImportJob:
+    """One load_mesh call: the file, its callbacks, and the scheduling of its chunks."""
+    def __init__(self, path, progress=None, cancelled=None, workers=None):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.workers = workers or os.cpu_count() or 1
+        self._progress = progress
+        self._cancelled = cancelled
+
+    def report(self, fraction):
+        if self._progress is not None:
+            self._progress(min(1.0, fraction))
+
+    def check(self):
+        if self._cancelled is not None and self._cancelled():
+            raise LoadCancelled(self.path)
+
+    def line_chunks(self, start=0, end=None):
+        """Split bytes [start, end) of the file into (start, end) ranges ending at newlines."""
+        end = self.size if end is None else end
+        ranges = []
+        with open(self.path, "rb") as f:
+            while start < end:
+                cut = end if end - start <= CHUNK_BYTES else _next_line(f, start + CHUNK_BYTES, end)
+                ranges.append((start, cut))
+                start = cut
+        return ranges
+
+    def map(self, fn, ranges, lo=0.0, hi=1.0):
+        """``fn(path, start, end)`` of every range, in order, reporting progress from ``lo`` to ``hi``.
+
+        ``fn`` must be a module-level function so worker processes can
+        import it; it reads its range itself, so only results are pickled.
+        """
+        results = [None] * len(ranges)
+        total = sum(end - start for start, end in ranges) or 1
+        done = 0
+        if self.workers > 1 and len(ranges) > 1 and total >= PARALLEL_MIN_BYTES:
+            # Spawned, not forked: forking a process running Qt and loader threads is unsafe
+            pool = ProcessPoolExecutor(min(self.workers, len(ranges)), mp_context=multiprocessing.get_context("spawn"))
+            try:
+                futures = {pool.submit(fn, self.path, start, end): i for i, (start, end) in enumerate(ranges)}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    results[i] = future.result()
+                    done += ranges[i][1] - ranges[i][0]
+                    self.report(lo + (hi - lo) * done / total)
+                    self.check()
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+        else:
+            for i, (start, end) in enumerate(ranges):
+                self.check()
+                results[i] = fn(self.path, start, end)
+                done += end - start
+                self.report(lo + (hi - lo) * done / total)
+        return results
+
+def _next_line(f, offset, end):
+    """Offset just past the first newline at or after ``offset``, or ``end``."""
+    f.seek(offset)
+    while offset < end:
+        block = f.read(64 * 1024)
+        if not block:
+            break
+        newline = block.find(b"\n")
+        if newline >= 0:
+            return min(end, offset + newline + 1)
+        offset += len(block)
+    return end
+
+def read_range(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+def fan_triangulate(corners, counts):
+    """Split polygons into triangle fans.
+
+    ``corners`` lists the corners of all polygons back to back and
+    ``counts`` the number of corners of each. Returns the (T, 3) triangles
+    and the polygon each came from; polygons with fewer than three
+    corners produce none.
+    """
+    if len(counts) and np.all(counts == 3):
+        return corners.reshape(-1, 3), np.arange(len(counts))
+    fans = np.maximum(counts - 2, 0)
+    polygon = np.repeat(np.arange(len(counts)), fans)
+    step = np.arange(len(polygon)) - np.repeat(np.cumsum(fans) - fans, fans)
+    base = (np.cumsum(counts) - counts)[polygon]
+    return np.stack([corners[base], corners[base + step + 1], corners[base + step + 2]], axis=1), polygon
+
+def leading_columns(rows, columns, dtype):
+    """The first ``columns`` numbers of each row; rows may hold more (OBJ vertex colours, w)."""
+    counts = text.tokens_per_row(rows)
+    values = text.parse_numbers(rows)
+    if len(values) != counts.sum() or np.any(counts < columns):
+        raise ValueError(f"malformed line: expected at least {columns} numbers per line")
+    if np.all(counts == columns):
+        return values.reshape(-1, columns).astype(dtype)
+    return values[(np.cumsum(counts) - counts)[:, None] + np.arange(columns)].astype(dtype)
+
+def reference_suffixes(rows):
+    """Mask of the "/texture/normal" part of each OBJ face reference in ``rows``."""
+    index = np.arange(len(rows))
+    last_slash = np.maximum.accumulate(np.where(rows == SLASH, index, -1))
+    last_space = np.maximum.accumulate(np.where(text.is_space(rows), index, -1))
+    return last_slash > last_space
+
+def _obj_chunk(path, start, end):
+    """Vertices and triangulated faces of one chunk of an OBJ file.
+
+    Face indices are returned as written: 1-based, or relative if
+    negative. Chunks with negative indices also return, per triangle, the
+    number of the chunk's vertices preceding its face, otherwise None.
+    """
+    buf = text.as_buffer(read_range(path, start, end))
+    newlines = np.flatnonzero(buf == text.LF)
+    rows, vertex_pos = text.keyword_rows(buf, newlines, b"v", indented=True)
+    positions = leading_columns(rows, 3, np.float32)
+    rows, face_pos = text.keyword_rows(buf, newlines, b"f", indented=True)
+    counts = text.tokens_per_row(rows)
+    if np.any(rows == SLASH):
+        rows[reference_suffixes(rows)] = text.SPACE
+    corners = text.parse_numbers(rows, np.int64)
+    if len(corners) != counts.sum():
+        raise ValueError("malformed face line")
+    triangles, polygon = fan_triangulate(corners, counts)
+    before = None
+    if np.any(triangles < 0):
+        before = np.searchsorted(vertex_pos, face_pos)[polygon]
+    return positions, triangles, before
+
+def read_obj(job):
+    positions, triangles = [], []
+    offset = 0
+    for chunk_positions, chunk_triangles, before in job.map(_obj_chunk, job.line_chunks(), 0.0, 0.85):
+        resolved = chunk_triangles - 1
+        if before is not None:
+            negative = chunk_triangles < 0
+            resolved[negative] = (chunk_triangles + (offset + before)[:, None])[negative]
+        positions.append(chunk_positions)
+        triangles.append(resolved)
+        offset += len(chunk_positions)
+    positions = np.concatenate(positions) if positions else np.empty((0, 3), np.float32)
+    triangles = np.concatenate(triangles) if triangles else np.empty((0, 3), np.int64)
+    if len(triangles) and (triangles.min() < 0 or triangles.max() >= len(positions)):
+        raise ValueError(f"face index out of range for {len(positions)} vertices")
+    return positions, triangles, "OBJ"
+
+def _stl_chunk(path, start, end):
+    buf = text.as_buffer(read_range(path, start, end))
+    rows, _ = text.keyword_rows(buf, np.flatnonzero(buf == text.LF), b"vertex", indented=True)
+    return text.numbers_table(rows, 3, np.float32)
+
+def read_stl(job):
+    with open(job.path, "rb") as f:
+        header = f.read(84)
+    # Binary files may also start with "solid", so the size decides
+    if len(header) == 84 and 84 + 50 * int.from_bytes(header[80:84], "little") == job.size:
+        return _read_binary_stl(job)
+    if not header.lstrip().startswith(b"solid"):
+        raise ValueError("neither a binary nor an ASCII STL file")
+    chunks = job.map(_stl_chunk, job.line_chunks(), 0.0, 0.85)
+    positions = np.concatenate(chunks) if chunks else np.empty((0, 3), np.float32)
+    if len(positions) % 3:
+        raise ValueError("facet without three vertices")
+    return positions, np.arange(len(positions)).reshape(-1, 3), "ASCII STL"
+
+def _read_binary_stl(job):
+    count = (job.size - 84) // STL_RECORD.itemsize
+    positions = np.empty((count * 3, 3), dtype=np.float32)
+    with open(job.path, "rb") as f:
+        f.seek(84)
+        for start in range(0, count, STL_BATCH):
+            job.check()
+            records = np.fromfile(f, dtype=STL_RECORD, count=min(STL_BATCH, count - start))
+            positions[start * 3:(start + len(records)) * 3] = records["vertices"].reshape(-1, 3)
+            job.report(0.85 * (start + len(records)) / count)
+    return positions, np.arange(count * 3).reshape(-1, 3), "binary STL"
+
+def _float_chunk(path, start, end):
+    return text.parse_numbers(text.as_buffer(read_range(path, start, end)))
+
+def _int_chunk(path, start, end):
+    return text.parse_numbers(text.as_buffer(read_range(path, start, end)), np.int64)
+
+def _int_rows_chunk(path, start, end):
+    rows = text.as_buffer(read_range(path, start, end))
+    return text.parse_numbers(rows, np.int64), text.tokens_per_row(rows)
+
+def _sections(job, names):
+    """(start, end) of the body of each $Name ... $EndName section, or None if absent."""
+    found = {}
+    with open(job.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for name in names:
+            start = data.find(b"$" + name + b"\n")
+            if start < 0:
+                start = data.find(b"$" + name + b"\r\n")
+            if start < 0:
+                found[name] = None
+                continue
+            start = data.find(b"\n", start) + 1
+            end = data.find(b"$End" + name, start)
+            if end < 0:
+                raise ValueError(f"${name.decode()} section is not terminated")
+            found[name] = (start, end)
+    return found
+
+def read_msh(job):
+    sections = _sections(job, (b"MeshFormat", b"Nodes", b"Elements"))
+    if sections[b"MeshFormat"] is None:
+        raise ValueError("not a Gmsh .msh file: no $MeshFormat section")
+    start, end = sections[b"MeshFormat"]
+    fields = read_range(job.path, start, end).split()
+    version = fields[0].decode()
+    if len(fields) > 1 and fields[1] != b"0":
+        raise ValueError("binary .msh files are not supported; save the mesh as ASCII")
+    if version.split(".")[0] not in ("2", "4"):
+        raise ValueError(f"unsupported .msh version {version}")
+    if sections[b"Nodes"] is None or sections[b"Elements"] is None:
+        raise ValueError("missing $Nodes or $Elements section")
+    if version.startswith("2"):
+        tags, positions = _msh2_nodes(job, *sections[b"Nodes"])
+        blocks = _msh2_elements(job, *sections[b"Elements"])
+    else:
+        tags, positions = _msh4_nodes(job, *sections[b"Nodes"])
+        blocks = _msh4_elements(job, *sections[b"Elements"])
+    job.check()
+    lookup = np.full(int(tags.max()) + 1 if len(tags) else 1, -1, dtype=np.int64)
+    lookup[tags] = np.arange(len(tags))
+    triangles = outer_surface(blocks)
+    if len(triangles) and (triangles.max() >= len(lookup) or np.any(lookup[triangles] < 0)):
+        raise ValueError("element refers to an undefined node")
+    job.report(0.9)
+    return positions, lookup[triangles], f"Gmsh {version}"
+
+def _msh2_nodes(job, start, end):
+    values = np.concatenate(job.map(_float_chunk, job.line_chunks(start, end), 0.0, 0.4))
+    count = int(values[0]) if len(values) else 0
+    if len(values) != 1 + 4 * count:
+        raise ValueError(f"expected {count} nodes of 4 numbers in $Nodes")
+    table = values[1:].reshape(count, 4)
+    return table[:, 0].astype(np.int64), table[:, 1:].astype(np.float32)
+
+def _msh2_elements(job, start, end):
+    """(element type, (n, nodes) tags) blocks of a version 2 $Elements section."""
+    chunks = job.map(_int_rows_chunk, job.line_chunks(start, end), 0.4, 0.8)
+    values = np.concatenate([values for values, _ in chunks])
+    counts = np.concatenate([counts for _, counts in chunks])
+    counts = counts[counts > 0]
+    if len(values) != counts.sum():
+        raise ValueError("malformed $Elements section")
+    # Skip the element count line; rows are: tag type tag-count tags... nodes...
+    first = (np.cumsum(counts) - counts)[1:]
+    counts = counts[1:]
+    types = values[first + 1]
+    node_start = first + 3 + values[first + 2]
+    blocks = []
+    for element_type in np.unique(types).tolist():
+        nodes, _ = _element_type(element_type)
+        selected = types == element_type
+        if np.any(counts[selected] != node_start[selected] - first[selected] + nodes):
+            raise ValueError(f"wrong node count for elements of type {element_type}")
+        blocks.append((element_type, values[node_start[selected][:, None] + np.arange(nodes)]))
+    return blocks
+
+def _msh4_nodes(job, start, end):
+    values = np.concatenate(job.map(_float_chunk, job.line_chunks(start, end), 0.0, 0.4))
+    block_count = int(values[0])
+    tags, positions = [], []
+    i = 4
+    for _ in range(block_count):
+        entity_dim, parametric, count = int(values[i]), int(values[i + 2]), int(values[i + 3])
+        i += 4
+        tags.append(values[i:i + count].astype(np.int64))
+        i += count
+        width = 3 + (entity_dim if parametric else 0)
+        positions.append(values[i:i + count * width].reshape(count, width)[:, :3].astype(np.float32))
+        i += count * width
+    if i != len(values):
+        raise ValueError("malformed $Nodes section")
+    if not tags:
+        return np.empty(0, np.int64), np.empty((0, 3), np.float32)
+    return np.concatenate(tags), np.concatenate(positions)
+
+def _msh4_elements(job, start, end):
+    """(element type, (n, nodes) tags) blocks of a version 4 $Elements section."""
+    values = np.concatenate(job.map(_int_chunk, job.line_chunks(start, end), 0.4, 0.8))
+    block_count = int(values[0])
+    blocks = []
+    i = 4
+    for _ in range(block_count):
+        element_type, count = int(values[i + 2]), int(values[i + 3])
+        i += 4
+        nodes, _ = _element_type(element_type)
+        # Rows are: element tag, then its nodes
+        table = values[i:i + count * (1 + nodes)].reshape(count, 1 + nodes)
+        blocks.append((element_type, table[:, 1:]))
+        i += count * (1 + nodes)
+    if i != len(values):
+        raise ValueError("malformed $Elements section")
+    return blocks
+
+def _element_type(element_type):
+    try:
+        return ELEMENT_TYPES[element_type]
+    except KeyError:
+        raise ValueError(f"unsupported Gmsh element type {element_type}") from None
+
+def outer_surface(blocks):
+    """Triangles (node tags) showing the elements of ``blocks``.
+
+    Surface elements are drawn as they are. Of volume elements only the
+    faces on the outside are drawn, i.e. faces no other volume element
+    shares; faces also listed as surface elements are drawn once.
+    """
+    surface = {3: [], 4: []}
+    volume = {3: [], 4: []}
+    for element_type, nodes in blocks:
+        _, shape = ELEMENT_TYPES[element_type]
+        for face in SHAPE_FACES.get(shape, ()):
+            (volume if shape in VOLUME_SHAPES else surface)[len(face)].append(nodes[:, face])
+    triangles = []
+    for corners in (3, 4):
+        faces = [np.concatenate(surface[corners])] if surface[corners] else []
+        if volume[corners]:
+            faces.append(_unshared(np.concatenate(volume[corners])))
+        if not faces:
+            continue
+        faces = _distinct(np.concatenate(faces))
+        triangles.append(fan_triangulate(faces.reshape(-1), np.full(len(faces), corners))[0])
+    return np.concatenate(triangles) if triangles else np.empty((0, 3), np.int64)
+
+def _face_keys(faces):
+    """One comparable key per face, equal for faces with the same corners in any order."""
+    corners = np.ascontiguousarray(np.sort(faces, axis=1), dtype=np.int64)
+    return corners.view(np.dtype((np.void, corners.itemsize * corners.shape[1]))).reshape(-1)
+
+def _unshared(faces):
+    _, first, counts = np.unique(_face_keys(faces), return_index=True, return_counts=True)
+    return faces[np.sort(first[counts == 1])]
+
+def _distinct(faces):
+    _, first = np.unique(_face_keys(faces), return_index=True)
+    return faces[np.sort(first)]
+
+READERS = {".obj": read_obj, ".stl": read_stl, ".msh": read_msh}
+
+def load_mesh(path, progress=None, cancelled=None, workers=None):
+    """Read the mesh file at ``path`` into a MeshData.
+
+    ``progress(fraction)`` is called as the import advances and
+    ``cancelled()`` is polled between chunks; once it returns true,
+    LoadCancelled is raised. ``workers`` caps the parsing processes
+    (default: one per CPU). Raises ValueError for unsupported or malformed
+    files and OSError if the file cannot be read.
+    """
+    start = time.perf_counter()
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError(f"unsupported mesh file {os.path.basename(path)!r}; expected {', '.join(READERS)}")
+    job = ImportJob(path, progress, cancelled, workers)
+    with span("parse mesh", path=os.path.basename(path)):
+        positions, triangles, fmt = reader(job)
+    job.check()
+    with span("weld vertices"):
+        welded, triangles = weld(positions, triangles)
+    job.check()
+    with span("sort triangles spatially"):
+        welded, triangles = spatial_order(welded, triangles)
+    job.report(1.0)
+    return MeshData(welded, triangles, path, fmt, job.size, len(positions), time.perf_counter() - start)
@@ -0,0 +1,163 @@
+"""
+lod.py - Coarser levels of detail per BVH chunk, by vertex clustering, and their selection by screen-space error
+
+Each level snaps the mesh's vertices to a grid of cubic cells, anchored at
+the mesh's corner, and replaces the vertices of a cell by their mean.
+Triangles whose corners end up in fewer than three cells disappear, and
+the rest of each chunk's triangles form that chunk's level. Cells double in size from one
+level to the next, starting at twice the spacing of a typical chunk's
+vertices, so each level has about a quarter of the triangles of the one
+below. The grid is shared by all chunks, so neighbouring chunks drawn at
+the same level meet without cracks.
+
+A level's geometric error is bounded by its cell diagonal: no vertex moved
+further. Projected to the screen at a chunk's distance from the eye, that
+error picks the coarsest level of each chunk within a pixel tolerance.
+"""
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from mesh.bvh import chunk_runs, indirect_commands
+
+# Coarser levels per chunk; the last has cells of half a typical chunk's extent
+LEVELS = 5
+# Triangles remapped per task of the first level
+REMAP_BATCH = 1 << 20
+
+def unique_cells(cells):
+    """(cluster of each row, cell of each cluster) for rows of integer cell coordinates ``cells``."""
+    dims = cells.max(axis=0) + 1
+    keys = cells[:, 0] + dims[0] * (cells[:, 1] + dims[1] * cells[:, 2])
+    _, first, cluster = np.unique(keys, return_index=True, return_inverse=True)
+    return cluster.reshape(-1).astype(np.uint32), cells[first]
+
+def nondegenerate(corners):
+    return (corners[:, 0] != corners[:, 1]) & (corners[:, 1] != corners[:, 2]) & (corners[:, 0] != corners[:, 2])
+
+def drop_repeats(corners, chunks):
+    """``corners`` and ``chunks`` without degenerate triangles and repeats (in any winding) within a chunk.
+
+    The triangles left keep their order, so they stay grouped by chunk.
+    """
+    keep = nondegenerate(corners)
+    corners, chunks = corners[keep], chunks[keep]
+    rows = np.sort(corners, axis=1)
+    order = np.lexsort((rows[:, 2], rows[:, 1], rows[:, 0], chunks))
+    sorted_rows, sorted_chunks = rows[order], chunks[order]
+    repeat = np.zeros(len(order), dtype=bool)
+    repeat[1:] = np.all(sorted_rows[1:] == sorted_rows[:-1], axis=1) & (sorted_chunks[1:] == sorted_chunks[:-1])
+    keep = np.sort(order[~repeat])
+    return corners[keep], chunks[keep]
+
+def compact(centres, corners):
+    """(positions, triangles) of the clusters ``corners`` uses, numbered densely in cluster order."""
+    used = np.zeros(len(centres), dtype=bool)
+    used[corners.reshape(-1)] = True
+    renumber = np.cumsum(used, dtype=np.int64).astype(np.uint32) - 1
+    return centres[used].astype(np.float32), renumber[corners]
+
+class MeshLOD:
+    """Coarser levels of each chunk of ``bvh`` (mesh.bvh.MeshBVH over ``positions`` and ``triangles``).
+
+    The levels' vertices (``positions``) and triangles (``triangles``) go
+    after the mesh's own in its vertex and index buffers, and their indices
+    already count the mesh's vertices. Level 0 is the mesh itself; the
+    triangles of chunk ``c`` at level ``l`` >= 1 are ``offsets[l - 1][c]``
+    up to ``offsets[l - 1][c + 1]`` in the combined index buffer, and
+    ``errors[l - 1]`` bounds how far level ``l`` moved any vertex.
+
+    Only the first level reads the whole mesh; its triangles are remapped
+    in batches of chunks on ``workers`` threads (default: one per CPU).
+    Each further level merges the cells of the one below in pairs along
+    every axis, so it is built from that level's clusters and triangles.
+    ``built``, the (``positions``, ``triangles``, ``offsets``, ``errors``)
+    of an earlier build over the same mesh and BVH, skips building them.
+    """
+    def __init__(self, positions, triangles, bvh, workers=None, built=None):
+        self.bvh = bvh
+        self.positions, self.triangles, self.offsets, self.errors = built or self._build(positions, triangles, workers)
+        self.level_count = len(self.offsets) + 1
+
+    def _build(self, positions, triangles, workers):
+        bvh = self.bvh
+        lo, hi = bvh.levels[0]
+        extent = float(np.median((hi - lo).max(axis=1))) if len(lo) else 0.0
+        # A chunk of n triangles on a surface is about sqrt(n) vertices across
+        cell = 2 * extent / math.sqrt(bvh.chunk_triangles)
+        levels = []
+        if extent > 0:
+            cells = np.floor((positions - positions.min(axis=0)) / cell).astype(np.int64)
+            cluster, cells = unique_cells(cells)
+            counts = np.bincount(cluster).astype(np.float64)
+            sums = np.stack([np.bincount(cluster, weights=positions[:, axis], minlength=len(counts))
+                             for axis in range(3)], axis=1)
+
+            def remap(start):
+                corners = cluster[triangles[start:start + REMAP_BATCH]]
+                keep = np.flatnonzero(nondegenerate(corners))
+                return corners[keep], ((keep + start) // bvh.chunk_triangles).astype(np.uint32)
+
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+                batches = list(pool.map(remap, range(0, len(triangles), REMAP_BATCH)))
+            corners = np.concatenate([corners for corners, _ in batches])
+            chunks = np.concatenate([chunks for _, chunks in batches])
+            for level in range(LEVELS):
+                if level:
+                    parent, cells = unique_cells(cells // 2)
+                    counts, sums = np.bincount(parent, weights=counts), np.stack(
+                        [np.bincount(parent, weights=sums[:, axis]) for axis in range(3)], axis=1)
+                    corners = parent[corners]
+                corners, chunks = drop_repeats(corners, chunks)
+                levels.append((*compact(sums / counts[:, None], corners), chunks))
+        errors = cell * 2.0 ** np.arange(len(levels)) * math.sqrt(3)
+        offsets = np.empty((len(levels), bvh.chunk_count + 1), dtype=np.int64)
+        vertex_base, triangle_base = len(positions), len(triangles)
+        all_positions, all_triangles = [], []
+        for level, (level_positions, level_triangles, chunks) in enumerate(levels):
+            offsets[level, 0] = triangle_base
+            offsets[level, 1:] = triangle_base + np.cumsum(np.bincount(chunks, minlength=bvh.chunk_count))
+            all_positions.append(level_positions)
+            all_triangles.append(level_triangles + np.uint32(vertex_base))
+            vertex_base += len(level_positions)
+            triangle_base += len(level_triangles)
+        all_positions = np.concatenate(all_positions) if levels else np.empty((0, 3), np.float32)
+        all_triangles = np.concatenate(all_triangles) if levels else np.empty((0, 3), np.uint32)
+        return all_positions, all_triangles, offsets, errors
+
+    @property
+    def nbytes(self):
+        return self.positions.nbytes + self.triangles.nbytes
+
+    def level_triangles(self):
+        """Triangle count of the whole mesh at each level, full detail first."""
+        return [self.bvh.triangle_count] + [int(offsets[-1] - offsets[0]) for offsets in self.offsets]
+
+    def select(self, eye, pixels_per_unit, tolerance):
+        """Level of each chunk: the coarsest whose error, seen from ``eye``, covers at most ``tolerance`` pixels.
+
+        ``pixels_per_unit`` is what one world unit covers on screen at
+        distance 1 (Camera.pixels_per_unit). Chunks around the eye get full
+        detail.
+        """
+        lo, hi = self.bvh.levels[0]
+        eye = np.asarray(eye, dtype=np.float64)
+        distance = np.linalg.norm(np.maximum(np.maximum(lo - eye, eye - hi), 0.0), axis=1)
+        with np.errstate(divide="ignore"):
+            pixels = self.errors[:, None] * pixels_per_unit / distance
+        # Errors grow with the level, so the levels within tolerance are 1..n
+        return np.count_nonzero(pixels <= tolerance, axis=0)
+
+    def draw_commands(self, visible, levels):
+        """VkDrawIndexedIndirectCommand array drawing the chunks of mask ``visible`` at ``levels``.
+
+        Runs of consecutive visible chunks at the same level are merged
+        into one command.
+        """
+        commands = [self.bvh.draw_commands(visible & (levels == 0))]
+        for level, offsets in enumerate(self.offsets, start=1):
+            starts, ends = chunk_runs(visible & (levels == level))
+            first, last = offsets[starts], offsets[ends]
+            drawn = last > first
+            commands.append(indirect_commands(first[drawn], last[drawn]))
+        return np.concatenate(commands)
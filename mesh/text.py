@@ -0,0 +1,88 @@
+"""
+text.py - Vectorized scanning of line-oriented ASCII mesh files
+
+A file (or chunk of one) is handled as a uint8 array: keyword lines are
+found with array comparisons, their bytes gathered with one fancy index
+and their numbers parsed in C by ``np.fromstring``, so no Python code runs
+per line.
+"""
+import warnings
+import numpy as np
+
+SPACE, TAB, LF, CR = 32, 9, 10, 13
+
+def as_buffer(data):
+    """``data`` (bytes-like) as a uint8 array that ends with a newline."""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if len(buf) == 0 or buf[-1] != LF:
+        buf = np.append(buf, np.uint8(LF))
+    return buf
+
+def is_space(data):
+    return (data == SPACE) | (data == TAB) | (data == LF) | (data == CR)
+
+def keyword_positions(buf, keyword, indented=False):
+    """Offsets in ``buf`` where ``keyword`` (bytes) is the first token of a line.
+
+    The keyword must be followed by a space or tab. Unless ``indented``,
+    it must also start the line; otherwise spaces and tabs may precede it.
+    """
+    k = len(keyword)
+    # buf ends with a newline, so pos + k is always in range
+    pos = np.flatnonzero(buf[:len(buf) - k] == keyword[0])
+    for i in range(1, k):
+        pos = pos[buf[pos + i] == keyword[i]]
+    after = buf[pos + k]
+    pos = pos[(after == SPACE) | (after == TAB)]
+    # buf[-1] is a newline, which stands in for the byte before offset 0
+    before = pos - 1
+    if indented:
+        # Step back over the indentation, one byte for all candidates at a time
+        blank = np.flatnonzero((buf[before] == SPACE) | (buf[before] == TAB))
+        while len(blank):
+            before[blank] -= 1
+            blank = blank[(buf[before[blank]] == SPACE) | (buf[before[blank]] == TAB)]
+    return pos[buf[before] == LF]
+
+def gather(buf, starts, ends):
+    """The bytes of the ranges [starts, ends) of ``buf``, concatenated."""
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    return buf[np.arange(offsets[-1] + lengths[-1] if len(lengths) else 0) + np.repeat(starts - offsets, lengths)]
+
+def keyword_rows(buf, newlines, keyword, indented=False):
+    """The rest of each line starting with ``keyword``, as newline-terminated rows in one uint8 array.
+
+    ``newlines`` are the offsets of every newline in ``buf``. Also returns
+    the keyword offsets, which order rows of different keywords.
+    """
+    pos = keyword_positions(buf, keyword, indented)
+    starts = pos + len(keyword)
+    ends = newlines[np.searchsorted(newlines, starts)] + 1
+    return gather(buf, starts, ends), pos
+
+def parse_numbers(rows, dtype=np.float64):
+    """Every whitespace-separated number in ``rows`` (uint8 array) as a flat array."""
+    if len(rows) == 0:
+        return np.empty(0, dtype=dtype)
+    # A bad token ends the parse early; callers compare the count they got
+    # with the count they expected, so NumPy's warning about it is noise
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return np.fromstring(rows.tobytes(), dtype=dtype, sep=" ")
+
+def tokens_per_row(rows):
+    """Number of whitespace-separated tokens on each newline-terminated row of ``rows``."""
+    space = is_space(rows)
+    rows_done = np.cumsum(rows == LF, dtype=np.int32)
+    token_start = ~space
+    token_start[1:] &= space[:-1]
+    return np.bincount(rows_done[token_start], minlength=int(rows_done[-1]) if len(rows) else 0)
+
+def numbers_table(rows, columns, dtype=np.float64):
+    """Parse rows holding exactly ``columns`` numbers each into an (n, columns) array."""
+    values = parse_numbers(rows, dtype)
+    row_count = int(np.count_nonzero(rows == LF))
+    if len(values) != row_count * columns:
+        raise ValueError(f"expected {columns} numbers on each of {row_count} lines, found {len(values)} numbers")
+    return values.reshape(row_count, columns)
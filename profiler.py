@@ -0,0 +1,196 @@
+"""
+profiler.py - Built-in startup and interaction profiling (main.py --profile)
+
+Records spans (module imports, window and tab constructors, Vulkan setup
+steps) and event-loop stalls, and writes them as a Chrome trace: open the
+JSON file in chrome://tracing or https://ui.perfetto.dev. Instrumented code
+calls ``span``, which costs one global lookup while profiling is off.
+
+This module only imports the standard library at load time, so it can be
+started before anything else is imported.
+"""
+import builtins
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# The event loop counts as stalled when a heartbeat arrives this late (seconds)
+HEARTBEAT_INTERVAL = 0.010
+STALL_THRESHOLD = 0.050
+# Spans listed per category in the printed summary
+SUMMARY_TOP = 15
+
+class Profiler:
+    """Collects trace events; timestamps are microseconds since ``start``."""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.events = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._import = None
+
+    def _now(self):
+        return (time.perf_counter() - self.start) * 1e6
+
+    def add(self, name, category, begin, end, args=None):
+        """Record a complete span between two ``_now()`` timestamps."""
+        event = {"name": name, "cat": category, "ph": "X", "ts": begin, "dur": end - begin,
+                 "pid": self._pid, "tid": threading.get_ident()}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name, category="app", **args):
+        begin = self._now()
+        try:
+            yield
+        finally:
+            self.add(name, category, begin, self._now(), args)
+
+    def instant(self, name, category="app", **args):
+        event = {"name": name, "cat": category, "ph": "i", "s": "p", "ts": self._now(),
+                 "pid": self._pid, "tid": threading.get_ident()}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def trace_imports(self):
+        """Record a span for every module imported from now on, nested as imported."""
+        original = builtins.__import__
+        modules = sys.modules
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            # Only first imports by absolute name cost anything worth recording
+            if level or name in modules:
+                return original(name, globals, locals, fromlist, level)
+            begin = self._now()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self.add(name, "import", begin, self._now())
+
+        self._import = original
+        builtins.__import__ = timed_import
+
+    def stop_tracing_imports(self):
+        if self._import is not None:
+            builtins.__import__ = self._import
+            self._import = None
+
+    def report(self):
+        """The trace as a dict in the Chrome trace event format."""
+        with self._lock:
+            events = list(self.events)
+        events.append({"name": "process_name", "ph": "M", "pid": self._pid,
+                       "args": {"name": os.path.basename(sys.argv[0]) or "python"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f)
+
+    def summary(self):
+        """Text lines: the slowest imports and spans, and the event-loop stalls."""
+        with self._lock:
+            spans = [e for e in self.events if e["ph"] == "X"]
+        lines = []
+        for category, title in (("import", "Slowest imports"), ("app", "Slowest spans")):
+            found = sorted((e for e in spans if e["cat"] == category), key=lambda e: -e["dur"])
+            if found:
+                lines.append(f"{title}:")
+                lines += [f"  {e['dur'] / 1000:9.1f} ms  {e['name']}" for e in found[:SUMMARY_TOP]]
+        stalls = [e["dur"] for e in spans if e["cat"] == "stall"]
+        if stalls:
+            lines.append(f"Event loop stalls: {len(stalls)}, longest {max(stalls) / 1000:.1f} ms, "
+                         f"total {sum(stalls) / 1000:.1f} ms")
+        return lines
+
+class StallMonitor:
+    """Records event-loop stalls from the gaps between heartbeats of a GUI-thread timer."""
+    def __init__(self, profiler, parent=None):
+        from PySide6.QtCore import QTimer, Qt
+        self.profiler = profiler
+        self._last = profiler._now()
+        self.timer = QTimer(parent)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._beat)
+        self.timer.start(int(HEARTBEAT_INTERVAL * 1000))
+
+    def _beat(self):
+        now = self.profiler._now()
+        late = now - self._last - HEARTBEAT_INTERVAL * 1e6
+        if late > STALL_THRESHOLD * 1e6:
+            self.profiler.add("event loop stall", "stall", self._last, now, {"late_ms": round(late / 1000, 1)})
+        self._last = now
+
+_profiler = None
+
+def start(trace_imports=True):
+    """Start profiling this process; returns the Profiler."""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+        if trace_imports:
+            _profiler.trace_imports()
+    return _profiler
+
+def active():
+    """The running Profiler, or None."""
+    return _profiler
+
+def span(name, category="app", **args):
+    """Context manager recording ``name`` while profiling; does nothing otherwise."""
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _profiler.span(name, category, **args)
+
+def instant(name, category="app", **args):
+    """Mark a moment in the trace while profiling."""
+    if _profiler is not None:
+        _profiler.instant(name, category, **args)
+
+def profiled(name=None):
+    """Decorator recording every call of a function (e.g. a constructor) as a span."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with _profiler.span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def watch_event_loop(parent=None):
+    """Record event-loop stalls for as long as ``parent`` (a QObject) lives."""
+    if _profiler is None:
+        return None
+    return StallMonitor(_profiler, parent)
+
+def finish(path=None):
+    """Stop profiling, write the trace to ``path`` and print a summary. Returns the path."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+    profiler.stop_tracing_imports()
+    if path is None:
+        from settings import get_setting, get_timestamp
+        directory = get_setting("log_spool.directory", "logs")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"profile_{get_timestamp()}.json")
+    profiler.write(path)
+    # The log window may already be gone when the application quits
+    for line in profiler.summary():
+        print(line, file=sys.stderr)
+    print(f"Profile written to {path}", file=sys.stderr)
+    return path
@@ -1,18 +1,39 @@
 """
 settings.py - Application settings management for Vulkan GUI
 """
+import atexit
+import copy
 import json
+import logging
 import os
+import threading
+import time
 from datetime import datetime
 
 SETTINGS_FILE = "settings.json"
+# Reads check settings.json for outside edits at most this often (seconds)
+RELOAD_CHECK_INTERVAL = 1.0
+# Saves are written once no other save was requested for SAVE_DELAY seconds,
+# but never later than SAVE_MAX_DELAY after the first pending one
+SAVE_DELAY = 0.5
+SAVE_MAX_DELAY = 2.0
 
 DEFAULT_SETTINGS = {
     "theme": "dark",
+    "theme_backend": "qss",
     "recent_files": [],
+    "recent_files_limit": 200,
+    "recent_projects": {},
     "performance": {
         "vsync": True,
-        "max_fps": 60
+        "max_fps": 60,
+        "frames_in_flight": 2,
+        "frustum_culling": True,
+        "level_of_detail": True
+    },
+    "viewports": {
+        "panes": 1,
+        "link_cameras": True
     },
     "debug_overlay": {
         "show_fps": True,
@@ -20,43 +41,347 @@ DEFAULT_SETTINGS = {
         "show_device_info": False,
         "enabled": True
     },
-    "log_level": "info"
+    "log_level": "info",
+    "log_retention": 100000,
+    "log_spool": {
+        "enabled": True,
+        "directory": "logs",
+        "segment_mb": 64,
+        "max_mb": 1024,
+        "sessions": 10
+    },
+    "mesh_cache": {
+        "enabled": True,
+        "directory": "",
+        "max_mb": 4096
+    }
 }
 
-def load_settings():
-    """Load settings from disk, merging with defaults."""
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE, "r") as f:
+def _merge(d, default):
+    """Fill in missing keys of ``d`` from ``default``, recursively."""
+    for k, v in default.items():
+        if k not in d:
+            d[k] = copy.deepcopy(v)
+        elif isinstance(v, dict) and isinstance(d[k], dict):
+            _merge(d[k], v)
+    return d
+
+def _flatten(d, prefix=""):
+    """Map every leaf of nested dict ``d`` to its dotted key."""
+    flat = {}
+    for k, v in d.items():
+        if isinstance(v, dict):
+            flat.update(_flatten(v, f"{prefix}{k}."))
+        else:
+            flat[f"{prefix}{k}"] = copy.deepcopy(v)
+    return flat
+
+class SettingsStore:
+    """Process-wide settings, parsed once and served from memory.
+
+    All windows share one settings dict. ``settings.json`` is only read
+    again when its mtime changed, which reads check at most once every
+    RELOAD_CHECK_INTERVAL seconds. Keys are dotted paths into the nested
+    dict, e.g. ``"performance.max_fps"``.
+
+    Callbacks registered with ``subscribe`` receive the new value of their
+    key after it changed through ``set``, ``commit`` or a reload. A key
+    also matches changes below it (``"performance"`` for
+    ``"performance.vsync"``). Callbacks run on the thread making the
+    change; only reads on the main (GUI) thread check for a reload, so
+    reloads always notify there.
+
+    ``save`` is write-behind: it serializes the settings on the calling
+    thread and returns, and a background thread writes the newest
+    serialization once saves stop arriving. Unchanged settings are not
+    written. Files are replaced atomically, so a crash leaves either the
+    old or the new settings. ``flush`` waits for the pending write.
+    """
+    def __init__(self, path=SETTINGS_FILE):
+        self.path = path
+        self._data = None
+        self._flat = {}
+        self._mtime = None
+        self._next_check = 0.0
+        self._subscribers = {}
+        self._lock = threading.RLock()
+        # Write-behind state, guarded by _cond
+        self._cond = threading.Condition()
+        self._pending = None
+        self._persisted = None
+        self._first_request = 0.0
+        self._due = 0.0
+        self._writing = False
+        self._flushing = False
+        self._writer = None
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def read_file(self):
+        """Parse settings.json merged with the defaults, bypassing the cache."""
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                try:
+                    return _merge(json.load(f), DEFAULT_SETTINGS)
+                except Exception as e:
+                    error = e
+            # Keep the unreadable file: the next save would overwrite it with defaults
+            corrupt = self.path + ".corrupt"
+            logging.getLogger(__name__).warning("Unreadable %s (%s), using defaults; kept as %s",
+                                                self.path, error, corrupt)
             try:
-                data = json.load(f)
-                def merge(d, default):
-                    for k, v in default.items():
-                        if k not in d:
-                            d[k] = v
-                        elif isinstance(v, dict):
-                            merge(d[k], v)
-                    return d
-                return merge(data, DEFAULT_SETTINGS.copy())
-            except Exception:
-                return DEFAULT_SETTINGS.copy()
-    return DEFAULT_SETTINGS.copy()
-
-def save_settings(settings):
-    """Save settings to disk."""
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump(settings, f, indent=4)
+                os.replace(self.path, corrupt)
+            except OSError:
+                pass
+        return copy.deepcopy(DEFAULT_SETTINGS)
+
+    def data(self):
+        """The shared settings dict, reloaded first if the file changed."""
+        with self._lock:
+            if self._data is None:
+                self._mtime = self._file_mtime()
+                self._data = self.read_file()
+                self._flat = _flatten(self._data)
+                self._loaded()
+                self._next_check = time.monotonic() + RELOAD_CHECK_INTERVAL
+                return self._data
+            now = time.monotonic()
+            if now < self._next_check or self._pending is not None:
+                # A pending save overwrites outside edits anyway
+                return self._data
+            if threading.current_thread() is not threading.main_thread():
+                # Reload notifications call GUI code, so only the GUI thread reloads
+                return self._data
+            self._next_check = now + RELOAD_CHECK_INTERVAL
+            mtime = self._file_mtime()
+            if mtime == self._mtime:
+                return self._data
+            self._mtime = mtime
+            loaded = self.read_file()
+            # Update in place so every holder of the dict sees the new values
+            self._data.clear()
+            self._data.update(loaded)
+            self._loaded()
+            changed = self._diff()
+        self._notify(changed)
+        return self._data
+
+    def _loaded(self):
+        # What is on disk now; saving it again would be a no-op write
+        with self._cond:
+            self._persisted = json.dumps(self._data, indent=4)
+
+    def get(self, key, default=None):
+        """Return the setting at dotted ``key``, or ``default`` if it is missing."""
+        value = self.data()
+        for part in key.split("."):
+            if not isinstance(value, dict) or part not in value:
+                return default
+            value = value[part]
+        return value
+
+    def get_bool(self, key, default=False):
+        return bool(self.get(key, default))
+
+    def get_int(self, key, default=0):
+        try:
+            return int(self.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_float(self, key, default=0.0):
+        try:
+            return float(self.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_str(self, key, default=""):
+        value = self.get(key, default)
+        return value if isinstance(value, str) else default
+
+    def set(self, key, value):
+        """Change one setting in memory and notify its subscribers."""
+        with self._lock:
+            d = self.data()
+            *parents, leaf = key.split(".")
+            for part in parents:
+                d = d.setdefault(part, {})
+            d[leaf] = value
+            changed = self._diff()
+        self._notify(changed)
+
+    def commit(self, settings=None):
+        """Adopt ``settings`` (or in-place edits of the shared dict), notify and save."""
+        with self._lock:
+            data = self.data()
+            if settings is not None and settings is not data:
+                data.clear()
+                data.update(_merge(settings, DEFAULT_SETTINGS))
+            changed = self._diff()
+            self.save()
+        self._notify(changed)
+
+    def save(self):
+        """Schedule writing the settings to disk; returns without waiting for it."""
+        with self._lock:
+            text = json.dumps(self.data(), indent=4)
+        with self._cond:
+            if text == (self._pending if self._pending is not None else self._persisted):
+                return
+            now = time.monotonic()
+            if self._pending is None:
+                self._first_request = now
+            self._pending = text
+            self._due = min(now + SAVE_DELAY, self._first_request + SAVE_MAX_DELAY)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="settings-writer", daemon=True)
+                self._writer.start()
+            self._cond.notify_all()
+
+    def flush(self):
+        """Write a pending save now and wait until it is on disk."""
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            while self._pending is not None or self._writing:
+                self._cond.wait()
+            self._flushing = False
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                # Coalesce bursts: wait until saves stop arriving
+                while not self._flushing and self._pending is not None:
+                    remaining = self._due - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                text, self._pending = self._pending, None
+                self._writing = text is not None
+            if text is not None:
+                try:
+                    self._write(text)
+                except OSError as e:
+                    logging.getLogger(__name__).error("Could not save %s: %s", self.path, e)
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def _write(self, text):
+        """Atomically replace the settings file with ``text``."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        with self._lock:
+            # Our own write must not look like an outside edit
+            self._mtime = self._file_mtime()
+        with self._cond:
+            self._persisted = text
+
+    def reset(self):
+        """Delete the settings file and go back to the defaults."""
+        self.flush()
+        with self._lock:
+            with self._cond:
+                self._persisted = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            data = self.data()
+            data.clear()
+            data.update(copy.deepcopy(DEFAULT_SETTINGS))
+            self._mtime = None
+            changed = self._diff()
+        self._notify(changed)
+
+    def subscribe(self, key, callback):
+        """Call ``callback(value)`` whenever ``key`` changes. Returns an unsubscribe function."""
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(callback)
+        return lambda: self.unsubscribe(key, callback)
+
+    def unsubscribe(self, key, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(key, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def _diff(self):
+        """Return the dotted keys that changed since the last call."""
+        flat = _flatten(self._data)
+        old = self._flat
+        self._flat = flat
+        return {key for key in flat.keys() | old.keys() if flat.get(key) != old.get(key)}
+
+    def _notify(self, changed):
+        if not changed:
+            return
+        with self._lock:
+            calls = [(key, list(callbacks)) for key, callbacks in self._subscribers.items()
+                     if any(c == key or c.startswith(key + ".") or key.startswith(c + ".") for c in changed)]
+        for key, callbacks in calls:
+            value = self.get(key)
+            for callback in callbacks:
+                callback(value)
+
+_store = SettingsStore()
+atexit.register(_store.flush)
+
+def settings_store():
+    """Return the process-wide SettingsStore."""
+    return _store
+
+def get_setting(key, default=None):
+    """Return the setting at dotted ``key`` from memory."""
+    return _store.get(key, default)
+
+def set_setting(key, value):
+    """Change a setting in memory and notify subscribers; call save_settings() to persist."""
+    _store.set(key, value)
+
+def subscribe(key, callback):
+    """Call ``callback(value)`` when the setting at ``key`` changes. Returns an unsubscribe function."""
+    return _store.subscribe(key, callback)
+
+def load_settings():
+    """Return the shared settings dict; it is only read from disk when the file changed."""
+    return _store.data()
+
+def save_settings(settings=None):
+    """Notify subscribers of changed keys and save settings to disk in the background."""
+    _store.commit(settings)
+
+def flush_settings():
+    """Block until pending settings changes are written to disk."""
+    _store.flush()
 
 def reset_settings():
     """Delete settings file from disk."""
-    if os.path.exists(SETTINGS_FILE):
-        os.remove(SETTINGS_FILE)
+    _store.reset()
 
 def add_recent_file(settings, path):
-    """Add a file to the recent files list, keeping max 10."""
-    if path not in settings["recent_files"]:
-        settings["recent_files"].insert(0, path)
-        settings["recent_files"] = settings["recent_files"][:10]
-        save_settings(settings)
+    """Move a file to the front of the recent files list, keeping at most recent_files_limit.
+
+    The file's entry in ``recent_projects`` (cached metadata) records when it
+    was last opened.
+    """
+    recent = [p for p in settings["recent_files"] if p != path]
+    recent.insert(0, path)
+    limit = max(1, settings.get("recent_files_limit", 200))
+    projects = settings["recent_projects"]
+    for dropped in recent[limit:]:
+        projects.pop(dropped, None)
+    settings["recent_files"] = recent[:limit]
+    projects.setdefault(path, {})["last_opened"] = time.time()
+    save_settings(settings)
 
 def get_timestamp():
     """Return a timestamp string for filenames."""
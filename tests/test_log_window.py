@@ -0,0 +1,61 @@
+"""
+test_log_window.py - The shared log window as the logging handler of the application
+"""
+import logging
+import os
+import time
+
+import pytest
+import shiboken6
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QEvent
+from PySide6.QtWidgets import QApplication
+from settings import settings_store
+from ui.log_window import SharedLogWindow
+from ui.main_window import PrimaryMainWindow
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    # settings.json and log spools are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    app = QApplication.instance() or QApplication([])
+    settings_store().set("log_spool.enabled", False)
+    window = PrimaryMainWindow()
+    yield window
+    if shiboken6.isValid(window):
+        delete(window)
+    settings_store().flush()
+
+def delete(window):
+    window.deleteLater()
+    QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+def shown_lines(log_window, seconds=0.3):
+    """The log lines once the window's next flush ran."""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        QApplication.processEvents()
+        time.sleep(0.01)
+    model = log_window.model
+    return [model.data(model.index(row)) for row in range(model.rowCount())]
+
+def test_logging_warning_shows_in_log_window(window):
+    logging.getLogger("tests.log_window").warning("solver diverged at step 42")
+    assert any("solver diverged at step 42" in line for line in shown_lines(window.log_window))
+
+def test_handler_survives_closing_the_window(window):
+    window.show_log()
+    window.log_window.close()
+    assert window.log_window in logging.getLogger().handlers
+    logging.getLogger("tests.log_window").error("mesh cache unavailable")
+    assert any("mesh cache unavailable" in line for line in shown_lines(window.log_window))
+
+def test_handler_detached_when_window_deleted(window):
+    log_window = window.log_window
+    delete(window)
+    assert log_window not in logging.getLogger().handlers
+    assert SharedLogWindow._instance is None
+    # Nothing is routed to the deleted window any more
+    logging.getLogger("tests.log_window").warning("after teardown")
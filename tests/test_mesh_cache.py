@@ -0,0 +1,59 @@
+"""
+test_mesh_cache.py - Storing imported meshes, with their BVH and levels of detail, in the mesh cache and opening them again
+"""
+import numpy as np
+
+from mesh.bvh import MeshBVH, spatial_order
+from mesh.cache import MeshCache, source_key
+from mesh.data import MeshData
+from mesh.lod import MeshLOD
+
+CHUNK_TRIANGLES = 64
+
+def grid(cells):
+    """(positions, triangles) of a ``cells`` x ``cells`` grid of squares, in spatial order."""
+    x, y = np.meshgrid(np.arange(cells + 1), np.arange(cells + 1))
+    positions = np.stack([x.ravel(), y.ravel(), np.sin(x.ravel() + y.ravel())], axis=1).astype(np.float32)
+    corner = (np.arange(cells)[:, None] * (cells + 1) + np.arange(cells)).ravel()
+    triangles = np.concatenate([np.stack([corner, corner + 1, corner + cells + 2], axis=1),
+                                np.stack([corner, corner + cells + 2, corner + cells + 1], axis=1)])
+    return spatial_order(positions, triangles.astype(np.uint32))
+
+def stored(tmp_path, data):
+    source = tmp_path / "mesh.obj"
+    source.write_bytes(b"v 0 0 0\n")
+    key = source_key(str(source))
+    cache = MeshCache(str(tmp_path / "cache"))
+    assert cache.put(str(source), key, data) is not None
+    return cache.get(str(source), key)
+
+def test_bvh_is_restored(tmp_path):
+    data = MeshData(*grid(40), format="OBJ")
+    data.bvh = MeshBVH(data.positions, data.triangles, CHUNK_TRIANGLES)
+    cached = stored(tmp_path, data)
+    assert cached.cached and cached.format == "OBJ"
+    assert np.array_equal(cached.triangles, data.triangles)
+    bvh = cached.bvh
+    assert bvh.chunk_triangles == CHUNK_TRIANGLES and bvh.chunk_count == data.bvh.chunk_count
+    assert len(bvh.levels) == len(data.bvh.levels)
+    for (lo, hi), (expected_lo, expected_hi) in zip(bvh.levels, data.bvh.levels):
+        assert np.array_equal(lo, expected_lo) and np.array_equal(hi, expected_hi)
+    assert bvh.pick((10.3, 20.6, 5.0), (0.0, 0.0, -1.0)) == data.bvh.pick((10.3, 20.6, 5.0), (0.0, 0.0, -1.0))
+
+def test_levels_of_detail_are_restored(tmp_path):
+    data = MeshData(*grid(40))
+    data.bvh = MeshBVH(data.positions, data.triangles, CHUNK_TRIANGLES)
+    data.lod = MeshLOD(data.positions, data.triangles, data.bvh)
+    lod = stored(tmp_path, data).lod
+    assert lod.level_count == data.lod.level_count > 1
+    for name in ("positions", "triangles", "offsets", "errors"):
+        assert np.array_equal(getattr(lod, name), getattr(data.lod, name)), name
+    visible = np.ones(data.bvh.chunk_count, dtype=bool)
+    levels = lod.select((20.0, 20.0, 30.0), 500.0, 1.0)
+    assert np.array_equal(levels, data.lod.select((20.0, 20.0, 30.0), 500.0, 1.0))
+    assert np.array_equal(lod.draw_commands(visible, levels), data.lod.draw_commands(visible, levels))
+
+def test_mesh_without_bvh_or_triangles(tmp_path):
+    cached = stored(tmp_path, MeshData(np.zeros((2, 3), np.float32), np.empty((0, 3), np.uint32)))
+    assert cached is not None and cached.bvh is None and cached.lod is None
+    assert cached.vertex_count == 2 and cached.triangle_count == 0
@@ -0,0 +1,39 @@
+"""
+test_mesh_import.py - Reading mesh files with load_mesh
+"""
+from mesh.importers import load_mesh
+
+def write(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def test_obj_indented_lines(tmp_path):
+    path = write(tmp_path / "square.obj", [
+        "o square",
+        "  v 0 0 0",
+        "\tv 1 0 0",
+        " \t v 1 1 0",
+        "v 0 1 0",
+        "    vn 0 0 1",
+        "    vt 0 0",
+        "g faces",
+        "  f 1//1 2//1 3//1",
+        "\tf 1/1 3/1 4/1",
+    ])
+    mesh = load_mesh(path, workers=1)
+    assert mesh.triangle_count == 2
+    assert mesh.vertex_count == 4
+    assert sorted(map(tuple, mesh.positions.tolist())) == [(0, 0, 0), (0, 1, 0), (1, 0, 0), (1, 1, 0)]
+
+def test_obj_keywords_mid_line_are_ignored(tmp_path):
+    path = write(tmp_path / "triangle.obj", [
+        "o named v 9 9 9",
+        "v 0 0 0",
+        "v 1 0 0",
+        "v 0 1 0",
+        "usemtl f 1 2 3",
+        "f 1 2 3",
+    ])
+    mesh = load_mesh(path, workers=1)
+    assert mesh.vertex_count == 3
+    assert mesh.triangle_count == 1
@@ -15,6 +15,14 @@ class SettingsDialog(QDialog):
         self.theme_combo.setCurrentText(self.settings.get("theme", "dark"))
         layout.addWidget(theme_label)
         layout.addWidget(self.theme_combo)
+        # Theme backend
+        backend_label = QLabel("Theme backend:")
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItem("Style sheet (qss)", "qss")
+        self.backend_combo.addItem("Palette, faster on large forms", "palette")
+        self.backend_combo.setCurrentIndex(max(0, self.backend_combo.findData(self.settings.get("theme_backend", "qss"))))
+        layout.addWidget(backend_label)
+        layout.addWidget(self.backend_combo)
         # VSync
         self.vsync_check = QCheckBox("Enable VSync")
         self.vsync_check.setChecked(self.settings["performance"].get("vsync", True))
@@ -26,6 +34,33 @@ class SettingsDialog(QDialog):
         self.fps_spin.setValue(self.settings["performance"].get("max_fps", 60))
         layout.addWidget(fps_label)
         layout.addWidget(self.fps_spin)
+        # Frames in flight
+        frames_label = QLabel("Frames in flight:")
+        self.frames_spin = QSpinBox()
+        self.frames_spin.setRange(2, 3)
+        self.frames_spin.setValue(self.settings["performance"].get("frames_in_flight", 2))
+        layout.addWidget(frames_label)
+        layout.addWidget(self.frames_spin)
+        # Frustum culling
+        self.culling_check = QCheckBox("Frustum culling")
+        self.culling_check.setChecked(self.settings["performance"].get("frustum_culling", True))
+        layout.addWidget(self.culling_check)
+        # Level of detail
+        self.lod_check = QCheckBox("Level of detail (coarser while the camera moves)")
+        self.lod_check.setChecked(self.settings["performance"].get("level_of_detail", True))
+        layout.addWidget(self.lod_check)
+        # Viewport panes
+        panes_label = QLabel("Viewports:")
+        self.panes_combo = QComboBox()
+        self.panes_combo.addItem("Single", 1)
+        self.panes_combo.addItem("2 side by side", 2)
+        self.panes_combo.addItem("4 (2 x 2)", 4)
+        self.panes_combo.setCurrentIndex(max(0, self.panes_combo.findData(self.settings["viewports"].get("panes", 1))))
+        self.link_cameras_check = QCheckBox("Link viewport cameras")
+        self.link_cameras_check.setChecked(self.settings["viewports"].get("link_cameras", True))
+        layout.addWidget(panes_label)
+        layout.addWidget(self.panes_combo)
+        layout.addWidget(self.link_cameras_check)
         # Debug overlay options
         self.fps_overlay_check = QCheckBox("Show FPS in overlay")
         self.fps_overlay_check.setChecked(self.settings["debug_overlay"].get("show_fps", True))
@@ -51,8 +86,14 @@ class SettingsDialog(QDialog):
 
     def get_settings(self):
         self.settings["theme"] = self.theme_combo.currentText()
+        self.settings["theme_backend"] = self.backend_combo.currentData()
         self.settings["performance"]["vsync"] = self.vsync_check.isChecked()
         self.settings["performance"]["max_fps"] = self.fps_spin.value()
+        self.settings["performance"]["frames_in_flight"] = self.frames_spin.value()
+        self.settings["performance"]["frustum_culling"] = self.culling_check.isChecked()
+        self.settings["performance"]["level_of_detail"] = self.lod_check.isChecked()
+        self.settings["viewports"]["panes"] = self.panes_combo.currentData()
+        self.settings["viewports"]["link_cameras"] = self.link_cameras_check.isChecked()
         self.settings["debug_overlay"]["show_fps"] = self.fps_overlay_check.isChecked()
         self.settings["debug_overlay"]["show_memory"] = self.memory_overlay_check.isChecked()
         self.settings["debug_overlay"]["show_device_info"] = self.device_overlay_check.isChecked()
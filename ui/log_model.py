@@ -0,0 +1,382 @@
+"""
+log_model.py - Columnar log record store and the list model backing the log view
+"""
+from array import array
+import numpy as np
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+LEVELS = ["debug", "info", "warning", "error"]
+LEVEL_RANK = {name: rank for rank, name in enumerate(LEVELS)}
+LEVEL_TAGS = [f"[{name.upper()}]" for name in LEVELS]
+
+# Message bytes reserved per record slot; long messages evict older records early
+ARENA_BYTES_PER_RECORD = 64
+MAX_MESSAGE_BYTES = 65536
+
+class LogStore:
+    """Fixed-capacity ring buffer of structured log records, stored by column.
+
+    Each record has a Unix timestamp, an integer level (index into
+    LEVELS), a source id (index into ``source_names``; 0 means no source)
+    and a UTF-8 message kept in a circular byte arena. Records are addressed
+    by an absolute, monotonically increasing sequence number; records
+    ``first_seq`` up to ``next_seq - 1`` are retained. The oldest records are
+    evicted when either the record slots or the arena run out.
+    """
+    def __init__(self, capacity, arena_bytes=None):
+        self.capacity = max(1, int(capacity))
+        self.arena_size = max(arena_bytes or self.capacity * ARENA_BYTES_PER_RECORD, 4 * MAX_MESSAGE_BYTES)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.levels = np.zeros(self.capacity, dtype=np.int8)
+        self.sources = np.zeros(self.capacity, dtype=np.int16)
+        # Absolute arena positions; the byte lives at position % arena_size
+        self.offsets = np.zeros(self.capacity, dtype=np.int64)
+        self.lengths = np.zeros(self.capacity, dtype=np.int32)
+        self.arena = np.zeros(self.arena_size, dtype=np.uint8)
+        self._arena_tail = 0
+        self.source_names = [""]
+        self._source_ids = {"": 0, None: 0}
+        self.first_seq = 0
+        self.next_seq = 0
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    def nbytes(self):
+        """Memory held by the columns and the message arena."""
+        return (self.timestamps.nbytes + self.levels.nbytes + self.sources.nbytes
+                + self.offsets.nbytes + self.lengths.nbytes + self.arena.nbytes)
+
+    def find_source(self, name):
+        """Return the id of source ``name``, or -1 if no record has used it."""
+        return self._source_ids.get(name, -1)
+
+    def source_id(self, name):
+        """Intern a source name and return its id."""
+        source = self._source_ids.get(name)
+        if source is None:
+            source = self._source_ids[name] = len(self.source_names)
+            self.source_names.append(name)
+        return source
+
+    def slots(self, start, end):
+        """Column index for records [start, end): a slice unless the range wraps."""
+        lo = start % self.capacity
+        if lo + (end - start) <= self.capacity:
+            return slice(lo, lo + (end - start))
+        return np.arange(start, end) % self.capacity
+
+    def plan(self, messages):
+        """Encode ``messages`` and lay them out in the arena.
+
+        Returns ``(skip, encoded, offsets, evict)``: the batch's first ``skip``
+        messages do not fit in the arena at all and are left out, and
+        ``evict`` is how many of the oldest records must go before the rest
+        can be written with ``write``. Callers must pass at most ``capacity``
+        messages.
+        """
+        encoded = [message.encode("utf-8", "replace")[:MAX_MESSAGE_BYTES] for message in messages]
+        if not encoded:
+            return 0, encoded, np.empty(0, dtype=np.int64), 0
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        # Keep the newest messages that fit in the arena; a batch that size wraps
+        # at most once, so its padding is shorter than one message
+        total = np.cumsum(lengths[::-1])
+        skip = len(encoded) - int(np.searchsorted(total, self.arena_size - MAX_MESSAGE_BYTES, side="right"))
+        if skip:
+            encoded, lengths = encoded[skip:], lengths[skip:]
+        offsets = self._arena_tail + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        # A message never straddles the end of the arena: pad to the next wrap
+        size = self.arena_size
+        while True:
+            crossing = np.flatnonzero((offsets // size) != ((offsets + np.maximum(lengths, 1) - 1) // size))
+            if not len(crossing):
+                break
+            first = crossing[0]
+            offsets[first:] += size - offsets[first] % size
+        tail = int(offsets[-1] + lengths[-1])
+        evict = max(0, len(self) + len(encoded) - self.capacity)
+        # Records whose bytes the new tail would overwrite
+        evict = max(evict, self._records_before(tail - size) - self.first_seq)
+        return skip, encoded, offsets, min(evict, len(self))
+
+    def _records_before(self, position):
+        """Return the first sequence number whose message starts at or after ``position``."""
+        lo, hi = self.first_seq, self.next_seq
+        offsets, capacity = self.offsets, self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if offsets[mid % capacity] < position:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def write(self, timestamps, levels, sources, encoded, offsets):
+        """Store a batch laid out by ``plan`` after its evictions were applied."""
+        count = len(encoded)
+        if not count:
+            return self.next_seq
+        first = self.next_seq
+        slots = self.slots(first, first + count)
+        self.timestamps[slots] = timestamps
+        self.levels[slots] = levels
+        self.sources[slots] = sources
+        self.offsets[slots] = offsets
+        self.lengths[slots] = np.fromiter(map(len, encoded), dtype=np.int32, count=count)
+        # Consecutive messages are contiguous between wraps: copy each run at once
+        size = self.arena_size
+        wraps = np.flatnonzero(np.diff(offsets // size)) + 1
+        for lo, hi in zip(np.concatenate(([0], wraps)), np.concatenate((wraps, [count]))):
+            data = b"".join(encoded[lo:hi])
+            start = int(offsets[lo] % size)
+            self.arena[start:start + len(data)] = np.frombuffer(data, dtype=np.uint8)
+        self._arena_tail = int(offsets[-1]) + len(encoded[-1])
+        self.next_seq += count
+        return first
+
+    def extend(self, timestamps, levels, sources, messages):
+        """Append a batch of records, evicting as needed. Returns the first new sequence number."""
+        skip, encoded, offsets, evict = self.plan(messages)
+        self.evict(evict)
+        return self.write(timestamps[skip:], levels[skip:], sources[skip:], encoded, offsets)
+
+    def evict(self, count):
+        """Drop the ``count`` oldest records."""
+        self.first_seq += min(count, len(self))
+
+    def message(self, seq):
+        slot = seq % self.capacity
+        start = int(self.offsets[slot] % self.arena_size)
+        return self.arena[start:start + int(self.lengths[slot])].tobytes().decode("utf-8", "replace")
+
+    def messages(self, start, end):
+        return [self.message(seq) for seq in range(max(start, self.first_seq), min(end, self.next_seq))]
+
+    def format(self, seq):
+        """Render a record as a display line; only done for rows that are painted."""
+        slot = seq % self.capacity
+        source = self.sources[slot]
+        if source:
+            return f"{LEVEL_TAGS[self.levels[slot]]} [{self.source_names[source]}] {self.message(seq)}"
+        return f"{LEVEL_TAGS[self.levels[slot]]} {self.message(seq)}"
+
+    def get(self, seq):
+        """Return the formatted record ``seq`` or None if it was evicted."""
+        if self.first_seq <= seq < self.next_seq:
+            return self.format(seq)
+        return None
+
+    def line(self, row):
+        """Return the ``row``-th retained record formatted (0 is the oldest)."""
+        return self.format(self.first_seq + row)
+
+    def lines(self):
+        return [self.format(seq) for seq in range(self.first_seq, self.next_seq)]
+
+    def message_bytes(self, start, end):
+        """Return the raw bytes of records [start, end) and their relative offsets.
+
+        Returns None if the records wrap around the arena; callers then fall
+        back to per-record access.
+        """
+        slots = self.slots(start, end)
+        offsets = self.offsets[slots]
+        lengths = self.lengths[slots]
+        lo = int(offsets[0] % self.arena_size)
+        hi = lo + int(offsets[-1] - offsets[0]) + int(lengths[-1])
+        if hi > self.arena_size:
+            return None
+        return self.arena[lo:hi], offsets - offsets[0], lengths
+
+    def facet_mask(self, start, end, level=None, source=None, since=None):
+        """Vectorized mask over records [start, end) matching the given facets."""
+        slots = self.slots(start, end)
+        mask = np.ones(end - start, dtype=bool)
+        if level is not None:
+            mask &= self.levels[slots] == level
+        if source is not None:
+            mask &= self.sources[slots] == source
+        if since is not None:
+            mask &= self.timestamps[slots] >= since
+        return mask
+
+    def set_capacity(self, capacity):
+        """Resize the store, keeping the newest records."""
+        capacity = max(1, int(capacity))
+        start = max(self.first_seq, self.next_seq - capacity)
+        slots = self.slots(start, self.next_seq)
+        columns = (self.timestamps[slots], self.levels[slots], self.sources[slots])
+        messages = self.messages(start, self.next_seq)
+        source_names, source_ids = self.source_names, self._source_ids
+        next_seq = self.next_seq
+        self.__init__(capacity)
+        self.source_names, self._source_ids = source_names, source_ids
+        self.first_seq = self.next_seq = start
+        self.extend(*columns, messages)
+        assert self.next_seq == next_seq
+
+    def clear(self):
+        self.first_seq = self.next_seq
+
+class LogListModel(QAbstractListModel):
+    """List model over a LogStore, optionally showing only matching records.
+
+    Views only ask for the rows they paint, so the cost of an append does not
+    depend on how many records are already stored, and records are only
+    formatted into text when they become visible.
+
+    With a LogSpool attached, records evicted from the store stay in the
+    model and are read back from disk; rows are then only removed when the
+    spool itself is trimmed.
+    """
+    def __init__(self, capacity, parent=None, spool=None):
+        super().__init__(parent)
+        self.store = LogStore(capacity)
+        self.spool = spool
+        if spool is not None and spool.readonly:
+            # A reopened session: new records continue its numbering
+            self.store.first_seq = self.store.next_seq = spool.next_seq
+            self.store.source_names = list(spool.source_names)
+            self.store._source_ids = dict(spool._source_ids)
+        # Sequence numbers of matching records while a filter is active
+        self._rows = None
+        self._rows_head = 0
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest record the model can show."""
+        if self.spool is not None and len(self.spool):
+            return min(self.spool.first_seq, self.store.first_seq)
+        return self.store.first_seq
+
+    def record(self, seq):
+        """Return the formatted record ``seq``, from memory or the spool."""
+        if seq >= self.store.first_seq:
+            return self.store.get(seq)
+        if self.spool is not None:
+            return self.spool.get(seq)
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self._rows is None:
+            return self.store.next_seq - self.first_seq
+        return len(self._rows) - self._rows_head
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        if self._rows is None:
+            return self.record(self.first_seq + index.row())
+        return self.record(self._rows[self._rows_head + index.row()])
+
+    def append_records(self, timestamps, levels, sources, messages):
+        """Append a batch of records with a single insert notification.
+
+        ``levels`` are ranks into LEVELS and ``sources`` ids from
+        ``store.source_id``. Returns the sequence number of the first stored
+        record. While a filter is active the records are only stored;
+        matches are added by the caller.
+        """
+        store = self.store
+        capacity = store.capacity
+        spool = self.spool if self.spool is not None and not self.spool.readonly else None
+        if len(messages) > capacity:
+            if spool is not None:
+                # Every record has to reach the spool: store the batch in parts
+                return min(self.append_records(timestamps[lo:lo + capacity], levels[lo:lo + capacity],
+                                               sources[lo:lo + capacity], messages[lo:lo + capacity])
+                           for lo in range(0, len(messages), capacity))
+            timestamps, levels, sources, messages = (
+                timestamps[-capacity:], levels[-capacity:], sources[-capacity:], messages[-capacity:])
+        if not len(messages):
+            return store.next_seq
+        skip, encoded, offsets, evict = store.plan(messages)
+        if skip:
+            timestamps, levels, sources = timestamps[skip:], levels[skip:], sources[skip:]
+        if evict:
+            if spool is not None:
+                # Evicted records stay visible, paged in from the spool
+                store.evict(evict)
+            else:
+                self._remove_before(store.first_seq + evict, lambda: store.evict(evict))
+        if self._rows is None:
+            row = self.rowCount()
+            self.beginInsertRows(QModelIndex(), row, row + len(encoded) - 1)
+            first = store.write(timestamps, levels, sources, encoded, offsets)
+            self.endInsertRows()
+        else:
+            first = store.write(timestamps, levels, sources, encoded, offsets)
+        if spool is not None:
+            spool.append(first, timestamps, levels, sources, encoded, store.source_names)
+            keep = spool.excess()
+            if keep > self.first_seq:
+                self._remove_before(min(keep, store.first_seq), lambda: spool.trim(keep))
+        return first
+
+    def _remove_before(self, first_seq, drop):
+        """Run ``drop`` to discard records before ``first_seq`` and remove their rows."""
+        if self._rows is None:
+            count = first_seq - self.first_seq
+            self.beginRemoveRows(QModelIndex(), 0, count - 1)
+            drop()
+            self.endRemoveRows()
+            return
+        drop()
+        rows = self._rows
+        stale = 0
+        while self._rows_head + stale < len(rows) and rows[self._rows_head + stale] < first_seq:
+            stale += 1
+        if stale:
+            self.beginRemoveRows(QModelIndex(), 0, stale - 1)
+            self._rows_head += stale
+            if self._rows_head > len(rows) // 2:
+                del rows[:self._rows_head]
+                self._rows_head = 0
+            self.endRemoveRows()
+
+    def is_filtered(self):
+        return self._rows is not None
+
+    def begin_filter(self):
+        """Switch to showing only matches, starting from an empty match list."""
+        self.beginResetModel()
+        self._rows = array('q')
+        self._rows_head = 0
+        self.endResetModel()
+
+    def add_matches(self, seqs):
+        """Append matching sequence numbers (ascending, newer than any existing match)."""
+        seqs = np.asarray(seqs, dtype=np.int64)
+        seqs = seqs[seqs >= self.first_seq]
+        if not len(seqs):
+            return
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row + len(seqs) - 1)
+        self._rows.frombytes(seqs.tobytes())
+        self.endInsertRows()
+
+    def clear_filter(self):
+        """Show every retained record again."""
+        self.beginResetModel()
+        self._rows = None
+        self._rows_head = 0
+        self.endResetModel()
+
+    def set_capacity(self, capacity):
+        self.beginResetModel()
+        self.store.set_capacity(capacity)
+        if self._rows is not None:
+            self._rows = array('q', (seq for seq in self._rows[self._rows_head:] if seq >= self.first_seq))
+            self._rows_head = 0
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        if self._rows is not None:
+            self._rows = array('q')
+            self._rows_head = 0
+        self.endResetModel()
@@ -0,0 +1,287 @@
+"""
+log_search.py - Indexed, incremental search behind the log filter bar
+"""
+import re
+import time
+from array import array
+from bisect import bisect_left
+import numpy as np
+from PySide6.QtCore import QObject, QTimer
+
+SOURCES = ["Primary", "Secondary"]
+
+# Records are indexed per block of consecutive sequence numbers, which keeps
+# posting lists short; candidate blocks are then verified record by record.
+BLOCK_SIZE = 64
+# Records verified per step when the index cannot narrow the search
+SCAN_CHUNK = 4096
+# Time budget of one search slice, well under a 60 Hz frame
+SLICE_BUDGET = 0.006
+
+def lower_ascii(data):
+    """Lowercase the ASCII letters of a uint8 array."""
+    return data | (((data >= 65) & (data <= 90)).astype(np.uint8) << 5)
+
+def trigrams(data):
+    """Return the distinct byte trigrams of a uint8 array packed into 24-bit ints."""
+    if len(data) < 3:
+        return np.empty(0, dtype=np.uint32)
+    data = data.astype(np.uint32)
+    return np.unique((data[:-2] << 16) | (data[1:-1] << 8) | data[2:])
+
+class TrigramIndex:
+    """Incrementally maintained trigram -> block posting lists over log messages.
+
+    A block is indexed once it is complete, in one vectorized pass over its
+    bytes in the store's message arena, so ``indexed_until`` trails the
+    newest record by less than one block. Case folding is ASCII-only.
+    """
+    def __init__(self):
+        self._postings = {}
+        self._next_block = 0
+        self._first_block = 0
+
+    @property
+    def indexed_until(self):
+        """Sequence number of the first record not covered by the index yet."""
+        return self._next_block * BLOCK_SIZE
+
+    def update(self, store):
+        """Index every block of ``store`` completed since the last call."""
+        self._next_block = max(self._next_block, store.first_seq // BLOCK_SIZE)
+        while (self._next_block + 1) * BLOCK_SIZE <= store.next_seq:
+            block = self._next_block
+            self._add_block(block, store, max(block * BLOCK_SIZE, store.first_seq), (block + 1) * BLOCK_SIZE)
+            self._next_block += 1
+        self._prune(store.first_seq)
+
+    def _add_block(self, block, store, start, end):
+        found = store.message_bytes(start, end)
+        if found is None:
+            data = np.frombuffer("\n".join(store.messages(start, end)).encode("utf-8"), dtype=np.uint8)
+        else:
+            data = found[0]
+        postings = self._postings
+        for gram in trigrams(lower_ascii(data)).tolist():
+            blocks = postings.get(gram)
+            if blocks is None:
+                postings[gram] = blocks = array('q')
+            blocks.append(block)
+
+    def _prune(self, first_seq):
+        """Forget blocks that were entirely evicted from the store."""
+        first_block = first_seq // BLOCK_SIZE
+        # Trimming every list is O(vocabulary); only do it once enough blocks went stale
+        if first_block - self._first_block < 1024:
+            return
+        self._first_block = first_block
+        for gram in list(self._postings):
+            blocks = self._postings[gram]
+            stale = bisect_left(blocks, first_block)
+            if stale == len(blocks):
+                del self._postings[gram]
+            elif stale:
+                del blocks[:stale]
+
+    def candidate_blocks(self, needle, first_seq):
+        """Return the sorted ids of indexed blocks that may contain ``needle`` (bytes).
+
+        Returns None when the needle is too common for the index to help, in
+        which case the caller should scan every record.
+        """
+        first_block = first_seq // BLOCK_SIZE
+        lists = []
+        for gram in trigrams(np.frombuffer(needle, dtype=np.uint8)).tolist():
+            blocks = self._postings.get(gram)
+            if blocks is None:
+                return []
+            blocks = np.frombuffer(blocks, dtype=np.int64)
+            lists.append(blocks[np.searchsorted(blocks, first_block):])
+        lists.sort(key=len)
+        # The rarest trigram bounds the candidate count; when even that one
+        # occurs in most blocks, intersecting costs more than it saves
+        common = (self._next_block - first_block) // 2
+        candidates = lists[0]
+        if len(candidates) > common:
+            return None
+        for blocks in lists[1:]:
+            # Verifying a few extra blocks is cheaper than intersecting with a
+            # list much longer than the candidate set
+            if not len(candidates) or len(blocks) > 8 * len(candidates):
+                break
+            candidates = np.intersect1d(candidates, blocks, assume_unique=True)
+        return candidates.tolist()
+
+    def clear(self):
+        self.__init__()
+
+class LogQuery:
+    """A filter bar query: message text (substring or regex) plus facets.
+
+    ``level`` is a rank into LEVELS, ``source`` a source name and ``since`` a
+    Unix timestamp. Facets are evaluated as masks over the record columns
+    before any message text is looked at. Queries run against a LogStore or
+    a LogSpool alike.
+    """
+    def __init__(self, text="", regex=False, level=None, source=None, since=None):
+        self.text = text
+        self.regex = regex
+        self.level = level
+        self.source = source
+        self.since = since
+        self.error = None
+        self._pattern = None
+        if regex and text:
+            try:
+                self._pattern = re.compile(text, re.IGNORECASE)
+            except re.error as e:
+                self.error = str(e)
+        # ASCII-only lowercasing, as the message bytes and the trigram index get
+        self._needle = text.encode("utf-8").lower()
+
+    def is_empty(self):
+        return not self.text and self.level is None and self.source is None and self.since is None
+
+    def indexable_text(self):
+        """The literal that every match must contain, if the index can use it."""
+        if self.regex or len(self._needle) < 3:
+            return None
+        return self._needle
+
+    def match_range(self, store, start, end):
+        """Return the sequence numbers of matching records in [start, end)."""
+        start = max(start, store.first_seq)
+        end = min(end, store.next_seq)
+        if start >= end or self.error:
+            return np.empty(0, dtype=np.int64)
+        source = None
+        if self.source is not None:
+            source = store.find_source(self.source)
+        mask = store.facet_mask(start, end, self.level, source, self.since)
+        if not self.text:
+            return start + np.flatnonzero(mask)
+        if self._pattern is not None:
+            search = self._pattern.search
+            return np.array([seq for seq in (start + np.flatnonzero(mask)).tolist()
+                             if search(store.message(seq))], dtype=np.int64)
+        return self._find_text(store, start, end, mask)
+
+    def _find_text(self, store, start, end, mask):
+        needle = self._needle
+        found = store.message_bytes(start, end)
+        if found is None:
+            return np.array([seq for seq in (start + np.flatnonzero(mask)).tolist()
+                             if needle in store.message(seq).encode("utf-8").lower()], dtype=np.int64)
+        # One substring search over the adjacent messages of the range
+        data, offsets, lengths = found
+        text = data.tobytes().lower()
+        hits = []
+        position = text.find(needle)
+        while position != -1:
+            hits.append(position)
+            position = text.find(needle, position + 1)
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        hits = np.array(hits, dtype=np.int64)
+        records = np.searchsorted(offsets, hits, side="right") - 1
+        # Drop hits that run past the end of their message
+        records = np.unique(records[hits + len(needle) <= offsets[records] + lengths[records]])
+        return start + records[mask[records]]
+
+class LogSearch(QObject):
+    """Evaluates filter bar queries against a LogListModel.
+
+    New records are indexed as their blocks complete. A query first narrows
+    the search to candidate blocks through the trigram index (when its text
+    has three or more bytes), then verifies candidates in short time slices
+    so the event loop never stalls; matches are appended to the model as they
+    are found. Once the backlog is verified, each new record is tested on
+    arrival. Records only left in the model's spool are not indexed and are
+    scanned, in the same time slices, before the in-memory ones.
+    """
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.index = TrigramIndex()
+        self.query = LogQuery()
+        self._pending = None
+        self._slice_timer = QTimer(self)
+        self._slice_timer.setSingleShot(True)
+        self._slice_timer.timeout.connect(self._run_slice)
+
+    def on_appended(self, first_seq, count):
+        """Index freshly stored records and match them against the active query."""
+        store = self.model.store
+        self.index.update(store)
+        if self.query.is_empty() or self._pending is not None:
+            # A running scan picks the new records up when it reaches them
+            return
+        matches = self.query.match_range(store, first_seq, first_seq + count)
+        if len(matches):
+            self.model.add_matches(matches)
+
+    def set_query(self, query):
+        """Start evaluating ``query``, replacing any search in progress."""
+        self.query = query
+        self._slice_timer.stop()
+        if query.is_empty():
+            self._pending = None
+            self.model.clear_filter()
+            return
+        self.model.begin_filter()
+        self._pending = self._candidates(query)
+        self._run_slice()
+
+    def is_searching(self):
+        return self._pending is not None
+
+    def _candidates(self, query):
+        """Yield (start, end) sequence ranges to verify, oldest first."""
+        store = self.model.store
+        for start in range(self.model.first_seq, store.first_seq, SCAN_CHUNK):
+            yield start, min(start + SCAN_CHUNK, store.first_seq)
+        cursor = store.first_seq
+        needle = query.indexable_text()
+        if needle is not None:
+            end = self.index.indexed_until
+            blocks = self.index.candidate_blocks(needle, store.first_seq)
+            if blocks is not None:
+                for block in blocks:
+                    yield block * BLOCK_SIZE, min((block + 1) * BLOCK_SIZE, end)
+                cursor = max(cursor, end)
+        # Records past the index, including those appended while searching
+        while cursor < store.next_seq:
+            end = min(cursor + SCAN_CHUNK, store.next_seq)
+            yield cursor, end
+            cursor = end
+
+    def _run_slice(self):
+        if self._pending is None:
+            return
+        deadline = time.perf_counter() + SLICE_BUDGET
+        matches = []
+        for start, end in self._pending:
+            matches.extend(self._match(start, end))
+            if time.perf_counter() > deadline:
+                break
+        else:
+            self._pending = None
+        if matches:
+            self.model.add_matches(np.concatenate(matches))
+        if self._pending is not None:
+            self._slice_timer.start(0)
+
+    def _match(self, start, end):
+        """Return the non-empty match arrays for [start, end), from the spool where evicted."""
+        store, spool = self.model.store, self.model.spool
+        found = []
+        if spool is not None and start < store.first_seq:
+            for lo, hi in spool.ranges(start, min(end, store.first_seq), SCAN_CHUNK):
+                found.append(self.query.match_range(spool, lo, hi))
+            start = store.first_seq
+        if start < end:
+            found.append(self.query.match_range(store, start, end))
+        return [matches for matches in found if len(matches)]
+
+    def clear(self):
+        self.index.clear()
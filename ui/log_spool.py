@@ -0,0 +1,328 @@
+"""
+log_spool.py - Append-only on-disk log history, paged back in through mmap
+"""
+import mmap
+import os
+import shutil
+from bisect import bisect_right
+import numpy as np
+from settings import get_timestamp
+from ui.log_model import LEVEL_TAGS
+
+# Per-record index entry; the message bytes live in the segment's .log file
+RECORD_DTYPE = np.dtype([
+    ("offset", "<i8"),
+    ("timestamp", "<f8"),
+    ("length", "<i4"),
+    ("source", "<i2"),
+    ("level", "i1"),
+])
+SOURCES_FILE = "sources.txt"
+DEFAULT_SEGMENT_BYTES = 64 * 2**20
+DEFAULT_MAX_BYTES = 1024 * 2**20
+
+def new_session_dir(root):
+    """Create and return a fresh session directory under ``root``."""
+    base = os.path.join(root, get_timestamp())
+    path, suffix = base, 1
+    while True:
+        try:
+            os.makedirs(path)
+            return path
+        except FileExistsError:
+            path = f"{base}-{suffix}"
+            suffix += 1
+
+def prune_sessions(root, keep):
+    """Delete all but the ``keep`` newest session directories under ``root``."""
+    if not os.path.isdir(root):
+        return
+    sessions = sorted(entry.path for entry in os.scandir(root) if entry.is_dir())
+    for path in sessions[:max(0, len(sessions) - keep)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+class SpoolSegment:
+    """One segment: ``<first_seq>.log`` holds message bytes, ``<first_seq>.idx`` their index.
+
+    Message bytes are always written before their index entries, so after a
+    crash the index may only lack records, never point past the data.
+    """
+    def __init__(self, directory, first_seq, create=False):
+        self.first_seq = first_seq
+        base = os.path.join(directory, f"{first_seq:012d}")
+        self.data_path = base + ".log"
+        self.index_path = base + ".idx"
+        self._data_file = None
+        self._index_file = None
+        self._data_map = None
+        self._index_map = None
+        self._mapped_count = 0
+        if create:
+            self._data_file = open(self.data_path, "xb")
+            self._index_file = open(self.index_path, "xb")
+            self.count = 0
+            self.data_size = 0
+        else:
+            self._recover()
+
+    def _recover(self):
+        """Count the complete records, ignoring a record torn by a crash."""
+        self.data_size = os.path.getsize(self.data_path)
+        count = os.path.getsize(self.index_path) // RECORD_DTYPE.itemsize
+        self.count = count
+        if count:
+            records = self.records()
+            ends = records["offset"] + records["length"]
+            self.count = int(np.searchsorted(ends, self.data_size, side="right"))
+            self._mapped_count = min(self._mapped_count, self.count)
+
+    @property
+    def next_seq(self):
+        return self.first_seq + self.count
+
+    def nbytes(self):
+        return self.data_size + self.count * RECORD_DTYPE.itemsize
+
+    def append(self, records, data):
+        self._data_file.write(data)
+        self._data_file.flush()
+        self._index_file.write(records.tobytes())
+        self._index_file.flush()
+        self.count += len(records)
+        self.data_size += len(data)
+
+    def _map(self):
+        # Records appended since the last call are past the end of the mapping
+        if self._mapped_count == self.count:
+            return
+        self.unmap()
+        with open(self.index_path, "rb") as f:
+            self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(self.data_path, "rb") as f:
+            self._data_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.data_size else None
+        self._mapped_count = self.count
+
+    def records(self):
+        """The index entries as a read-only structured array over the mapping."""
+        if not self.count:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        self._map()
+        return np.frombuffer(self._index_map, dtype=RECORD_DTYPE, count=self.count)
+
+    def data(self):
+        """The message bytes as a read-only uint8 array over the mapping."""
+        self._map()
+        if self._data_map is None:
+            return np.empty(0, dtype=np.uint8)
+        return np.frombuffer(self._data_map, dtype=np.uint8, count=self.data_size)
+
+    def unmap(self):
+        for mapping in (self._index_map, self._data_map):
+            if mapping is not None:
+                try:
+                    mapping.close()
+                except BufferError:
+                    # Still referenced by an array; released with it
+                    pass
+        self._index_map = self._data_map = None
+        self._mapped_count = 0
+
+    def close(self):
+        for f in (self._data_file, self._index_file):
+            if f is not None:
+                f.close()
+        self._data_file = self._index_file = None
+        self.unmap()
+
+    def delete(self):
+        self.close()
+        for path in (self.data_path, self.index_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class LogSpool:
+    """Append-only history of log records in rotating segment files.
+
+    Records keep the sequence numbers they had in the in-memory LogStore,
+    so a view can show records evicted from memory by reading them back
+    from disk. Segments are memory-mapped on access; only a bounded number
+    stay mapped. When the spool grows past ``max_bytes`` its oldest
+    segments are deleted.
+
+    ``LogSpool(directory, readonly=True)`` reopens an existing session,
+    e.g. one left behind by a crash, without modifying it.
+    """
+    MAPPED_SEGMENTS = 8
+
+    def __init__(self, directory, segment_bytes=DEFAULT_SEGMENT_BYTES, max_bytes=DEFAULT_MAX_BYTES, readonly=False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.readonly = readonly
+        self.source_names = [""]
+        self._source_ids = {"": 0, None: 0}
+        self.segments = []
+        self._mapped = []
+        if readonly:
+            self._load()
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self._sources_file = open(os.path.join(directory, SOURCES_FILE), "a", encoding="utf-8")
+
+    def _load(self):
+        path = os.path.join(self.directory, SOURCES_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for name in f.read().splitlines():
+                    self._source_ids.setdefault(name, len(self.source_names))
+                    self.source_names.append(name)
+        firsts = sorted(int(name[:-4]) for name in os.listdir(self.directory)
+                        if name.endswith(".idx") and name[:-4].isdigit())
+        for first in firsts:
+            if self.segments and first != self.segments[-1].next_seq:
+                # A gap means a segment was lost; keep the newest contiguous run
+                for segment in self.segments:
+                    segment.close()
+                self.segments = []
+            self.segments.append(SpoolSegment(self.directory, first))
+
+    @property
+    def first_seq(self):
+        return self.segments[0].first_seq if self.segments else 0
+
+    @property
+    def next_seq(self):
+        return self.segments[-1].next_seq if self.segments else 0
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    def nbytes(self):
+        """Size of the spool on disk."""
+        return sum(segment.nbytes() for segment in self.segments)
+
+    def find_source(self, name):
+        return self._source_ids.get(name, -1)
+
+    def append(self, first_seq, timestamps, levels, sources, encoded, source_names):
+        """Write a batch of records that the store numbered from ``first_seq``."""
+        if not len(encoded):
+            return
+        for name in source_names[len(self.source_names):]:
+            self._source_ids[name] = len(self.source_names)
+            self.source_names.append(name)
+            self._sources_file.write(name.replace("\n", " ") + "\n")
+        self._sources_file.flush()
+        segment = self.segments[-1] if self.segments else None
+        if segment is None or segment.data_size >= self.segment_bytes or segment.next_seq != first_seq:
+            if segment is not None:
+                segment.close()
+            segment = SpoolSegment(self.directory, first_seq, create=True)
+            self.segments.append(segment)
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        records = np.empty(len(encoded), dtype=RECORD_DTYPE)
+        records["offset"] = segment.data_size + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        records["timestamp"] = timestamps
+        records["length"] = lengths
+        records["source"] = sources
+        records["level"] = levels
+        segment.append(records, b"".join(encoded))
+
+    def excess(self):
+        """Return the first sequence number kept if the spool were trimmed to ``max_bytes``."""
+        total = self.nbytes()
+        first = self.first_seq
+        for segment in self.segments[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= segment.nbytes()
+            first = segment.next_seq
+        return first
+
+    def trim(self, first_seq):
+        """Delete the segments holding only records before ``first_seq``."""
+        while len(self.segments) > 1 and self.segments[0].next_seq <= first_seq:
+            segment = self.segments.pop(0)
+            if segment in self._mapped:
+                self._mapped.remove(segment)
+            segment.delete()
+
+    def _segment(self, seq):
+        index = bisect_right(self.segments, seq, key=lambda segment: segment.first_seq) - 1
+        segment = self.segments[index]
+        # Keep the most recently used segments mapped and release the rest
+        if segment in self._mapped:
+            self._mapped.remove(segment)
+        self._mapped.append(segment)
+        if len(self._mapped) > self.MAPPED_SEGMENTS:
+            self._mapped.pop(0).unmap()
+        return segment
+
+    def ranges(self, start, end, chunk):
+        """Split [start, end) into ranges of at most ``chunk`` records within one segment."""
+        start = max(start, self.first_seq)
+        end = min(end, self.next_seq)
+        while start < end:
+            segment = self._segment(start)
+            stop = min(end, segment.next_seq, start + chunk)
+            yield start, stop
+            start = stop
+
+    def message(self, seq):
+        segment = self._segment(seq)
+        record = segment.records()[seq - segment.first_seq]
+        offset = int(record["offset"])
+        return segment.data()[offset:offset + int(record["length"])].tobytes().decode("utf-8", "replace")
+
+    def messages(self, start, end):
+        return [self.message(seq) for seq in range(max(start, self.first_seq), min(end, self.next_seq))]
+
+    def format(self, seq):
+        segment = self._segment(seq)
+        record = segment.records()[seq - segment.first_seq]
+        source = int(record["source"])
+        if source:
+            return f"{LEVEL_TAGS[record['level']]} [{self.source_names[source]}] {self.message(seq)}"
+        return f"{LEVEL_TAGS[record['level']]} {self.message(seq)}"
+
+    def get(self, seq):
+        if self.first_seq <= seq < self.next_seq:
+            return self.format(seq)
+        return None
+
+    def message_bytes(self, start, end):
+        """Return the raw bytes of records [start, end) and their relative offsets.
+
+        Returns None if the records span several segments.
+        """
+        segment = self._segment(start)
+        if end > segment.next_seq:
+            return None
+        records = segment.records()[start - segment.first_seq:end - segment.first_seq]
+        offsets = records["offset"]
+        lo = int(offsets[0])
+        hi = int(offsets[-1]) + int(records["length"][-1])
+        return segment.data()[lo:hi], offsets - lo, records["length"]
+
+    def facet_mask(self, start, end, level=None, source=None, since=None):
+        masks = []
+        for lo, hi in self.ranges(start, end, end - start):
+            segment = self._segment(lo)
+            records = segment.records()[lo - segment.first_seq:hi - segment.first_seq]
+            mask = np.ones(hi - lo, dtype=bool)
+            if level is not None:
+                mask &= records["level"] == level
+            if source is not None:
+                mask &= records["source"] == source
+            if since is not None:
+                mask &= records["timestamp"] >= since
+            masks.append(mask)
+        return np.concatenate(masks) if masks else np.empty(0, dtype=bool)
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        if not self.readonly:
+            self._sources_file.close()
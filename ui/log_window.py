@@ -1,35 +1,155 @@
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QTextEdit, QLineEdit, QHBoxLayout
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QTableView, QLineEdit, QHBoxLayout, QAbstractItemView, QHeaderView, QApplication, QCheckBox, QComboBox, QPushButton, QFileDialog
+import functools
+import logging
+import os
+import queue
+import time
+from collections import deque
+import numpy as np
+import shiboken6
+from PySide6.QtCore import QTimer, QMetaObject, Qt, Slot
+from PySide6.QtGui import QKeySequence
+from settings import get_setting, settings_store
+from ui.log_model import LogListModel, LEVELS, LEVEL_RANK
+from ui.log_search import LogSearch, LogQuery, SOURCES
+from ui.log_spool import LogSpool, new_session_dir, prune_sessions
+from ui.theme import style_widget
+
+DEFAULT_LOG_RETENTION = 100000
+DEFAULT_LOG_DIR = "logs"
+# Delay between the last keystroke in the filter bar and running the query
+FILTER_DEBOUNCE_MS = 120
+# Posted messages are coalesced and flushed into the view at this interval
+LOG_FLUSH_INTERVAL_MS = 50
+# Messages waiting for a flush; producers that outrun the view are dropped
+LOG_QUEUE_LIMIT = 200000
+# Upper bound on messages moved into the view by a single flush
+LOG_FLUSH_BATCH = 20000
+
+# logging levels mapped onto the log window's level names
+LOGGING_LEVELS = [
+    (logging.ERROR, "error"),
+    (logging.WARNING, "warning"),
+    (logging.INFO, "info"),
+    (logging.DEBUG, "debug"),
+]
+
+# Time facet of the filter bar: label and window in seconds
+TIME_RANGES = [
+    ("Any time", None),
+    ("Last minute", 60),
+    ("Last 10 minutes", 600),
+    ("Last hour", 3600),
+]
+
+def logging_level_name(levelno):
+    for threshold, name in LOGGING_LEVELS:
+        if levelno >= threshold:
+            return name
+    return "debug"
 
 class LogWindow(QDialog):
-    """Window for displaying and filtering application logs."""
-    def __init__(self, parent=None):
+    """Window for displaying and filtering application logs.
+
+    ``post`` may be called from any thread: messages go into a queue that the
+    GUI thread drains every LOG_FLUSH_INTERVAL_MS and appends to the view in a
+    single batch. Other processes can feed the window through a
+    multiprocessing queue registered with ``attach_queue``.
+
+    With a ``spool``, every record is also written to disk and records
+    evicted from memory remain scrollable and searchable.
+    """
+    def __init__(self, parent=None, spool=None):
         super().__init__(parent)
         self.setWindowTitle("Log")
-        self.text_edit = QTextEdit(self)
-        self.text_edit.setReadOnly(True)
+        self.spool = spool
+        self._queue = deque()
+        self._queue_limit = LOG_QUEUE_LIMIT
+        self._wake_pending = False
+        self._min_level = LEVEL_RANK["info"]
+        self._attached_queues = []
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush)
+        # Other processes cannot wake us, so attached queues are polled
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self.flush)
+        retention = get_setting("log_retention", DEFAULT_LOG_RETENTION)
+        self.model = LogListModel(retention, self, spool)
+        # A single-column table with fixed row heights: unlike QListView, whose
+        # relayout walks every row, the table only touches the visible rows
+        self.view = QTableView(self)
+        self.view.setModel(self.model)
+        self.view.horizontalHeader().hide()
+        self.view.horizontalHeader().setStretchLastSection(True)
+        self.view.verticalHeader().hide()
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.view.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 4)
+        self.view.setShowGrid(False)
+        self.view.setWordWrap(False)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.search = LogSearch(self.model, self)
         self.filter_bar = QLineEdit(self)
         self.filter_bar.setPlaceholderText("Filter logs...")
-        self.filter_bar.textChanged.connect(self.filter_logs)
+        self.regex_check = QCheckBox("Regex", self)
+        self.level_combo = QComboBox(self)
+        self.level_combo.addItem("All levels", None)
+        for rank, level in enumerate(LEVELS):
+            self.level_combo.addItem(level.capitalize(), rank)
+        self.source_combo = QComboBox(self)
+        self.source_combo.addItem("All sources", None)
+        for source in SOURCES:
+            self.source_combo.addItem(source, source)
+        self.time_combo = QComboBox(self)
+        for label, seconds in TIME_RANGES:
+            self.time_combo.addItem(label, seconds)
+        self.open_session_btn = QPushButton("Open Session...", self)
+        self.open_session_btn.clicked.connect(self.open_session)
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self._filter_timer.timeout.connect(self.apply_filter)
+        self.filter_bar.textChanged.connect(lambda: self._filter_timer.start())
+        self.regex_check.toggled.connect(self.apply_filter)
+        self.level_combo.currentIndexChanged.connect(self.apply_filter)
+        self.source_combo.currentIndexChanged.connect(self.apply_filter)
+        self.time_combo.currentIndexChanged.connect(self.apply_filter)
+        # Scrolling to the newest line is coalesced to once per event loop pass
+        self._scroll_timer = QTimer(self)
+        self._scroll_timer.setSingleShot(True)
+        self._scroll_timer.timeout.connect(self.view.scrollToBottom)
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(self.filter_bar, 1)
+        filter_layout.addWidget(self.regex_check)
+        filter_layout.addWidget(self.level_combo)
+        filter_layout.addWidget(self.source_combo)
+        filter_layout.addWidget(self.time_combo)
+        filter_layout.addWidget(self.open_session_btn)
         layout = QVBoxLayout(self)
-        layout.addWidget(self.filter_bar)
-        layout.addWidget(self.text_edit)
-        self._all_logs = []
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.view)
         # Modern dark style for log window
-        self.setStyleSheet('''
-            QDialog, QTextEdit, QLineEdit {
+        style_widget(self, "dark", '''
+            QDialog, QTableView, QLineEdit, QComboBox, QCheckBox {
                 background: #23232b;
                 color: #fff;
                 font-family: "Segoe UI", "Arial", sans-serif;
                 font-size: 13px;
             }
-            QLineEdit {
+            QLineEdit, QComboBox, QPushButton {
                 border-radius: 8px;
                 background: #29293a;
                 color: #fff;
                 border: 1px solid #444;
                 padding: 5px;
             }
-            QTextEdit {
+            QTableView {
                 border-radius: 8px;
                 background: #23232b;
                 color: #fff;
@@ -37,22 +157,146 @@ class LogWindow(QDialog):
         ''')
 
     def set_log_level(self, level):
+        """Drop messages below ``level`` (one of LEVELS) before they are queued."""
         self.log_level = level
+        self._min_level = LEVEL_RANK[level]
+
+    def set_retention(self, max_lines):
+        """Change how many log lines are kept in memory."""
+        self.model.set_capacity(max_lines)
+
+    def append_log(self, message, level="info", source=None):
+        """Log a message; shown with the next flush. Safe to call from any thread."""
+        self.post(message, level, source)
+
+    def post(self, message, level="info", source=None):
+        """Queue a message for display without blocking.
+
+        ``source`` names the emitting window or logger and can be filtered on.
+        Returns False if the message was dropped because the queue is full;
+        drops are counted in ``dropped`` and reported in the log.
+        """
+        rank = LEVEL_RANK[level]
+        if rank < self._min_level:
+            return True
+        if len(self._queue) >= self._queue_limit:
+            self.dropped += 1
+            return False
+        self._queue.append((time.time(), rank, source, message))
+        # The flush clears the flag before draining, so a message appended
+        # after that point always triggers a new wake-up
+        if not self._wake_pending:
+            self._wake_pending = True
+            # A queued invocation rather than a signal: SharedLogWindow's
+            # logging.Handler.emit() shadows the one signals are sent through
+            QMetaObject.invokeMethod(self, "_schedule_flush", Qt.QueuedConnection)
+        return True
+
+    def attach_queue(self, source_queue):
+        """Drain ``source_queue`` (e.g. a multiprocessing.Queue) into the log.
+
+        Items may be ``(message, level[, source])`` tuples or ``logging.LogRecord``
+        objects, so a child process can use ``logging.handlers.QueueHandler``.
+        """
+        self._attached_queues.append(source_queue)
+        self._poll_timer.start()
+
+    def detach_queue(self, source_queue):
+        self._attached_queues.remove(source_queue)
+        if not self._attached_queues:
+            self._poll_timer.stop()
 
-    def append_log(self, message, level="info"):
-        levels = ["debug", "info", "warning", "error"]
-        if not hasattr(self, 'log_level'):
-            self.log_level = "info"
-        if levels.index(level) >= levels.index(self.log_level):
-            self._all_logs.append(f"[{level.upper()}] {message}")
-            self.filter_logs(self.filter_bar.text())
+    @Slot()
+    def _schedule_flush(self):
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        """Move queued messages into the view. Must run on the GUI thread."""
+        self._wake_pending = False
+        for source_queue in self._attached_queues:
+            self._drain_attached(source_queue)
+        batch = [self._queue.popleft() for _ in range(min(len(self._queue), LOG_FLUSH_BATCH))]
+        if self.dropped != self._reported_dropped:
+            message = f"{self.dropped - self._reported_dropped} log messages dropped (queue full)"
+            batch.append((time.time(), LEVEL_RANK["warning"], None, message))
+            self._reported_dropped = self.dropped
+        if self._queue:
+            # More than one batch was waiting; keep the GUI responsive and continue next pass
+            self._flush_timer.start(0)
+        if not batch:
+            return
+        timestamps, levels, sources, messages = zip(*batch)
+        source_id = self.model.store.source_id
+        scrollbar = self.view.verticalScrollBar()
+        follow = scrollbar.value() == scrollbar.maximum()
+        first = self.model.append_records(
+            np.array(timestamps), np.array(levels, dtype=np.int8),
+            np.array([source_id(source) for source in sources], dtype=np.int16), messages)
+        self.search.on_appended(first, self.model.store.next_seq - first)
+        if follow and not self._scroll_timer.isActive():
+            self._scroll_timer.start(0)
+
+    def _drain_attached(self, source_queue):
+        for _ in range(LOG_FLUSH_BATCH):
+            try:
+                item = source_queue.get_nowait()
+            except (queue.Empty, EOFError, OSError):
+                return
+            if isinstance(item, logging.LogRecord):
+                self.post(item.getMessage(), logging_level_name(item.levelno), item.name)
+            else:
+                self.post(*item)
+
+    def open_session(self, directory=None):
+        """Show a spooled log session, e.g. one left behind by a crash, in a new window."""
+        if not directory:
+            root = get_setting("log_spool.directory", DEFAULT_LOG_DIR)
+            directory = QFileDialog.getExistingDirectory(self, "Open Log Session", root)
+            if not directory:
+                return None
+        window = LogWindow(self.parentWidget(), LogSpool(directory, readonly=True))
+        window.setWindowTitle(f"Log - {os.path.basename(os.path.normpath(directory))}")
+        window.setAttribute(Qt.WA_DeleteOnClose)
+        window.destroyed.connect(window.spool.close)
+        window.show()
+        return window
 
     def filter_logs(self, text):
-        filtered = [log for log in self._all_logs if text.lower() in log.lower()]
-        self.text_edit.setPlainText("\n".join(filtered))
+        """Filter immediately on ``text``, bypassing the keystroke debounce."""
+        self.filter_bar.blockSignals(True)
+        self.filter_bar.setText(text)
+        self.filter_bar.blockSignals(False)
+        self.apply_filter()
+
+    def apply_filter(self):
+        self._filter_timer.stop()
+        seconds = self.time_combo.currentData()
+        query = LogQuery(
+            self.filter_bar.text(),
+            regex=self.regex_check.isChecked(),
+            level=self.level_combo.currentData(),
+            source=self.source_combo.currentData(),
+            since=time.time() - seconds if seconds else None,
+        )
+        self.filter_bar.setToolTip(query.error or "")
+        self.search.set_query(query)
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            rows = sorted(index.row() for index in self.view.selectionModel().selectedRows())
+            lines = [self.model.data(self.model.index(row)) for row in rows]
+            QApplication.clipboard().setText("\n".join(lines))
+            return
+        super().keyPressEvent(event)
 
-class SharedLogWindow(LogWindow):
-    """A log window shared between primary and secondary windows (singleton)."""
+class SharedLogWindow(LogWindow, logging.Handler):
+    """A log window shared between primary and secondary windows (singleton).
+
+    It is also a ``logging.Handler``: attach it with
+    ``logging.getLogger().addHandler(SharedLogWindow())`` to show records
+    from any thread in the window.
+    """
     _instance = None
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -61,5 +305,55 @@ class SharedLogWindow(LogWindow):
     def __init__(self, parent=None):
         if hasattr(self, '_initialized') and self._initialized:
             return
-        super().__init__(parent)
+        super().__init__(parent, self._session_spool())
+        logging.Handler.__init__(self)
+        store = settings_store()
+        self.set_log_level(store.get_str("log_level", "info"))
+        self.destroyed.connect(store.subscribe("log_level", self.set_log_level))
+        self.destroyed.connect(store.subscribe("log_retention", self.set_retention))
+        self.destroyed.connect(functools.partial(_detach_handler, self))
         self._initialized = True
+
+    @staticmethod
+    def _session_spool():
+        """Open this session's log spool as configured, or None if spooling is off."""
+        config = get_setting("log_spool", {})
+        if not config.get("enabled", True):
+            return None
+        root = config.get("directory", DEFAULT_LOG_DIR)
+        try:
+            prune_sessions(root, max(1, config.get("sessions", 10)) - 1)
+            return LogSpool(new_session_dir(root),
+                            segment_bytes=config.get("segment_mb", 64) * 2**20,
+                            max_bytes=config.get("max_mb", 1024) * 2**20)
+        except OSError as e:
+            logging.getLogger(__name__).warning("Log spool disabled: %s", e)
+            return None
+
+    def emit(self, record):
+        try:
+            self.post(self.format(record), logging_level_name(record.levelno), record.name)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        # Also logging.Handler.flush(), which logging.shutdown() calls at exit
+        if shiboken6.isValid(self) and shiboken6.isValid(self.view):
+            super().flush()
+
+    def close(self):
+        # Both QDialog and logging.Handler define close(); logging.shutdown()
+        # calls it at exit, possibly after Qt deleted the window. Closing the
+        # dialog only hides it, so the handler stays attached until
+        # _detach_handler runs on deletion
+        if shiboken6.isValid(self):
+            return super().close()
+        return False
+
+def _detach_handler(window):
+    # The window is being deleted: stop routing records to it, and let the
+    # next SharedLogWindow() create a new one
+    logging.getLogger().removeHandler(window)
+    logging.Handler.close(window)
+    if SharedLogWindow._instance is window:
+        SharedLogWindow._instance = None
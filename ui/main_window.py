@@ -1,13 +1,18 @@
-from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QStatusBar, QFileDialog, QListWidget, QListWidgetItem, QMessageBox, QStyle
+from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QStatusBar, QFileDialog, QListWidget, QListWidgetItem, QMessageBox, QStyle, QLineEdit
 from PySide6.QtCore import Qt
+from PySide6.QtGui import QBrush, QColor
 from ui.log_window import SharedLogWindow
-from ui.secondary_window import SecondaryMainWindow
+from ui.recent_projects import RecentProjectsIndex
 from settings import load_settings, save_settings, add_recent_file
 from ui.dialogs import SettingsDialog
+from profiler import profiled
+import logging
 import os
+import time
 
 class PrimaryMainWindow(QMainWindow):
     """Primary window for project management, logo/banner, recent projects, and shared log."""
+    @profiled()
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Simulation Project Manager")
@@ -38,9 +43,17 @@ class PrimaryMainWindow(QMainWindow):
         # Recent projects list
         self.recent_label = QLabel("<b>Recent Projects:</b>")
         layout.addWidget(self.recent_label)
+        self.recent_search = QLineEdit()
+        self.recent_search.setPlaceholderText("Search recent projects...")
+        self.recent_search.textChanged.connect(self.filter_recent_projects)
+        layout.addWidget(self.recent_search)
         self.recent_list = QListWidget()
+        self.recent_list.setUniformItemSizes(True)
         self.recent_list.itemClicked.connect(self.open_recent_project)
         layout.addWidget(self.recent_list)
+        self._recent_items = {}
+        self.recent_index = RecentProjectsIndex(self)
+        self.recent_index.metadata_ready.connect(self.on_recent_metadata)
         self.update_recent_projects()
         # Project info display
         self.project_info = QLabel()
@@ -51,6 +64,8 @@ class PrimaryMainWindow(QMainWindow):
         layout.addWidget(log_btn, alignment=Qt.AlignLeft)
         self.setCentralWidget(central_widget)
         self.log_window = SharedLogWindow(self)
+        # Records logged anywhere in the app, from any thread, show in the log window
+        logging.getLogger().addHandler(self.log_window)
         self.secondary_window = None
         # Connect project management actions
         new_btn.clicked.connect(self.new_project)
@@ -62,11 +77,74 @@ class PrimaryMainWindow(QMainWindow):
         self.log("Primary window started.")
 
     def update_recent_projects(self):
+        """Rebuild the list from cached metadata and refresh it in the background."""
         self.recent_list.clear()
+        self._recent_items = {}
+        projects = self.settings["recent_projects"]
         for path in self.settings.get("recent_files", []):
             item = QListWidgetItem(os.path.basename(path))
-            item.setToolTip(path)
+            item.setData(Qt.UserRole, path)
+            self._recent_items[path] = item
+            self._show_recent_metadata(item, path, projects.get(path, {}))
             self.recent_list.addItem(item)
+        self.filter_recent_projects(self.recent_search.text())
+        self.recent_index.refresh((path, projects.get(path)) for path in self._recent_items)
+
+    def add_recent_project(self, path):
+        """Record ``path`` as opened and move its list item to the top."""
+        add_recent_file(self.settings, path)
+        item = self._recent_items.get(path)
+        if item is None:
+            item = QListWidgetItem(os.path.basename(path))
+            item.setData(Qt.UserRole, path)
+            self._recent_items[path] = item
+        else:
+            self.recent_list.takeItem(self.recent_list.row(item))
+        self.recent_list.insertItem(0, item)
+        # Drop the items that fell off the end of the list
+        kept = set(self.settings["recent_files"])
+        for stale in [p for p in self._recent_items if p not in kept]:
+            self.recent_list.takeItem(self.recent_list.row(self._recent_items.pop(stale)))
+        meta = self.settings["recent_projects"][path]
+        self._show_recent_metadata(item, path, meta)
+        self.filter_recent_projects(self.recent_search.text(), [item])
+        self.recent_index.refresh([(path, meta)])
+
+    def _show_recent_metadata(self, item, path, meta):
+        lines = [path]
+        if meta.get("summary"):
+            lines.append(meta["summary"])
+        if meta.get("exists") is False:
+            lines.append("File not found")
+            item.setForeground(QBrush(QColor(128, 128, 128)))
+        elif meta.get("size") is not None:
+            modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(meta["mtime"]))
+            lines.append(f"{meta['size']} bytes, modified {modified}")
+            item.setData(Qt.ForegroundRole, None)
+        if meta.get("last_opened"):
+            lines.append("Last opened " + time.strftime("%Y-%m-%d %H:%M", time.localtime(meta["last_opened"])))
+        item.setToolTip("\n".join(lines))
+
+    def on_recent_metadata(self, path, meta):
+        """Merge refreshed metadata into the cache and update the project's list item."""
+        item = self._recent_items.get(path)
+        if item is None:
+            return
+        cached = self.settings["recent_projects"].setdefault(path, {})
+        if any(cached.get(key) != value for key, value in meta.items()):
+            cached.update(meta)
+            # Persisted with the next write-behind save
+            save_settings(self.settings)
+        self._show_recent_metadata(item, path, cached)
+        self.filter_recent_projects(self.recent_search.text(), [item])
+
+    def filter_recent_projects(self, text, items=None):
+        """Hide recent projects whose name, path or summary does not contain ``text``."""
+        text = text.lower()
+        if items is None:
+            items = self._recent_items.values()
+        for item in items:
+            item.setHidden(bool(text) and text not in item.toolTip().lower() and text not in item.text().lower())
 
     def new_project(self):
         fname, _ = QFileDialog.getSaveFileName(self, "Create New Project", "", "Simulation Project (*.simproj)")
@@ -75,9 +153,7 @@ class PrimaryMainWindow(QMainWindow):
                 fname += '.simproj'
             with open(fname, 'w') as f:
                 f.write("{}")  # Empty project file
-            add_recent_file(self.settings, fname)
-            save_settings(self.settings)
-            self.update_recent_projects()
+            self.add_recent_project(fname)
             self.display_project_info(fname)
             self.status_bar.showMessage(f"Created new project: {fname}")
             self.log(f"Created new project: {fname}")
@@ -85,9 +161,7 @@ class PrimaryMainWindow(QMainWindow):
     def open_project(self):
         fname, _ = QFileDialog.getOpenFileName(self, "Open Project", "", "Simulation Project (*.simproj)")
         if fname:
-            add_recent_file(self.settings, fname)
-            save_settings(self.settings)
-            self.update_recent_projects()
+            self.add_recent_project(fname)
             self.display_project_info(fname)
             self.status_bar.showMessage(f"Opened project: {fname}")
             self.log(f"Opened project: {fname}")
@@ -96,27 +170,26 @@ class PrimaryMainWindow(QMainWindow):
     def edit_project(self):
         fname, _ = QFileDialog.getOpenFileName(self, "Edit Project", "", "Simulation Project (*.simproj)")
         if fname:
-            add_recent_file(self.settings, fname)
-            save_settings(self.settings)
-            self.update_recent_projects()
+            self.add_recent_project(fname)
             self.display_project_info(fname)
             self.status_bar.showMessage(f"Editing project: {fname}")
             self.log(f"Editing project: {fname}")
             self.open_secondary(fname)
 
     def open_recent_project(self, item):
-        fname = item.toolTip()
-        if os.path.exists(fname):
-            add_recent_file(self.settings, fname)
-            save_settings(self.settings)
+        fname = item.data(Qt.UserRole)
+        # Cached by the background refresh; never stat on the GUI thread
+        if self.settings["recent_projects"].get(fname, {}).get("exists", True):
+            self.add_recent_project(fname)
             self.display_project_info(fname)
             self.status_bar.showMessage(f"Opened recent project: {fname}")
             self.log(f"Opened recent project: {fname}")
         else:
             QMessageBox.warning(self, "File Not Found", f"Project file not found: {fname}")
             self.settings["recent_files"].remove(fname)
+            self.settings["recent_projects"].pop(fname, None)
             save_settings(self.settings)
-            self.update_recent_projects()
+            self.recent_list.takeItem(self.recent_list.row(self._recent_items.pop(fname)))
 
     def display_project_info(self, fname):
         self.project_info.setText(f"<b>Project:</b> {os.path.basename(fname)}<br><b>Path:</b> {fname}")
@@ -126,14 +199,13 @@ class PrimaryMainWindow(QMainWindow):
         if dlg.exec():
             self.settings = dlg.get_settings()
             save_settings(self.settings)
-            from ui.theme import apply_theme
-            from PySide6.QtWidgets import QApplication
-            apply_theme(QApplication.instance())
             self.status_bar.showMessage("Preferences updated.")
             self.log("Preferences updated.")
 
     def open_secondary(self, project_path=None):
         if not self.secondary_window:
+            # Imported on first use: it pulls in the Vulkan bindings
+            from ui.secondary_window import SecondaryMainWindow
             self.secondary_window = SecondaryMainWindow(self.log_window)
         self.secondary_window.show()
         self.log("Opened secondary window.")
@@ -141,10 +213,7 @@ class PrimaryMainWindow(QMainWindow):
             self.secondary_window.setWindowTitle(f"Simulation Workflow - {os.path.basename(project_path)}")
 
     def show_log(self):
-        from ui.theme import apply_theme
-        from PySide6.QtWidgets import QApplication
-        apply_theme(QApplication.instance())
         self.log_window.show()
 
     def log(self, msg):
-        self.log_window.append_log(f"[Primary] {msg}")
+        self.log_window.append_log(msg, source="Primary")
@@ -0,0 +1,92 @@
+"""
+mesh_loader.py - Mesh import off the GUI thread, with progress and cancellation
+"""
+import logging
+import os
+import threading
+import shiboken6
+from PySide6.QtCore import QObject, Signal
+from mesh.bvh import MeshBVH
+from mesh.cache import source_key
+from mesh.importers import LoadCancelled, load_mesh
+from mesh.lod import MeshLOD
+from profiler import span
+
+log = logging.getLogger(__name__)
+
+class MeshLoader(QObject):
+    """Imports mesh files with mesh.importers.load_mesh on a daemon thread.
+
+    ``load`` returns immediately. While the import runs, ``progress(percent)``
+    is emitted; it ends with ``loaded(MeshData)``, ``failed(message)`` or,
+    after ``cancel()``, ``cancelled()``. All are delivered on the GUI
+    thread. Starting a load cancels the previous one, whose signals are
+    then dropped. With a mesh.cache.MeshCache, unchanged files are opened
+    from the cache, and other imports are stored in it before ``loaded``.
+    Loaded meshes come with a mesh.bvh.MeshBVH for culling and picking,
+    and a mesh.lod.MeshLOD.
+    """
+    progress = Signal(int)
+    loaded = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._current = None
+
+    def load(self, path, workers=None, cache=None):
+        self.cancel()
+        cancel = self._current = threading.Event()
+        threading.Thread(target=self._work, args=(path, workers, cache, cancel),
+                         name="mesh-loader", daemon=True).start()
+
+    def cancel(self):
+        """Stop the running import at its next chunk boundary."""
+        if self._current is not None:
+            self._current.set()
+
+    def _work(self, path, workers, cache, cancel):
+        last_percent = -1
+
+        def progress(fraction):
+            nonlocal last_percent
+            percent = int(fraction * 100)
+            if percent != last_percent and not cancel.is_set():
+                last_percent = percent
+                self._emit(cancel, self.progress, percent)
+
+        key = mesh = None
+        try:
+            if cache is not None:
+                # Taken before parsing, so a file changing meanwhile is not cached as the old contents
+                key = source_key(path)
+                mesh = cache.get(path, key)
+            if mesh is None:
+                mesh = load_mesh(path, progress, cancel.is_set, workers)
+            # Meshes opened from the cache may come with them
+            if mesh.bvh is None:
+                with span("build BVH"):
+                    mesh.bvh = MeshBVH(mesh.positions, mesh.triangles)
+            if mesh.lod is None:
+                with span("build levels of detail"):
+                    mesh.lod = MeshLOD(mesh.positions, mesh.triangles, mesh.bvh)
+        except LoadCancelled:
+            self._emit(cancel, self.cancelled)
+            return
+        except Exception as e:
+            self._emit(cancel, self.failed, f"{os.path.basename(path)}: {e or type(e).__name__}")
+            return
+        # Stored before ``loaded``, so the entry exists even if the application
+        # dies while the mesh is uploaded or drawn
+        if key is not None and not mesh.cached:
+            try:
+                cache.put(path, key, mesh)
+            except OSError as e:
+                log.warning("Could not cache mesh %s: %s", path, e)
+        self._emit(cancel, self.loaded, mesh)
+
+    def _emit(self, cancel, signal, *args):
+        # Drop signals of superseded loads, and of a loader deleted meanwhile
+        if cancel is self._current and shiboken6.isValid(self):
+            signal.emit(*args)
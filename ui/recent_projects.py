@@ -0,0 +1,85 @@
+"""
+recent_projects.py - Recent projects index with metadata refreshed off the GUI thread
+"""
+import json
+import os
+import queue
+import threading
+import shiboken6
+from PySide6.QtCore import QObject, Signal
+
+# Workers stat-ing project files; a hung network mount only blocks the workers
+REFRESH_WORKERS = 4
+# Project files larger than this are not parsed for a summary
+SUMMARY_MAX_BYTES = 256 * 1024
+
+def project_metadata(path, cached=None):
+    """Stat ``path`` and summarize the project; reuses ``cached`` if the file is unchanged.
+
+    Runs on a worker thread. Returns a dict with ``exists``, ``size``,
+    ``mtime`` and ``summary``.
+    """
+    cached = cached or {}
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {"exists": False, "size": None, "mtime": None, "summary": cached.get("summary", "")}
+    meta = {"exists": True, "size": st.st_size, "mtime": st.st_mtime}
+    if cached.get("size") == st.st_size and cached.get("mtime") == st.st_mtime and "summary" in cached:
+        meta["summary"] = cached["summary"]
+    else:
+        meta["summary"] = project_summary(path, st.st_size)
+    return meta
+
+def project_summary(path, size):
+    """A one-line description of a project file."""
+    if size > SUMMARY_MAX_BYTES:
+        return f"{size // 1024} KB project"
+    try:
+        with open(path, "r") as f:
+            project = json.load(f)
+    except (OSError, ValueError):
+        return "Unreadable project file"
+    if not isinstance(project, dict) or not project:
+        return "Empty project"
+    for key in ("description", "name", "title"):
+        if isinstance(project.get(key), str) and project[key]:
+            return project[key].splitlines()[0][:120]
+    return ", ".join(sorted(project)[:6])
+
+class RecentProjectsIndex(QObject):
+    """Refreshes cached recent project metadata on a pool of daemon threads.
+
+    ``refresh`` returns immediately; ``metadata_ready(path, metadata)`` is
+    emitted on the GUI thread as each result comes in. The workers are
+    daemon threads, so a stat stuck on an unreachable mount can neither
+    stall the GUI nor keep the application from exiting.
+    """
+    metadata_ready = Signal(str, dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        for i in range(REFRESH_WORKERS):
+            threading.Thread(target=self._work, name=f"recent-projects-{i}", daemon=True).start()
+
+    def refresh(self, entries):
+        """Queue ``(path, cached_metadata)`` pairs for a refresh, skipping ones already queued."""
+        with self._lock:
+            for path, cached in entries:
+                if path not in self._queued:
+                    self._queued.add(path)
+                    self._queue.put((path, dict(cached or {})))
+
+    def _work(self):
+        while True:
+            path, cached = self._queue.get()
+            try:
+                meta = project_metadata(path, cached)
+            finally:
+                with self._lock:
+                    self._queued.discard(path)
+            if shiboken6.isValid(self):
+                self.metadata_ready.emit(path, meta)
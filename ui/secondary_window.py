@@ -1,11 +1,17 @@
-from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QStackedWidget, QStatusBar, QFormLayout, QLabel, QLineEdit, QTextEdit, QComboBox
-from PySide6.QtCore import QPropertyAnimation, QEasingCurve, QObject, QEvent, Qt
+import os
+from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QStackedWidget, QStatusBar, QFormLayout, QLabel, QLineEdit, QTextEdit, QComboBox
+from PySide6.QtWidgets import QPushButton, QProgressBar, QFileDialog
+from PySide6.QtCore import QPropertyAnimation, QEasingCurve, QObject, QEvent, Qt, Signal
 from PySide6.QtWidgets import QGraphicsOpacityEffect
-from settings import load_settings, save_settings, add_recent_file, get_timestamp
+from settings import load_settings, save_settings, add_recent_file, get_timestamp, settings_store, get_setting
+from mesh.cache import MeshCache
+from vulkan.geometry import Mesh
 from vulkan.vulkan_widget import VulkanWidget
+from ui.mesh_loader import MeshLoader
 from ui.log_window import LogWindow
 from ui.badge_tab import BadgeTabBar
 from ui.dialogs import SettingsDialog, AboutDialog
+from profiler import profiled, span
 
 class DeviceTab(QWidget):
     """Widget for Device tab."""
@@ -17,13 +23,103 @@ class DeviceTab(QWidget):
         layout.addRow("Description:", QTextEdit())
 
 class MeshTab(QWidget):
-    """Widget for Mesh tab."""
+    """Widget for Mesh tab: imports OBJ, STL and Gmsh files off the GUI thread and shows their statistics.
+
+    ``mesh_loaded(MeshData)`` is emitted for every mesh imported.
+    """
+    mesh_loaded = Signal(object)
+    FILE_FILTER = "Meshes (*.obj *.stl *.msh);;All Files (*)"
+
     def __init__(self, parent=None):
         super().__init__(parent)
         layout = QFormLayout(self)
-        layout.addRow("Mesh File:", QLineEdit())
-        layout.addRow("Vertices:", QLabel("0"))
-        layout.addRow("Faces:", QLabel("0"))
+        self.path_edit = QLineEdit()
+        self.path_edit.setPlaceholderText("OBJ, STL or Gmsh .msh file")
+        self.path_edit.returnPressed.connect(self.load)
+        browse_button = QPushButton("Browse...")
+        browse_button.clicked.connect(self.browse)
+        self.load_button = QPushButton("Load")
+        self.load_button.clicked.connect(self.load)
+        file_row = QHBoxLayout()
+        file_row.addWidget(self.path_edit)
+        file_row.addWidget(browse_button)
+        file_row.addWidget(self.load_button)
+        layout.addRow("Mesh File:", file_row)
+        self.progress_bar = QProgressBar()
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        progress_row = QHBoxLayout()
+        progress_row.addWidget(self.progress_bar)
+        progress_row.addWidget(self.cancel_button)
+        layout.addRow("Progress:", progress_row)
+        self.vertices_label = QLabel("0")
+        self.faces_label = QLabel("0")
+        self.format_label = QLabel("-")
+        self.size_label = QLabel("-")
+        self.time_label = QLabel("-")
+        self.status_label = QLabel("")
+        layout.addRow("Vertices:", self.vertices_label)
+        layout.addRow("Faces:", self.faces_label)
+        layout.addRow("Format:", self.format_label)
+        layout.addRow("Size:", self.size_label)
+        layout.addRow("Import Time:", self.time_label)
+        layout.addRow(self.status_label)
+        self.loader = MeshLoader(self)
+        self.cancel_button.clicked.connect(self.loader.cancel)
+        self.loader.progress.connect(self.progress_bar.setValue)
+        self.loader.loaded.connect(self._on_loaded)
+        self.loader.failed.connect(self._on_failed)
+        self.loader.cancelled.connect(self._on_cancelled)
+
+    def browse(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Open Mesh", os.path.dirname(self.path_edit.text()), self.FILE_FILTER)
+        if path:
+            self.path_edit.setText(path)
+            self.load()
+
+    def load(self):
+        path = self.path_edit.text().strip()
+        if not path:
+            return
+        self.progress_bar.setValue(0)
+        self.cancel_button.setEnabled(True)
+        self.status_label.setText(f"Importing {os.path.basename(path)}...")
+        self.loader.load(path, cache=self._mesh_cache())
+
+    @staticmethod
+    def _mesh_cache():
+        """The mesh cache as configured, or None if caching is off."""
+        config = get_setting("mesh_cache", {})
+        if not config.get("enabled", True):
+            return None
+        return MeshCache(config.get("directory") or None, config.get("max_mb", 4096) * 2**20)
+
+    def _finish(self, status):
+        self.cancel_button.setEnabled(False)
+        self.status_label.setText(status)
+
+    def _on_loaded(self, data):
+        self.vertices_label.setText(f"{data.vertex_count:,}")
+        self.faces_label.setText(f"{data.triangle_count:,} triangles")
+        self.format_label.setText(f"{data.format} (from cache)" if data.cached else data.format)
+        self.size_label.setText(f"{data.file_size / 1e6:.1f} MB file, {data.nbytes / 1e6:.1f} MB of vertex and index data")
+        if data.cached:
+            self.time_label.setText(f"{data.seconds * 1000:.1f} ms (memory-mapped)")
+        else:
+            self.time_label.setText(f"{data.seconds:.2f} s ({data.file_size / 1e6 / max(data.seconds, 1e-9):.0f} MB/s)")
+        self.progress_bar.setValue(100)
+        welded = data.source_vertices - data.vertex_count
+        source = "from the mesh cache" if data.cached else f"{welded:,} duplicate or unused vertices removed"
+        self._finish(f"Loaded {os.path.basename(data.path)}; {source}.")
+        self.mesh_loaded.emit(data)
+
+    def _on_failed(self, message):
+        self.progress_bar.setValue(0)
+        self._finish(f"Import failed: {message}")
+
+    def _on_cancelled(self):
+        self.progress_bar.setValue(0)
+        self._finish("Import cancelled.")
 
 class MaterialPropertiesTab(QWidget):
     """Widget for Material Properties tab."""
@@ -69,14 +165,25 @@ class AboutTab(QWidget):
         layout = QVBoxLayout(self)
         layout.addWidget(QLabel("About this application."))
 
+# Tab pages, constructed when their tab is first clicked
+TAB_PAGES = {
+    "Device": DeviceTab,
+    "Mesh": MeshTab,
+    "Material Properties": MaterialPropertiesTab,
+    "Physical Models": PhysicalModelsTab,
+    "Solution": SolutionTab,
+    "Visualization": VisualizationTab,
+    "Help & Support": HelpSupportTab,
+    "About": AboutTab,
+}
+
 class SecondaryMainWindow(QMainWindow):
     """Secondary window for simulation workflow (badge tabs, Vulkan, etc)."""
+    @profiled()
     def __init__(self, shared_log_window=None):
         super().__init__()
         self.setWindowTitle("Simulation Workflow")
-        self.tab_names = [
-            "Device", "Mesh", "Material Properties", "Physical Models", "Solution", "Visualization", "Help & Support", "About"
-        ]
+        self.tab_names = list(TAB_PAGES)
         central_widget = QWidget()
         self.central_layout = QVBoxLayout(central_widget)
         self.badge_bar = BadgeTabBar(self.tab_names, self.on_tab_clicked)
@@ -85,19 +192,8 @@ class SecondaryMainWindow(QMainWindow):
         # Main VulkanWidget page
         self.vulkan_widget = VulkanWidget(self)
         self.stack.addWidget(self.vulkan_widget)
-        # Tab content pages (custom widgets)
-        self.tab_pages = {
-            "Device": DeviceTab(),
-            "Mesh": MeshTab(),
-            "Material Properties": MaterialPropertiesTab(),
-            "Physical Models": PhysicalModelsTab(),
-            "Solution": SolutionTab(),
-            "Visualization": VisualizationTab(),
-            "Help & Support": HelpSupportTab(),
-            "About": AboutTab(),
-        }
-        for page in self.tab_pages.values():
-            self.stack.addWidget(page)
+        # Tab content pages (custom widgets), built on first use by tab_page()
+        self.tab_pages = {}
         self.central_layout.addWidget(self.stack)
         self.setCentralWidget(central_widget)
         self.status_bar = QStatusBar()
@@ -107,6 +203,25 @@ class SecondaryMainWindow(QMainWindow):
         else:
             self.log_window = LogWindow(self)
         self.settings = load_settings()
+        store = settings_store()
+        self.vulkan_widget.set_max_fps(store.get_int("performance.max_fps", 60))
+        self.destroyed.connect(store.subscribe("performance.max_fps", self.vulkan_widget.set_max_fps))
+        self.vulkan_widget.set_vsync(store.get_bool("performance.vsync", True))
+        self.destroyed.connect(store.subscribe("performance.vsync", self.vulkan_widget.set_vsync))
+        self.vulkan_widget.set_frames_in_flight(store.get_int("performance.frames_in_flight", 2))
+        self.destroyed.connect(store.subscribe("performance.frames_in_flight", self.vulkan_widget.set_frames_in_flight))
+        self.vulkan_widget.set_culling(store.get_bool("performance.frustum_culling", True))
+        self.destroyed.connect(store.subscribe("performance.frustum_culling", self.vulkan_widget.set_culling))
+        self.vulkan_widget.set_lod(store.get_bool("performance.level_of_detail", True))
+        self.destroyed.connect(store.subscribe("performance.level_of_detail", self.vulkan_widget.set_lod))
+        self.vulkan_widget.set_pane_count(store.get_int("viewports.panes", 1))
+        self.destroyed.connect(store.subscribe("viewports.panes", self.vulkan_widget.set_pane_count))
+        self.vulkan_widget.set_cameras_linked(store.get_bool("viewports.link_cameras", True))
+        self.destroyed.connect(store.subscribe("viewports.link_cameras", self.vulkan_widget.set_cameras_linked))
+        # The imported mesh, and its copy on the GPU while the viewports have a device
+        self.mesh_data = None
+        self.gpu_mesh = None
+        self.vulkan_widget.device_ready.connect(self._upload_mesh)
         self.apply_settings()
         self._create_menu()
         self._connect_signals()
@@ -117,8 +232,19 @@ class SecondaryMainWindow(QMainWindow):
         self.stack.setCurrentWidget(self.vulkan_widget)
         self.badge_bar.set_active("")
 
+    def tab_page(self, name):
+        """Return the page of tab ``name``, constructing it on first use."""
+        page = self.tab_pages.get(name)
+        if page is None:
+            with span(f"{TAB_PAGES[name].__name__}.__init__"):
+                page = self.tab_pages[name] = TAB_PAGES[name]()
+            if isinstance(page, MeshTab):
+                page.mesh_loaded.connect(self.show_mesh)
+            self.stack.addWidget(page)
+        return page
+
     def on_tab_clicked(self, name):
-        new_widget = self.tab_pages[name]
+        new_widget = self.tab_page(name)
         current_widget = self.stack.currentWidget()
         if current_widget is new_widget:
             return
@@ -173,9 +299,6 @@ class SecondaryMainWindow(QMainWindow):
         if dlg.exec():
             self.settings = dlg.get_settings()
             save_settings(self.settings)
-            from ui.theme import apply_theme
-            from PySide6.QtWidgets import QApplication
-            apply_theme(QApplication.instance())
             self.apply_settings()
             self.status_bar.showMessage("Settings updated.")
             self._log_action("Settings updated.")
@@ -216,5 +339,40 @@ class SecondaryMainWindow(QMainWindow):
         # ...existing code for mouseReleaseEvent...
         pass
 
+    def show_mesh(self, data):
+        """Show an imported mesh (mesh.data.MeshData) in the viewports, replacing the previous one."""
+        self.mesh_data = data
+        self._log_action(f"Imported mesh {data.path}: {data.vertex_count} vertices, "
+                         f"{data.triangle_count} triangles in {data.seconds:.2f} s.")
+        self._upload_mesh()
+
+    def _upload_mesh(self, error=None):
+        widget = self.vulkan_widget
+        if self.mesh_data is None or not widget.initialized:
+            # Uploaded once the device is ready
+            return
+        previous = self.gpu_mesh
+        try:
+            with span("upload mesh"):
+                self.gpu_mesh = Mesh(widget.context, self.mesh_data.positions, self.mesh_data.triangles,
+                                     bvh=self.mesh_data.bvh, lod=self.mesh_data.lod)
+        except Exception as e:
+            self.gpu_mesh = None
+            self._log_action(f"Could not upload mesh: {e}")
+        widget.set_meshes([self.gpu_mesh] if self.gpu_mesh is not None else [])
+        if previous is not None:
+            previous.destroy()
+
     def _log_action(self, msg):
-        self.log_window.append_log(f"[Secondary] {msg}")
+        self.log_window.append_log(msg, source="Secondary")
+
+    def closeEvent(self, event):
+        # Frees the window's surface and swapchain, and the shared Vulkan
+        # context if no other viewport uses it; reopening initializes again
+        # and uploads the mesh anew
+        if self.gpu_mesh is not None:
+            self.vulkan_widget.set_meshes([], frame=False)
+            self.gpu_mesh.destroy()
+            self.gpu_mesh = None
+        self.vulkan_widget.cleanup()
+        super().closeEvent(event)
@@ -1,72 +1,215 @@
 """
 theme.py - Modern QSS theme management for dynamic UI/UX
 """
-from PySide6.QtWidgets import QApplication
-from settings import load_settings
-import os
+import logging
+import time
+from string import Template
+from PySide6.QtGui import QColor, QPalette
+from PySide6.QtWidgets import QApplication, QPushButton
+from settings import get_setting
 
-def get_qss(theme="dark"):
-    """Return QSS string for the given theme."""
-    # Modern, fluid, accessible QSS for light/dark
-    base_qss = """
+BACKENDS = ["qss", "palette"]
+
+# Palette tokens per theme, substituted into QSS_TEMPLATE
+THEMES = {
+    "dark": {
+        "background": "#23232b",
+        "text": "#f0f0f0",
+        "button": "#3a3a4a",
+        "button_text": "#fff",
+        "field": "#29293a",
+        "border": "#444",
+        "status": "#1a1a22",
+        "status_text": "#b0b0b0",
+        "accent": "#6a8cff",
+        "accent_pressed": "#3451a1",
+    },
+    "light": {
+        "background": "#f8f8fa",
+        "text": "#23232b",
+        "button": "#e0e0f0",
+        "button_text": "#23232b",
+        "field": "#ffffff",
+        "border": "#444",
+        "status": "#eaeaf0",
+        "status_text": "#b0b0b0",
+        "accent": "#6a8cff",
+        "accent_pressed": "#3451a1",
+    },
+}
+
+# Modern, fluid, accessible QSS for light/dark
+QSS_TEMPLATE = Template("""
     QWidget {
         font-family: 'Segoe UI', 'Arial', sans-serif;
         font-size: 13px;
-        background: #23232b;
-        color: #f0f0f0;
+        background: $background;
+        color: $text;
     }
     QPushButton {
         border-radius: 12px;
-        background: #3a3a4a;
-        color: #fff;
+        background: $button;
+        color: $button_text;
         padding: 7px 20px;
         font-weight: 600;
     }
     QPushButton:hover {
-        background: #6a8cff;
-        color: #fff;
+        background: $accent;
+        color: $button_text;
     }
     QPushButton:pressed {
-        background: #3451a1;
+        background: $accent_pressed;
     }
     QLineEdit, QTextEdit, QComboBox {
         border-radius: 8px;
-        background: #29293a;
-        color: #f0f0f0;
-        border: 1px solid #444;
+        background: $field;
+        color: $text;
+        border: 1px solid $border;
         padding: 5px;
     }
     QListWidget {
-        background: #23232b;
-        color: #f0f0f0;
+        background: $background;
+        color: $text;
         border-radius: 8px;
     }
     QStatusBar {
-        background: #1a1a22;
-        color: #b0b0b0;
+        background: $status;
+        color: $status_text;
     }
     QDialog {
-        background: #23232b;
+        background: $background;
     }
     QTabBar::tab {
-        background: #3a3a4a;
-        color: #fff;
+        background: $button;
+        color: $button_text;
         border-radius: 10px;
         padding: 6px 18px;
         margin: 2px;
     }
     QTabBar::tab:selected {
-        background: #6a8cff;
-        color: #fff;
+        background: $accent;
+        color: $button_text;
+    }
+    """)
+
+# The "palette" backend: colors come from a QPalette on the Fusion style and
+# only the rules a palette cannot express stay in a style sheet. The sheet
+# refers to palette roles instead of colors, so it is the same for every
+# theme and switching themes only swaps the palette.
+PALETTE_QSS = """
+    QPushButton {
+        border-radius: 12px;
+        background: palette(button);
+        color: palette(button-text);
+        padding: 7px 20px;
+        font-weight: 600;
+    }
+    QPushButton:hover, QPushButton:checked {
+        background: palette(highlight);
+    }
+    QPushButton:pressed {
+        background: palette(link-visited);
     }
     """
-    light_qss = base_qss.replace("#23232b", "#f8f8fa").replace("#3a3a4a", "#e0e0f0").replace("#29293a", "#ffffff").replace("#1a1a22", "#eaeaf0").replace("#f0f0f0", "#23232b").replace("#fff", "#23232b")
-    return base_qss if theme == "dark" else light_qss
 
-def apply_theme(app: QApplication, theme=None):
-    """Apply the selected theme to the QApplication."""
+_compiled = {}
+_palettes = {}
+# (backend, theme) last applied per application
+_active = {}
+_native_style = {}
+
+def get_qss(theme="dark"):
+    """Return QSS string for the given theme, compiled once per theme."""
+    if theme not in THEMES:
+        theme = "dark"
+    qss = _compiled.get(theme)
+    if qss is None:
+        qss = _compiled[theme] = QSS_TEMPLATE.substitute(THEMES[theme])
+    return qss
+
+def get_palette(theme="dark"):
+    """Return the QPalette expressing the given theme."""
+    if theme not in THEMES:
+        theme = "dark"
+    palette = _palettes.get(theme)
+    if palette is None:
+        tokens = {name: QColor(value) for name, value in THEMES[theme].items()}
+        palette = QPalette()
+        for role, token in [
+            (QPalette.Window, "background"),
+            (QPalette.WindowText, "text"),
+            (QPalette.Base, "field"),
+            (QPalette.AlternateBase, "background"),
+            (QPalette.Text, "text"),
+            (QPalette.Button, "button"),
+            (QPalette.ButtonText, "button_text"),
+            (QPalette.ToolTipBase, "field"),
+            (QPalette.ToolTipText, "text"),
+            (QPalette.PlaceholderText, "status_text"),
+            (QPalette.Highlight, "accent"),
+            (QPalette.HighlightedText, "button_text"),
+            (QPalette.Link, "accent"),
+            # Pressed buttons in PALETTE_QSS
+            (QPalette.LinkVisited, "accent_pressed"),
+        ]:
+            palette.setColor(role, tokens[token])
+        for role in (QPalette.WindowText, QPalette.Text, QPalette.ButtonText):
+            palette.setColor(QPalette.Disabled, role, tokens["status_text"])
+        palette = _palettes[theme] = palette
+    return palette
+
+def style_widget(widget, theme, qss):
+    """Give one window its own look: ``qss`` on the qss backend, the theme's palette otherwise."""
+    if get_setting("theme_backend", "qss") == "palette":
+        widget.setStyleSheet("")
+        widget.setPalette(get_palette(theme))
+    else:
+        widget.setStyleSheet(qss)
+
+def apply_theme(app: QApplication, theme=None, backend=None):
+    """Apply the selected theme to the QApplication.
+
+    ``backend`` is "qss" (a full application style sheet) or "palette"
+    (QPalette on the Fusion style plus a minimal style sheet); both default
+    to the settings. Restyling re-polishes every widget, so this does
+    nothing if the theme is already active. Returns the seconds spent
+    restyling (0.0 when nothing changed); the cost is also logged.
+    """
     if theme is None:
-        settings = load_settings()
-        theme = settings.get("theme", "dark")
-    qss = get_qss(theme)
-    app.setStyleSheet(qss)
+        theme = get_setting("theme", "dark")
+    if backend is None:
+        backend = get_setting("theme_backend", "qss")
+    if backend not in BACKENDS:
+        backend = "qss"
+    key = id(app)
+    qss = PALETTE_QSS if backend == "palette" else get_qss(theme)
+    if _active.get(key) == (backend, theme) and app.styleSheet() == qss:
+        return 0.0
+    # Before our first style sheet, app.style() is still the native style
+    native = _native_style.setdefault(key, app.style().name())
+    previous = _active.get(key, (None, None))[0]
+    start = time.perf_counter()
+    if backend == "palette":
+        if previous != "palette" and native.lower() != "fusion":
+            app.setStyle("Fusion")
+        app.setPalette(get_palette(theme))
+        if app.styleSheet() != qss:
+            app.setStyleSheet(qss)
+        else:
+            # palette() colors are resolved when a widget is polished; only
+            # the widgets PALETTE_QSS styles need it again
+            for widget in app.allWidgets():
+                if isinstance(widget, QPushButton):
+                    widget.style().unpolish(widget)
+                    widget.style().polish(widget)
+    else:
+        if previous == "palette":
+            if native.lower() != "fusion":
+                app.setStyle(native)
+            app.setPalette(app.style().standardPalette())
+        app.setStyleSheet(qss)
+    elapsed = time.perf_counter() - start
+    _active[key] = (backend, theme)
+    logging.getLogger(__name__).info("Applied %s theme (%s backend) to %d widgets in %.1f ms",
+                                     theme, backend, len(app.allWidgets()), elapsed * 1000)
+    return elapsed
@@ -0,0 +1,22 @@
+"""
+vulkan - Vulkan rendering widgets
+
+This package has the same name as the ``vulkan`` bindings from PyPI and
+shadows them when the application runs from the repository root. The
+bindings' directory is added to this package's path, so they import as
+``vulkan._vulkan``; see ``vulkan_widget.load_vulkan``.
+"""
+import os
+import sys
+
+def _bindings_dir():
+    here = os.path.dirname(os.path.abspath(__file__))
+    for entry in sys.path:
+        candidate = os.path.abspath(os.path.join(entry or os.curdir, "vulkan"))
+        if candidate != here and os.path.isfile(os.path.join(candidate, "_vulkan.py")):
+            return candidate
+    return None
+
+_bindings = _bindings_dir()
+if _bindings is not None:
+    __path__.append(_bindings)
@@ -0,0 +1,125 @@
+"""
+camera.py - Orbit camera of a viewport pane, and the pane layouts of VulkanWidget
+"""
+import math
+import numpy as np
+
+# Pane count -> (columns, rows)
+PANE_LAYOUTS = {1: (1, 1), 2: (2, 1), 4: (2, 2)}
+# Mouse sensitivity
+ORBIT_DEGREES_PER_PIXEL = 0.4
+ZOOM_STEP = 1.1
+
+def pane_rects(count, width, height):
+    """(x, y, width, height) of each pane for ``count`` panes in a ``width`` x ``height`` area.
+
+    Panes fill the area row by row; the last column and row absorb the
+    remainder so the panes cover every pixel.
+    """
+    columns, rows = PANE_LAYOUTS[count]
+    rects = []
+    for row in range(rows):
+        y = row * height // rows
+        pane_height = (row + 1) * height // rows - y
+        for column in range(columns):
+            x = column * width // columns
+            rects.append((x, y, (column + 1) * width // columns - x, pane_height))
+    return rects
+
+class Camera:
+    """Perspective camera orbiting ``target`` at ``distance``, with angles in degrees."""
+    def __init__(self, target=(0.0, 0.0, 0.0), distance=3.0, yaw=0.0, pitch=0.0, fov=45.0, near=0.01, far=100.0):
+        self.target = np.array(target, dtype=np.float64)
+        self.distance = distance
+        self.yaw = yaw
+        self.pitch = pitch
+        self.fov = fov
+        self.near = near
+        self.far = far
+
+    def copy_from(self, other):
+        self.target = other.target.copy()
+        self.distance = other.distance
+        self.yaw = other.yaw
+        self.pitch = other.pitch
+        self.fov = other.fov
+        self.near = other.near
+        self.far = other.far
+
+    def frame(self, lo, hi):
+        """Aim at the box from ``lo`` to ``hi`` from just far enough to see all of it."""
+        lo, hi = np.asarray(lo, dtype=np.float64), np.asarray(hi, dtype=np.float64)
+        radius = max(float(np.linalg.norm(hi - lo)) / 2, 1e-6)
+        self.target = (lo + hi) / 2
+        self.distance = radius / math.sin(math.radians(self.fov) / 2)
+        # Depth range covering the model from any orbit, with room to zoom out
+        self.near = radius * 1e-3
+        self.far = self.distance + radius * 100
+
+    def orbit(self, dx, dy):
+        """Rotate around the target by a mouse drag of ``dx``, ``dy`` pixels."""
+        self.yaw = (self.yaw - dx * ORBIT_DEGREES_PER_PIXEL) % 360.0
+        self.pitch = max(-89.0, min(89.0, self.pitch - dy * ORBIT_DEGREES_PER_PIXEL))
+
+    def zoom(self, steps):
+        """Move towards (positive ``steps``) or away from the target."""
+        self.distance = max(self.near * 2, self.distance * ZOOM_STEP ** -steps)
+
+    def eye(self):
+        yaw, pitch = math.radians(self.yaw), math.radians(self.pitch)
+        direction = np.array([math.cos(pitch) * math.sin(yaw), math.sin(pitch), math.cos(pitch) * math.cos(yaw)])
+        return self.target + self.distance * direction
+
+    def view_matrix(self):
+        eye = self.eye()
+        forward = self.target - eye
+        forward /= np.linalg.norm(forward)
+        right = np.cross(forward, (0.0, 1.0, 0.0))
+        right /= np.linalg.norm(right)
+        up = np.cross(right, forward)
+        view = np.identity(4)
+        view[0, :3], view[1, :3], view[2, :3] = right, up, -forward
+        view[:3, 3] = -view[:3, :3] @ eye
+        return view
+
+    def projection_matrix(self, aspect):
+        """Vulkan clip space: y points down, depth from 0 to 1."""
+        f = 1.0 / math.tan(math.radians(self.fov) / 2)
+        near, far = self.near, self.far
+        projection = np.zeros((4, 4))
+        projection[0, 0] = f / aspect
+        projection[1, 1] = -f
+        projection[2, 2] = far / (near - far)
+        projection[2, 3] = near * far / (near - far)
+        projection[3, 2] = -1.0
+        return projection
+
+    def view_projection(self, aspect):
+        return self.projection_matrix(aspect) @ self.view_matrix()
+
+    def frustum_planes(self, aspect):
+        """(6, 4) rows (a, b, c, d) of the view frustum's planes; a point x is inside where a·x + d >= 0.
+
+        Extracted from the view-projection matrix (Gribb and Hartmann), with
+        Vulkan's 0..1 depth range for the near plane.
+        """
+        m = self.view_projection(aspect)
+        planes = np.array([m[3] + m[0], m[3] - m[0], m[3] + m[1], m[3] - m[1], m[2], m[3] - m[2]])
+        return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+    def ray(self, aspect, x, y):
+        """(origin, unit direction) of the ray through pane position ``x``, ``y`` (0..1 from the top left)."""
+        inverse = np.linalg.inv(self.view_projection(aspect))
+        near = inverse @ (2 * x - 1, 2 * y - 1, 0.0, 1.0)
+        far = inverse @ (2 * x - 1, 2 * y - 1, 1.0, 1.0)
+        near, far = near[:3] / near[3], far[:3] / far[3]
+        direction = far - near
+        return near, direction / np.linalg.norm(direction)
+
+    def pixels_per_unit(self, height):
+        """Pixels one world unit covers at distance 1 in a viewport ``height`` pixels tall."""
+        return height / (2 * math.tan(math.radians(self.fov) / 2))
+
+    def push_constants(self, aspect):
+        """The view-projection matrix as GLSL lays out a mat4 (column-major float32)."""
+        return self.view_projection(aspect).astype(np.float32).tobytes(order="F")
@@ -0,0 +1,455 @@
+"""
+context.py - The Vulkan instance, device and pipelines shared by every VulkanWidget
+
+One VulkanContext exists per process while any widget holds it:
+``acquire()`` creates it on first use (from any thread) and counts
+references, ``release()`` tears it down when the last widget lets go.
+Widgets own only their surface, swapchain, framebuffers and per-frame
+objects.
+"""
+import ctypes
+import logging
+import os
+import threading
+from ctypes.util import find_library
+
+from profiler import span
+from vulkan.geometry import VERTEX_STRIDE, StagingBuffer
+from vulkan.memory import MemoryAllocator
+from vulkan.pipeline_cache import PipelineCache, ShaderModuleCache
+
+# Extension functions resolved through vkGetDeviceProcAddr; the rest go
+# through vkGetInstanceProcAddr
+DEVICE_FUNCTIONS = ('vkCreateSwapchainKHR', 'vkGetSwapchainImagesKHR', 'vkAcquireNextImageKHR',
+                    'vkQueuePresentKHR', 'vkDestroySwapchainKHR')
+# Compiled from the GLSL sources next to them by vulkan/shaders/build_shaders.py
+SHADERS = ('mesh.vert.spv', 'mesh.frag.spv')
+# Depth formats in order of preference; every device supports one of them
+DEPTH_FORMATS = ('VK_FORMAT_D32_SFLOAT', 'VK_FORMAT_D32_SFLOAT_S8_UINT', 'VK_FORMAT_D24_UNORM_S8_UINT')
+# Push constants of the vertex stage: the pane camera's view-projection matrix
+PUSH_CONSTANTS_SIZE = 64
+
+_context = None
+_refs = 0
+_lock = threading.Lock()
+
+def acquire():
+    """The shared context, created on first use; pair every call with ``release()``."""
+    global _context, _refs
+    with _lock:
+        if _context is None:
+            _context = VulkanContext()
+        _refs += 1
+        return _context
+
+def release():
+    """Drop one reference; the last one destroys the context."""
+    global _context, _refs
+    with _lock:
+        if _refs == 0:
+            return
+        _refs -= 1
+        if _refs == 0:
+            context, _context = _context, None
+            context.destroy()
+
+def references():
+    return _refs
+
+class VulkanContext:
+    """Instance, device, graphics queue, command pool, memory, shader modules and pipelines.
+
+    Creation may run on a worker thread. The command pool belongs to the
+    GUI thread, which records all frames. The queue may be used from any
+    thread holding ``queue_lock``, so meshes can be uploaded in the
+    background; ``pipeline()``, the allocator and the staging buffer are
+    thread-safe as well.
+    """
+    def __init__(self):
+        from vulkan.vulkan_widget import load_vulkan
+        with span("import vulkan"):
+            self.vk = vk = load_vulkan()
+        self._lock = threading.Lock()
+        self.queue_lock = threading.Lock()
+        self._procs = {}
+        self._staging = None
+        # Swapchain format -> (render pass, pipeline layout, pipeline)
+        self.pipelines = {}
+        self._libX11 = None
+        self.display = None
+        # Checked first: a fresh checkout has no compiled shaders, and failing
+        # here creates nothing that would need destroying
+        shader_dir = os.path.join(os.path.dirname(__file__), 'shaders')
+        paths = [os.path.join(shader_dir, name) for name in SHADERS]
+        missing = [path for path in paths if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"{', '.join(missing)} not found; compile the shaders with "
+                                    "python3 vulkan/shaders/build_shaders.py")
+        self.instance = self.device = self.allocator = None
+        self.shader_cache = self.pipeline_cache = self.command_pool = None
+        try:
+            with span("vkCreateInstance"):
+                app_info = {
+                    'sType': vk.VK_STRUCTURE_TYPE_APPLICATION_INFO,
+                    'pApplicationName': 'PyVulkanApp',
+                    'applicationVersion': vk.VK_MAKE_VERSION(1, 0, 0),
+                    'pEngineName': 'NoEngine',
+                    'engineVersion': vk.VK_MAKE_VERSION(1, 0, 0),
+                    'apiVersion': vk.VK_API_VERSION_1_0
+                }
+                extensions = [vk.VK_KHR_SURFACE_EXTENSION_NAME, vk.VK_KHR_XLIB_SURFACE_EXTENSION_NAME]
+                create_info = {
+                    'sType': vk.VK_STRUCTURE_TYPE_INSTANCE_CREATE_INFO,
+                    'pApplicationInfo': app_info,
+                    'enabledExtensionCount': len(extensions),
+                    'ppEnabledExtensionNames': extensions
+                }
+                self.instance = vk.vkCreateInstance(create_info, None)
+            # Presentation support is checked per surface, once one exists
+            with span("vkCreateDevice"):
+                self.physical_device = vk.vkEnumeratePhysicalDevices(self.instance)[0]
+                self.queue_family_index = self._find_graphics_queue_family()
+                queue_info = vk.VkDeviceQueueCreateInfo(
+                    sType=vk.VK_STRUCTURE_TYPE_DEVICE_QUEUE_CREATE_INFO,
+                    queueFamilyIndex=self.queue_family_index,
+                    queueCount=1,
+                    pQueuePriorities=[1.0]
+                )
+                device_extensions = [vk.VK_KHR_SWAPCHAIN_EXTENSION_NAME]
+                # Culled meshes draw their visible chunks with one indirect call
+                # if the device can take several draws per call
+                supported = vk.vkGetPhysicalDeviceFeatures(self.physical_device)
+                self.multi_draw_indirect = bool(supported.multiDrawIndirect)
+                features = vk.VkPhysicalDeviceFeatures(
+                    multiDrawIndirect=vk.VK_TRUE if self.multi_draw_indirect else vk.VK_FALSE)
+                device_info = vk.VkDeviceCreateInfo(
+                    sType=vk.VK_STRUCTURE_TYPE_DEVICE_CREATE_INFO,
+                    queueCreateInfoCount=1,
+                    pQueueCreateInfos=[queue_info],
+                    enabledExtensionCount=len(device_extensions),
+                    ppEnabledExtensionNames=device_extensions,
+                    pEnabledFeatures=[features]
+                )
+                self.device = vk.vkCreateDevice(self.physical_device, device_info, None)
+                self.queue = vk.vkGetDeviceQueue(self.device, self.queue_family_index, 0)
+            self.allocator = MemoryAllocator(vk, self.physical_device, self.device)
+            self.depth_format = self._find_depth_format()
+            with span("load shader modules"):
+                self.shader_cache = ShaderModuleCache(vk, self.device)
+                self.shader_modules = [self.shader_cache.load(path) for path in paths]
+            with span("load pipeline cache"):
+                self.pipeline_cache = PipelineCache(vk, self.physical_device, self.device)
+            pool_info = vk.VkCommandPoolCreateInfo(
+                sType=vk.VK_STRUCTURE_TYPE_COMMAND_POOL_CREATE_INFO,
+                flags=vk.VK_COMMAND_POOL_CREATE_RESET_COMMAND_BUFFER_BIT,
+                queueFamilyIndex=self.queue_family_index
+            )
+            self.command_pool = vk.vkCreateCommandPool(self.device, pool_info, None)
+        except BaseException:
+            # Destroy whatever was created before the failure
+            self.destroy()
+            raise
+
+    def _find_graphics_queue_family(self):
+        queue_families = self.vk.vkGetPhysicalDeviceQueueFamilyProperties(self.physical_device)
+        for i, qf in enumerate(queue_families):
+            if qf.queueFlags & self.vk.VK_QUEUE_GRAPHICS_BIT:
+                return i
+        return 0
+
+    def _find_depth_format(self):
+        vk = self.vk
+        for name in DEPTH_FORMATS:
+            props = vk.vkGetPhysicalDeviceFormatProperties(self.physical_device, getattr(vk, name))
+            if props.optimalTilingFeatures & vk.VK_FORMAT_FEATURE_DEPTH_STENCIL_ATTACHMENT_BIT:
+                return getattr(vk, name)
+        raise RuntimeError("no supported depth format")
+
+    def staging_buffer(self):
+        """The StagingBuffer meshes are uploaded through, created on first use."""
+        with self._lock:
+            if self._staging is None:
+                self._staging = StagingBuffer(self)
+            return self._staging
+
+    def submit(self, command_buffer, fence, wait_semaphores=(), wait_stages=(), signal_semaphores=()):
+        """Submit one command buffer to the graphics queue; callable from any thread.
+
+        With ``command_buffer`` None the batch only waits on and signals the semaphores and fence.
+        """
+        vk = self.vk
+        submit_info = vk.VkSubmitInfo(
+            sType=vk.VK_STRUCTURE_TYPE_SUBMIT_INFO,
+            waitSemaphoreCount=len(wait_semaphores),
+            pWaitSemaphores=list(wait_semaphores) or None,
+            pWaitDstStageMask=list(wait_stages) or None,
+            commandBufferCount=0 if command_buffer is None else 1,
+            pCommandBuffers=None if command_buffer is None else [command_buffer],
+            signalSemaphoreCount=len(signal_semaphores),
+            pSignalSemaphores=list(signal_semaphores) or None
+        )
+        with self.queue_lock:
+            vk.vkQueueSubmit(self.queue, 1, [submit_info], fence)
+
+    def wait_idle(self):
+        """Wait until the GPU finished everything submitted so far."""
+        with self.queue_lock:
+            self.vk.vkDeviceWaitIdle(self.device)
+
+    def proc(self, name):
+        """Look up an extension function; the bindings do not export them directly."""
+        fn = self._procs.get(name)
+        if fn is None:
+            if name in DEVICE_FUNCTIONS:
+                fn = self.vk.vkGetDeviceProcAddr(self.device, name)
+            else:
+                fn = self.vk.vkGetInstanceProcAddr(self.instance, name)
+            self._procs[name] = fn
+        return fn
+
+    def create_xlib_surface(self, window_id):
+        """A surface for the X11 window ``window_id``, on the context's display connection."""
+        vk = self.vk
+        with self._lock:
+            if self.display is None:
+                self._libX11 = ctypes.cdll.LoadLibrary(find_library('X11'))
+                self._libX11.XOpenDisplay.restype = ctypes.c_void_p
+                self._libX11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+                self.display = self._libX11.XOpenDisplay(None)
+                if not self.display:
+                    self.display = None
+                    raise RuntimeError("cannot open the X display")
+        info = vk.VkXlibSurfaceCreateInfoKHR(
+            sType=vk.VK_STRUCTURE_TYPE_XLIB_SURFACE_CREATE_INFO_KHR,
+            dpy=vk.ffi.cast('Display*', self.display),
+            window=window_id
+        )
+        return self.proc('vkCreateXlibSurfaceKHR')(self.instance, info, None)
+
+    def destroy_surface(self, surface):
+        self.proc('vkDestroySurfaceKHR')(self.instance, surface, None)
+
+    def pipeline(self, image_format):
+        """(render pass, pipeline layout, pipeline) for swapchain images of ``image_format``.
+
+        Created on first request through the persistent pipeline cache,
+        then shared by every widget.
+        """
+        with self._lock:
+            if image_format not in self.pipelines:
+                self.pipelines[image_format] = self._create_render_pass_and_pipeline(image_format)
+                # Saved right away: teardown does not run when the process is killed
+                self.pipeline_cache.save()
+            return self.pipelines[image_format]
+
+    def _create_render_pass_and_pipeline(self, image_format):
+        vk = self.vk
+        # Render pass
+        color_attachment = vk.VkAttachmentDescription(
+            format=image_format,
+            samples=vk.VK_SAMPLE_COUNT_1_BIT,
+            loadOp=vk.VK_ATTACHMENT_LOAD_OP_CLEAR,
+            storeOp=vk.VK_ATTACHMENT_STORE_OP_STORE,
+            stencilLoadOp=vk.VK_ATTACHMENT_LOAD_OP_DONT_CARE,
+            stencilStoreOp=vk.VK_ATTACHMENT_STORE_OP_DONT_CARE,
+            initialLayout=vk.VK_IMAGE_LAYOUT_UNDEFINED,
+            finalLayout=vk.VK_IMAGE_LAYOUT_PRESENT_SRC_KHR
+        )
+        depth_attachment = vk.VkAttachmentDescription(
+            format=self.depth_format,
+            samples=vk.VK_SAMPLE_COUNT_1_BIT,
+            loadOp=vk.VK_ATTACHMENT_LOAD_OP_CLEAR,
+            storeOp=vk.VK_ATTACHMENT_STORE_OP_DONT_CARE,
+            stencilLoadOp=vk.VK_ATTACHMENT_LOAD_OP_DONT_CARE,
+            stencilStoreOp=vk.VK_ATTACHMENT_STORE_OP_DONT_CARE,
+            initialLayout=vk.VK_IMAGE_LAYOUT_UNDEFINED,
+            finalLayout=vk.VK_IMAGE_LAYOUT_DEPTH_STENCIL_ATTACHMENT_OPTIMAL
+        )
+        color_attachment_ref = vk.VkAttachmentReference(
+            attachment=0,
+            layout=vk.VK_IMAGE_LAYOUT_COLOR_ATTACHMENT_OPTIMAL
+        )
+        depth_attachment_ref = vk.VkAttachmentReference(
+            attachment=1,
+            layout=vk.VK_IMAGE_LAYOUT_DEPTH_STENCIL_ATTACHMENT_OPTIMAL
+        )
+        subpass = vk.VkSubpassDescription(
+            pipelineBindPoint=vk.VK_PIPELINE_BIND_POINT_GRAPHICS,
+            colorAttachmentCount=1,
+            pColorAttachments=[color_attachment_ref],
+            pDepthStencilAttachment=depth_attachment_ref
+        )
+        # Frames in flight share one depth buffer: a frame's depth writes wait
+        # for the previous frame's, as its color writes wait for the image
+        fragment_tests = vk.VK_PIPELINE_STAGE_EARLY_FRAGMENT_TESTS_BIT | vk.VK_PIPELINE_STAGE_LATE_FRAGMENT_TESTS_BIT
+        dependency = vk.VkSubpassDependency(
+            srcSubpass=vk.VK_SUBPASS_EXTERNAL,
+            dstSubpass=0,
+            srcStageMask=vk.VK_PIPELINE_STAGE_COLOR_ATTACHMENT_OUTPUT_BIT | fragment_tests,
+            srcAccessMask=vk.VK_ACCESS_DEPTH_STENCIL_ATTACHMENT_WRITE_BIT,
+            dstStageMask=vk.VK_PIPELINE_STAGE_COLOR_ATTACHMENT_OUTPUT_BIT | fragment_tests,
+            dstAccessMask=vk.VK_ACCESS_COLOR_ATTACHMENT_WRITE_BIT | vk.VK_ACCESS_DEPTH_STENCIL_ATTACHMENT_WRITE_BIT
+        )
+        render_pass_info = vk.VkRenderPassCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_RENDER_PASS_CREATE_INFO,
+            attachmentCount=2,
+            pAttachments=[color_attachment, depth_attachment],
+            subpassCount=1,
+            pSubpasses=[subpass],
+            dependencyCount=1,
+            pDependencies=[dependency]
+        )
+        render_pass = vk.vkCreateRenderPass(self.device, render_pass_info, None)
+        # Pipeline: shader stages from the loaded SPIR-V modules
+        vert_shader_module, frag_shader_module = self.shader_modules
+        shader_stages = [
+            vk.VkPipelineShaderStageCreateInfo(
+                sType=vk.VK_STRUCTURE_TYPE_PIPELINE_SHADER_STAGE_CREATE_INFO,
+                stage=vk.VK_SHADER_STAGE_VERTEX_BIT,
+                module=vert_shader_module,
+                pName='main',
+            ),
+            vk.VkPipelineShaderStageCreateInfo(
+                sType=vk.VK_STRUCTURE_TYPE_PIPELINE_SHADER_STAGE_CREATE_INFO,
+                stage=vk.VK_SHADER_STAGE_FRAGMENT_BIT,
+                module=frag_shader_module,
+                pName='main',
+            )
+        ]
+        # Positions only; see vulkan/geometry.py
+        binding = vk.VkVertexInputBindingDescription(
+            binding=0,
+            stride=VERTEX_STRIDE,
+            inputRate=vk.VK_VERTEX_INPUT_RATE_VERTEX
+        )
+        position = vk.VkVertexInputAttributeDescription(
+            location=0,
+            binding=0,
+            format=vk.VK_FORMAT_R32G32B32_SFLOAT,
+            offset=0
+        )
+        vertex_input_info = vk.VkPipelineVertexInputStateCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_VERTEX_INPUT_STATE_CREATE_INFO,
+            vertexBindingDescriptionCount=1,
+            pVertexBindingDescriptions=[binding],
+            vertexAttributeDescriptionCount=1,
+            pVertexAttributeDescriptions=[position]
+        )
+        input_assembly = vk.VkPipelineInputAssemblyStateCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_INPUT_ASSEMBLY_STATE_CREATE_INFO,
+            topology=vk.VK_PRIMITIVE_TOPOLOGY_TRIANGLE_LIST,
+            primitiveRestartEnable=vk.VK_FALSE
+        )
+        # Viewport and scissor are dynamic: the pipeline is built before any
+        # swapchain extent is known, and shared by swapchains of all sizes
+        viewport_state = vk.VkPipelineViewportStateCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_VIEWPORT_STATE_CREATE_INFO,
+            viewportCount=1,
+            scissorCount=1
+        )
+        dynamic_states = [vk.VK_DYNAMIC_STATE_VIEWPORT, vk.VK_DYNAMIC_STATE_SCISSOR]
+        dynamic_state = vk.VkPipelineDynamicStateCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_DYNAMIC_STATE_CREATE_INFO,
+            dynamicStateCount=len(dynamic_states),
+            pDynamicStates=dynamic_states
+        )
+        rasterizer = vk.VkPipelineRasterizationStateCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_RASTERIZATION_STATE_CREATE_INFO,
+            depthClampEnable=vk.VK_FALSE,
+            rasterizerDiscardEnable=vk.VK_FALSE,
+            polygonMode=vk.VK_POLYGON_MODE_FILL,
+            lineWidth=1.0,
+            # Imported meshes have no consistent winding
+            cullMode=vk.VK_CULL_MODE_NONE,
+            frontFace=vk.VK_FRONT_FACE_CLOCKWISE,
+            depthBiasEnable=vk.VK_FALSE
+        )
+        multisampling = vk.VkPipelineMultisampleStateCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_MULTISAMPLE_STATE_CREATE_INFO,
+            sampleShadingEnable=vk.VK_FALSE,
+            rasterizationSamples=vk.VK_SAMPLE_COUNT_1_BIT
+        )
+        depth_stencil = vk.VkPipelineDepthStencilStateCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_DEPTH_STENCIL_STATE_CREATE_INFO,
+            depthTestEnable=vk.VK_TRUE,
+            depthWriteEnable=vk.VK_TRUE,
+            depthCompareOp=vk.VK_COMPARE_OP_LESS,
+            depthBoundsTestEnable=vk.VK_FALSE,
+            stencilTestEnable=vk.VK_FALSE
+        )
+        color_blend_attachment = vk.VkPipelineColorBlendAttachmentState(
+            colorWriteMask=vk.VK_COLOR_COMPONENT_R_BIT | vk.VK_COLOR_COMPONENT_G_BIT |
+                          vk.VK_COLOR_COMPONENT_B_BIT | vk.VK_COLOR_COMPONENT_A_BIT,
+            blendEnable=vk.VK_FALSE
+        )
+        color_blending = vk.VkPipelineColorBlendStateCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_COLOR_BLEND_STATE_CREATE_INFO,
+            logicOpEnable=vk.VK_FALSE,
+            logicOp=vk.VK_LOGIC_OP_COPY,
+            attachmentCount=1,
+            pAttachments=[color_blend_attachment],
+            blendConstants=[0.0, 0.0, 0.0, 0.0]
+        )
+        push_constant_range = vk.VkPushConstantRange(
+            stageFlags=vk.VK_SHADER_STAGE_VERTEX_BIT,
+            offset=0,
+            size=PUSH_CONSTANTS_SIZE
+        )
+        pipeline_layout_info = vk.VkPipelineLayoutCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_LAYOUT_CREATE_INFO,
+            pushConstantRangeCount=1,
+            pPushConstantRanges=[push_constant_range]
+        )
+        pipeline_layout = vk.vkCreatePipelineLayout(self.device, pipeline_layout_info, None)
+        pipeline_info = vk.VkGraphicsPipelineCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_GRAPHICS_PIPELINE_CREATE_INFO,
+            stageCount=2,
+            pStages=shader_stages,
+            pVertexInputState=vertex_input_info,
+            pInputAssemblyState=input_assembly,
+            pViewportState=viewport_state,
+            pRasterizationState=rasterizer,
+            pMultisampleState=multisampling,
+            pDepthStencilState=depth_stencil,
+            pColorBlendState=color_blending,
+            pDynamicState=dynamic_state,
+            layout=pipeline_layout,
+            renderPass=render_pass,
+            subpass=0
+        )
+        pipeline = vk.vkCreateGraphicsPipelines(self.device, self.pipeline_cache.handle, 1, [pipeline_info], None)[0]
+        return render_pass, pipeline_layout, pipeline
+
+    def destroy(self):
+        """Destroy everything; widgets must have destroyed their surfaces and swapchains, meshes their buffers.
+
+        Also called by ``__init__`` after a failure, with only part created.
+        """
+        vk = self.vk
+        logging.getLogger(__name__).debug("Destroying the shared Vulkan context")
+        if self.device is not None:
+            vk.vkDeviceWaitIdle(self.device)
+            for render_pass, pipeline_layout, pipeline in self.pipelines.values():
+                vk.vkDestroyPipeline(self.device, pipeline, None)
+                vk.vkDestroyPipelineLayout(self.device, pipeline_layout, None)
+                vk.vkDestroyRenderPass(self.device, render_pass, None)
+            self.pipelines = {}
+            if self.pipeline_cache is not None:
+                self.pipeline_cache.destroy()
+            if self.shader_cache is not None:
+                self.shader_cache.destroy()
+            if self.command_pool is not None:
+                vk.vkDestroyCommandPool(self.device, self.command_pool, None)
+            if self._staging is not None:
+                self._staging.destroy()
+            # Frees any mesh memory its creators did not
+            if self.allocator is not None:
+                self.allocator.destroy()
+            vk.vkDestroyDevice(self.device, None)
+            self.device = None
+        if self.instance is not None:
+            vk.vkDestroyInstance(self.instance, None)
+            self.instance = None
+        if self.display is not None:
+            self._libX11.XCloseDisplay(self.display)
+            self.display = None
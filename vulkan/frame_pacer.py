@@ -0,0 +1,119 @@
+"""
+frame_pacer.py - Present-mode selection and deadline-based frame pacing
+"""
+import time
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+
+# Present modes in order of preference, by Vulkan enum name. FIFO is always
+# supported, so every list ends with it.
+PRESENT_MODES = {
+    # Tear-free, waits for vertical blank
+    "vsync": ["VK_PRESENT_MODE_FIFO_KHR"],
+    # No waiting on vertical blank; mailbox replaces queued frames without tearing
+    "no_vsync": ["VK_PRESENT_MODE_MAILBOX_KHR", "VK_PRESENT_MODE_IMMEDIATE_KHR", "VK_PRESENT_MODE_FIFO_KHR"],
+    # Throughput measurements: present as soon as a frame is done
+    "uncapped": ["VK_PRESENT_MODE_IMMEDIATE_KHR", "VK_PRESENT_MODE_MAILBOX_KHR", "VK_PRESENT_MODE_FIFO_KHR"],
+}
+# Below this much time to the deadline, the pacer polls the event loop
+# instead of arming a timer, which only has millisecond resolution
+SPIN_THRESHOLD = 0.001
+
+def choose_present_mode(vk, available, vsync=True, uncapped=False):
+    """Return the preferred present mode among ``available`` for the given settings."""
+    key = "uncapped" if uncapped else "vsync" if vsync else "no_vsync"
+    for name in PRESENT_MODES[key]:
+        mode = getattr(vk, name)
+        if mode in available:
+            return mode
+    return available[0]
+
+class FramePacer(QObject):
+    """Emits ``frame_due`` at ``max_fps``, against absolute deadlines.
+
+    Deadlines advance by exactly one frame interval, so time spent handling
+    a frame does not accumulate as drift the way a restarted QTimer does;
+    after falling behind by more than a frame the schedule restarts from
+    now instead of bursting to catch up. Timers are precise and the last
+    millisecond before a deadline is waited out through zero-length timers,
+    which keeps the event loop responsive. In uncapped mode frames are due
+    on every event loop iteration.
+    """
+    frame_due = Signal()
+
+    def __init__(self, max_fps=60, parent=None):
+        super().__init__(parent)
+        self.interval = 1.0 / max(1, max_fps)
+        self.uncapped = False
+        self._deadline = 0.0
+        self._running = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+        self.reset_stats()
+
+    def start(self):
+        self._running = True
+        self._deadline = time.perf_counter() + self.interval
+        self._schedule()
+
+    def stop(self):
+        self._running = False
+        self._timer.stop()
+
+    def is_running(self):
+        return self._running
+
+    def set_max_fps(self, max_fps):
+        self.interval = 1.0 / max(1, max_fps)
+        if self._running:
+            self.start()
+
+    def set_uncapped(self, enabled):
+        """Emit frames as fast as the event loop turns, ignoring ``max_fps``."""
+        self.uncapped = bool(enabled)
+        if self._running:
+            self.start()
+
+    def reset_stats(self):
+        self._stats = {"frames": 0, "late": 0.0, "max_late": 0.0, "dropped": 0, "since": time.perf_counter()}
+
+    def stats(self):
+        """Achieved rate and how late frames were against their deadlines (ms)."""
+        stats = self._stats
+        frames = max(1, stats["frames"])
+        return {
+            "fps": stats["frames"] / max(1e-9, time.perf_counter() - stats["since"]),
+            "late_ms": stats["late"] * 1000 / frames,
+            "max_late_ms": stats["max_late"] * 1000,
+            "dropped": stats["dropped"],
+        }
+
+    def _schedule(self):
+        if self.uncapped:
+            self._timer.start(0)
+            return
+        remaining = self._deadline - time.perf_counter()
+        self._timer.start(0 if remaining < SPIN_THRESHOLD else int((remaining - SPIN_THRESHOLD) * 1000))
+
+    def _tick(self):
+        if not self._running:
+            return
+        now = time.perf_counter()
+        stats = self._stats
+        if not self.uncapped:
+            if now < self._deadline:
+                self._schedule()
+                return
+            late = now - self._deadline
+            stats["late"] += late
+            stats["max_late"] = max(stats["max_late"], late)
+            self._deadline += self.interval
+            if self._deadline <= now:
+                # Missed at least one whole frame: restart the schedule
+                stats["dropped"] += int((now - self._deadline) / self.interval) + 1
+                self._deadline = now + self.interval
+        stats["frames"] += 1
+        self.frame_due.emit()
+        if self._running:
+            self._schedule()
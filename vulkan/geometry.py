@@ -0,0 +1,168 @@
+"""
+geometry.py - Meshes in device-local memory, uploaded through a reusable staging buffer
+
+Vertices are positions only (float32 x, y, z, 12 bytes); the fragment
+shader derives face normals from screen-space derivatives, so meshes of
+tens of millions of triangles need no normal arrays. Indices are uint32.
+"""
+import threading
+import numpy as np
+
+VERTEX_STRIDE = 12
+# sizeof(VkDrawIndexedIndirectCommand)
+DRAW_COMMAND_SIZE = 20
+# The staging buffer is split into slots: while the GPU copies one slot the
+# next chunk is written into another
+STAGING_SIZE = 32 * 1024 * 1024
+STAGING_SLOTS = 2
+
+class StagingBuffer:
+    """Host-visible buffer that copies arrays of any size to device-local buffers in chunks.
+
+    Uploads are serialized and synchronous: ``upload()`` returns once the
+    data is in the destination buffer. It may be called from any thread.
+    """
+    def __init__(self, context, size=STAGING_SIZE, slots=STAGING_SLOTS):
+        vk = context.vk
+        self.context = context
+        self.slot_size = size // slots
+        self.buffer, self.allocation = context.allocator.create_buffer(
+            size, vk.VK_BUFFER_USAGE_TRANSFER_SRC_BIT,
+            vk.VK_MEMORY_PROPERTY_HOST_VISIBLE_BIT | vk.VK_MEMORY_PROPERTY_HOST_COHERENT_BIT)
+        self._memory = np.frombuffer(self.allocation.mapped, dtype=np.uint8)
+        # Own pool: the context's pool belongs to the GUI thread
+        pool_info = vk.VkCommandPoolCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_COMMAND_POOL_CREATE_INFO,
+            flags=vk.VK_COMMAND_POOL_CREATE_RESET_COMMAND_BUFFER_BIT | vk.VK_COMMAND_POOL_CREATE_TRANSIENT_BIT,
+            queueFamilyIndex=context.queue_family_index
+        )
+        self.command_pool = vk.vkCreateCommandPool(context.device, pool_info, None)
+        alloc_info = vk.VkCommandBufferAllocateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_COMMAND_BUFFER_ALLOCATE_INFO,
+            commandPool=self.command_pool,
+            level=vk.VK_COMMAND_BUFFER_LEVEL_PRIMARY,
+            commandBufferCount=slots
+        )
+        self.command_buffers = vk.vkAllocateCommandBuffers(context.device, alloc_info)
+        fence_info = vk.VkFenceCreateInfo(sType=vk.VK_STRUCTURE_TYPE_FENCE_CREATE_INFO,
+                                          flags=vk.VK_FENCE_CREATE_SIGNALED_BIT)
+        self.fences = [vk.vkCreateFence(context.device, fence_info, None) for _ in range(slots)]
+        self.bytes_uploaded = 0
+        self._lock = threading.Lock()
+
+    def upload(self, dst_buffer, data, dst_offset=0):
+        """Copy the bytes of array ``data`` to ``dst_buffer`` at ``dst_offset``."""
+        vk = self.context.vk
+        device = self.context.device
+        data = np.ascontiguousarray(data).reshape(-1).view(np.uint8)
+        with self._lock:
+            slot = 0
+            for start in range(0, len(data), self.slot_size):
+                chunk = data[start:start + self.slot_size]
+                fence = self.fences[slot]
+                # Wait until the GPU finished copying this slot's previous chunk
+                vk.vkWaitForFences(device, 1, [fence], vk.VK_TRUE, 0xFFFFFFFFFFFFFFFF)
+                vk.vkResetFences(device, 1, [fence])
+                base = slot * self.slot_size
+                self._memory[base:base + len(chunk)] = chunk
+                cmd_buf = self.command_buffers[slot]
+                vk.vkResetCommandBuffer(cmd_buf, 0)
+                vk.vkBeginCommandBuffer(cmd_buf, vk.VkCommandBufferBeginInfo(
+                    sType=vk.VK_STRUCTURE_TYPE_COMMAND_BUFFER_BEGIN_INFO,
+                    flags=vk.VK_COMMAND_BUFFER_USAGE_ONE_TIME_SUBMIT_BIT))
+                region = vk.VkBufferCopy(srcOffset=base, dstOffset=dst_offset + start, size=len(chunk))
+                vk.vkCmdCopyBuffer(cmd_buf, self.buffer, dst_buffer, 1, [region])
+                vk.vkEndCommandBuffer(cmd_buf)
+                self.context.submit(cmd_buf, fence)
+                slot = (slot + 1) % len(self.fences)
+            vk.vkWaitForFences(device, len(self.fences), self.fences, vk.VK_TRUE, 0xFFFFFFFFFFFFFFFF)
+            self.bytes_uploaded += len(data)
+
+    def destroy(self):
+        vk = self.context.vk
+        device = self.context.device
+        vk.vkWaitForFences(device, len(self.fences), self.fences, vk.VK_TRUE, 0xFFFFFFFFFFFFFFFF)
+        for fence in self.fences:
+            vk.vkDestroyFence(device, fence, None)
+        vk.vkDestroyCommandPool(device, self.command_pool, None)
+        self.context.allocator.destroy_buffer(self.buffer, self.allocation)
+
+class Mesh:
+    """Indexed triangles in device-local vertex and index buffers.
+
+    ``positions`` is an (N, 3) array and ``indices`` holds three vertex
+    indices per triangle; both are converted to float32/uint32 if needed.
+    The buffers are shared by every widget and pane drawing the mesh; the
+    creator calls ``destroy()`` once no widget shows it any more. With a
+    ``bvh`` (mesh.bvh.MeshBVH over the same arrays) widgets draw only the
+    chunks in view, through ``draw_indirect()``. The coarser levels of a
+    ``lod`` (mesh.lod.MeshLOD over the same BVH) are uploaded after the
+    mesh's own vertices and indices, for the widgets to draw in its place.
+    """
+    def __init__(self, context, positions, indices, bvh=None, lod=None):
+        vk = context.vk
+        positions = np.ascontiguousarray(positions, dtype=np.float32).reshape(-1, 3)
+        indices = np.ascontiguousarray(indices, dtype=np.uint32).reshape(-1)
+        if len(positions) == 0 or len(indices) == 0 or len(indices) % 3:
+            raise ValueError("a mesh needs vertices and a multiple of three indices")
+        if indices.max() >= len(positions):
+            raise ValueError(f"index {indices.max()} out of range for {len(positions)} vertices")
+        self.context = context
+        self.bvh = bvh
+        self.lod = lod
+        self.vertex_count = len(positions)
+        self.index_count = len(indices)
+        self.bounds = (positions.min(axis=0), positions.max(axis=0))
+        lod_positions = np.empty((0, 3), np.float32) if lod is None else lod.positions
+        lod_indices = np.empty(0, np.uint32) if lod is None else lod.triangles.reshape(-1)
+        allocator = context.allocator
+        self.vertex_buffer, self.vertex_allocation = allocator.create_buffer(
+            positions.nbytes + lod_positions.nbytes,
+            vk.VK_BUFFER_USAGE_VERTEX_BUFFER_BIT | vk.VK_BUFFER_USAGE_TRANSFER_DST_BIT,
+            vk.VK_MEMORY_PROPERTY_DEVICE_LOCAL_BIT)
+        self.index_buffer, self.index_allocation = allocator.create_buffer(
+            indices.nbytes + lod_indices.nbytes,
+            vk.VK_BUFFER_USAGE_INDEX_BUFFER_BIT | vk.VK_BUFFER_USAGE_TRANSFER_DST_BIT,
+            vk.VK_MEMORY_PROPERTY_DEVICE_LOCAL_BIT)
+        staging = context.staging_buffer()
+        staging.upload(self.vertex_buffer, positions)
+        staging.upload(self.index_buffer, indices)
+        if lod is not None:
+            staging.upload(self.vertex_buffer, lod_positions, positions.nbytes)
+            staging.upload(self.index_buffer, lod_indices, indices.nbytes)
+        self.nbytes = positions.nbytes + indices.nbytes + lod_positions.nbytes + lod_indices.nbytes
+
+    @property
+    def triangle_count(self):
+        return self.index_count // 3
+
+    def _bind(self, cmd_buf):
+        vk = self.context.vk
+        vk.vkCmdBindVertexBuffers(cmd_buf, 0, 1, [self.vertex_buffer], [0])
+        vk.vkCmdBindIndexBuffer(cmd_buf, self.index_buffer, 0, vk.VK_INDEX_TYPE_UINT32)
+
+    def draw(self, cmd_buf):
+        self._bind(cmd_buf)
+        self.context.vk.vkCmdDrawIndexed(cmd_buf, self.index_count, 1, 0, 0, 0)
+
+    def draw_indirect(self, cmd_buf, buffer, offset, count):
+        """Draw the index ranges of ``count`` VkDrawIndexedIndirectCommands at ``offset`` in ``buffer``."""
+        if count == 0:
+            return
+        vk = self.context.vk
+        self._bind(cmd_buf)
+        if self.context.multi_draw_indirect:
+            vk.vkCmdDrawIndexedIndirect(cmd_buf, buffer, offset, count, DRAW_COMMAND_SIZE)
+        else:
+            for i in range(count):
+                vk.vkCmdDrawIndexedIndirect(cmd_buf, buffer, offset + i * DRAW_COMMAND_SIZE, 1, DRAW_COMMAND_SIZE)
+
+    def destroy(self):
+        """Free the buffers once frames that may still draw the mesh are done."""
+        if self.vertex_buffer is None:
+            return
+        self.context.wait_idle()
+        allocator = self.context.allocator
+        allocator.destroy_buffer(self.vertex_buffer, self.vertex_allocation)
+        allocator.destroy_buffer(self.index_buffer, self.index_allocation)
+        self.vertex_buffer = self.index_buffer = None
@@ -0,0 +1,176 @@
+"""
+memory.py - Device memory sub-allocation
+
+Vulkan limits the number of live vkAllocateMemory allocations (often to
+4096) and each one is slow, so buffers and images are carved out of large
+blocks instead. Each block belongs to one memory type and holds either
+buffers or images, never both, so bufferImageGranularity never applies.
+"""
+import threading
+
+# Size of the blocks resources are sub-allocated from; larger resources get
+# a block of their own
+BLOCK_SIZE = 64 * 1024 * 1024
+
+def align_up(value, alignment):
+    return (value + alignment - 1) // alignment * alignment
+
+class MemoryBlock:
+    """One vkAllocateMemory allocation and its free ranges (offset, size), sorted by offset."""
+    def __init__(self, memory, size, memory_type, linear, mapped=None):
+        self.memory = memory
+        self.size = size
+        self.memory_type = memory_type
+        self.linear = linear
+        # Whole-block mapping of host-visible memory, kept for the block's life
+        self.mapped = mapped
+        self.free_ranges = [(0, size)]
+        self.allocations = 0
+
+    def allocate(self, size, alignment):
+        """Offset of a first-fit range of ``size`` bytes, or None if the block is too full."""
+        for i, (offset, free_size) in enumerate(self.free_ranges):
+            start = align_up(offset, alignment)
+            end = start + size
+            if end > offset + free_size:
+                continue
+            remainder = []
+            if start > offset:
+                remainder.append((offset, start - offset))
+            if end < offset + free_size:
+                remainder.append((end, offset + free_size - end))
+            self.free_ranges[i:i + 1] = remainder
+            self.allocations += 1
+            return start
+        return None
+
+    def free(self, offset, size):
+        ranges = self.free_ranges
+        i = 0
+        while i < len(ranges) and ranges[i][0] < offset:
+            i += 1
+        ranges.insert(i, (offset, size))
+        # Merge with the following and then the preceding range
+        if i + 1 < len(ranges) and offset + size == ranges[i + 1][0]:
+            ranges[i] = (offset, size + ranges[i + 1][1])
+            del ranges[i + 1]
+        if i > 0 and ranges[i - 1][0] + ranges[i - 1][1] == offset:
+            ranges[i - 1] = (ranges[i - 1][0], ranges[i - 1][1] + ranges[i][1])
+            del ranges[i]
+        self.allocations -= 1
+
+    def free_bytes(self):
+        return sum(size for _, size in self.free_ranges)
+
+class Allocation:
+    """``size`` bytes at ``offset`` in ``block``; ``mapped`` is a writable view for host-visible memory."""
+    def __init__(self, block, offset, size):
+        self.block = block
+        self.memory = block.memory
+        self.offset = offset
+        self.size = size
+        self.mapped = None if block.mapped is None else memoryview(block.mapped)[offset:offset + size]
+
+class MemoryAllocator:
+    """Sub-allocates buffers and images of one device from large memory blocks. Thread-safe."""
+    def __init__(self, vk, physical_device, device, block_size=BLOCK_SIZE):
+        self.vk = vk
+        self.device = device
+        self.block_size = block_size
+        self.memory_properties = vk.vkGetPhysicalDeviceMemoryProperties(physical_device)
+        self.blocks = []
+        self._lock = threading.Lock()
+
+    def memory_type(self, type_bits, properties):
+        """Index of the first memory type allowed by ``type_bits`` that has all ``properties``."""
+        props = self.memory_properties
+        for i in range(props.memoryTypeCount):
+            if type_bits & (1 << i) and props.memoryTypes[i].propertyFlags & properties == properties:
+                return i
+        raise RuntimeError(f"no memory type with properties {properties:#x} for type bits {type_bits:#x}")
+
+    def allocate(self, requirements, properties, linear=True):
+        """An Allocation satisfying ``requirements`` (VkMemoryRequirements) in memory with ``properties``."""
+        memory_type = self.memory_type(requirements.memoryTypeBits, properties)
+        size, alignment = requirements.size, max(1, requirements.alignment)
+        with self._lock:
+            for block in self.blocks:
+                if block.memory_type == memory_type and block.linear == linear:
+                    offset = block.allocate(size, alignment)
+                    if offset is not None:
+                        return Allocation(block, offset, size)
+            block = self._new_block(max(self.block_size, size), memory_type, linear)
+            return Allocation(block, block.allocate(size, alignment), size)
+
+    def _new_block(self, size, memory_type, linear):
+        vk = self.vk
+        info = vk.VkMemoryAllocateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_MEMORY_ALLOCATE_INFO,
+            allocationSize=size,
+            memoryTypeIndex=memory_type
+        )
+        memory = vk.vkAllocateMemory(self.device, info, None)
+        mapped = None
+        flags = self.memory_properties.memoryTypes[memory_type].propertyFlags
+        if flags & vk.VK_MEMORY_PROPERTY_HOST_VISIBLE_BIT:
+            mapped = vk.vkMapMemory(self.device, memory, 0, size, 0)
+        block = MemoryBlock(memory, size, memory_type, linear, mapped)
+        self.blocks.append(block)
+        return block
+
+    def free(self, allocation):
+        """Return the allocation's range to its block; empty blocks beyond the first of their kind are released."""
+        with self._lock:
+            block = allocation.block
+            block.free(allocation.offset, allocation.size)
+            if block.allocations == 0 and any(other is not block and other.memory_type == block.memory_type
+                                              and other.linear == block.linear for other in self.blocks):
+                self._release_block(block)
+
+    def _release_block(self, block):
+        if block.mapped is not None:
+            self.vk.vkUnmapMemory(self.device, block.memory)
+        self.vk.vkFreeMemory(self.device, block.memory, None)
+        self.blocks.remove(block)
+
+    def create_buffer(self, size, usage, properties):
+        """(buffer, allocation): a VkBuffer of ``size`` bytes bound to sub-allocated memory."""
+        vk = self.vk
+        info = vk.VkBufferCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_BUFFER_CREATE_INFO,
+            size=size,
+            usage=usage,
+            sharingMode=vk.VK_SHARING_MODE_EXCLUSIVE
+        )
+        buffer = vk.vkCreateBuffer(self.device, info, None)
+        allocation = self.allocate(vk.vkGetBufferMemoryRequirements(self.device, buffer), properties)
+        vk.vkBindBufferMemory(self.device, buffer, allocation.memory, allocation.offset)
+        return buffer, allocation
+
+    def destroy_buffer(self, buffer, allocation):
+        self.vk.vkDestroyBuffer(self.device, buffer, None)
+        self.free(allocation)
+
+    def bind_image(self, image, properties):
+        """Sub-allocate and bind memory for an optimally tiled ``image``; returns the Allocation."""
+        vk = self.vk
+        allocation = self.allocate(vk.vkGetImageMemoryRequirements(self.device, image), properties, linear=False)
+        vk.vkBindImageMemory(self.device, image, allocation.memory, allocation.offset)
+        return allocation
+
+    def stats(self):
+        """Block count, bytes allocated from the device, and bytes handed out."""
+        with self._lock:
+            allocated = sum(block.size for block in self.blocks)
+            return {
+                "blocks": len(self.blocks),
+                "allocations": sum(block.allocations for block in self.blocks),
+                "allocated_bytes": allocated,
+                "used_bytes": allocated - sum(block.free_bytes() for block in self.blocks),
+            }
+
+    def destroy(self):
+        """Free every block; everything allocated from them must already be destroyed."""
+        with self._lock:
+            for block in list(self.blocks):
+                self._release_block(block)
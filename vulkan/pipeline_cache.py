@@ -0,0 +1,139 @@
+"""
+pipeline_cache.py - Pipeline cache persisted across runs, and shader modules shared by content
+"""
+import hashlib
+import logging
+import os
+import struct
+
+# Per-user cache directory; the pipeline cache of each GPU is a file in it
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "simGUI")
+# Our header in front of the driver's data: magic, version, vendor ID,
+# device ID, driver version, pipeline cache UUID. The driver's own header has
+# no driver version, and drivers are not required to reject stale data.
+FILE_MAGIC = b"SGPC"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sIIII16s")
+# Start of the header the driver writes (VkPipelineCacheHeaderVersionOne)
+VK_HEADER = struct.Struct("<IIII16s")
+
+log = logging.getLogger(__name__)
+
+class PipelineCache:
+    """A VkPipelineCache loaded from and saved to ``CACHE_DIR``.
+
+    The file is only used if it was written for the same device, driver
+    version and pipeline cache UUID; anything else starts an empty cache,
+    which the next ``save()`` overwrites.
+    """
+    def __init__(self, vk, physical_device, device, directory=None):
+        self.vk = vk
+        self.device = device
+        props = vk.vkGetPhysicalDeviceProperties(physical_device)
+        self.identity = (props.vendorID, props.deviceID, props.driverVersion,
+                         bytes(vk.ffi.buffer(props.pipelineCacheUUID)))
+        directory = directory or CACHE_DIR
+        self.path = os.path.join(directory, f"pipelines_{props.vendorID:04x}_{props.deviceID:04x}.bin")
+        data = self._read()
+        self.loaded = bool(data)
+        self._saved_size = len(data)
+        if data:
+            # Kept alive by the create info for the duration of the call
+            buffer = vk.ffi.from_buffer(data)
+            create_info = vk.VkPipelineCacheCreateInfo(initialDataSize=len(data), pInitialData=buffer)
+        else:
+            create_info = vk.VkPipelineCacheCreateInfo()
+        self.handle = vk.vkCreatePipelineCache(device, create_info, None)
+
+    def _read(self):
+        try:
+            with open(self.path, "rb") as f:
+                blob = f.read()
+        except OSError:
+            return b""
+        if len(blob) < FILE_HEADER.size + VK_HEADER.size:
+            return b""
+        magic, version, *identity = FILE_HEADER.unpack_from(blob)
+        if magic != FILE_MAGIC or version != FILE_VERSION or tuple(identity) != self.identity:
+            log.info("Ignoring pipeline cache %s: written for another device or driver", self.path)
+            return b""
+        data = blob[FILE_HEADER.size:]
+        header_size, header_version, vendor, device_id, uuid = VK_HEADER.unpack_from(data)
+        if header_version != 1 or (vendor, device_id, uuid) != (self.identity[0], self.identity[1], self.identity[3]):
+            log.info("Ignoring pipeline cache %s: driver header does not match", self.path)
+            return b""
+        return data
+
+    def data(self):
+        """The driver's current cache contents."""
+        vk = self.vk
+        size = vk.ffi.new("size_t*")
+        # Not wrapped by the bindings; call the loader directly
+        result = vk.lib.vkGetPipelineCacheData(self.device, self.handle, size, vk.ffi.NULL)
+        if result != vk.VK_SUCCESS or size[0] == 0:
+            return b""
+        buffer = vk.ffi.new("char[]", size[0])
+        result = vk.lib.vkGetPipelineCacheData(self.device, self.handle, size, buffer)
+        if result not in (vk.VK_SUCCESS, vk.VK_INCOMPLETE):
+            return b""
+        return vk.ffi.buffer(buffer, size[0])[:]
+
+    def save(self):
+        """Write the cache if pipelines were added since it was loaded or last saved."""
+        data = self.data()
+        if not data or len(data) == self._saved_size:
+            return False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, *self.identity))
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log.warning("Could not save pipeline cache %s: %s", self.path, e)
+            return False
+        self._saved_size = len(data)
+        return True
+
+    def destroy(self):
+        self.save()
+        self.vk.vkDestroyPipelineCache(self.device, self.handle, None)
+        self.handle = None
+
+class ShaderModuleCache:
+    """Shader modules of one device, keyed by the SHA-256 of their SPIR-V.
+
+    Loading the same code again, from any file, returns the existing module.
+    """
+    def __init__(self, vk, device):
+        self.vk = vk
+        self.device = device
+        self.modules = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, filename):
+        with open(filename, "rb") as f:
+            return self.module(f.read())
+
+    def module(self, code):
+        key = hashlib.sha256(code).digest()
+        module = self.modules.get(key)
+        if module is not None:
+            self.hits += 1
+            return module
+        self.misses += 1
+        vk = self.vk
+        info = vk.VkShaderModuleCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_SHADER_MODULE_CREATE_INFO,
+            codeSize=len(code),
+            pCode=code
+        )
+        module = self.modules[key] = vk.vkCreateShaderModule(self.device, info, None)
+        return module
+
+    def destroy(self):
+        for module in self.modules.values():
+            self.vk.vkDestroyShaderModule(self.device, module, None)
+        self.modules = {}
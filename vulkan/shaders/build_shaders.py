@@ -0,0 +1,40 @@
+"""
+build_shaders.py - Compile the GLSL shaders in this directory to SPIR-V
+
+Writes <name>.spv next to every .vert and .frag file that is newer than its
+.spv. Needs glslc (Vulkan SDK, shaderc) or glslangValidator on the PATH.
+
+    python3 vulkan/shaders/build_shaders.py
+"""
+import glob
+import os
+import shutil
+import subprocess
+import sys
+
+SHADER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def compiler():
+    """Command line compiling a source to an output path, or None if no compiler is installed."""
+    if shutil.which("glslc"):
+        return lambda source, output: ["glslc", "-O", source, "-o", output]
+    if shutil.which("glslangValidator"):
+        return lambda source, output: ["glslangValidator", "-V", source, "-o", output]
+    return None
+
+def main():
+    command = compiler()
+    if command is None:
+        print("Neither glslc nor glslangValidator found; install the Vulkan SDK or glslang", file=sys.stderr)
+        return 1
+    sources = sorted(glob.glob(os.path.join(SHADER_DIR, "*.vert")) + glob.glob(os.path.join(SHADER_DIR, "*.frag")))
+    for source in sources:
+        output = source + ".spv"
+        if os.path.exists(output) and os.path.getmtime(output) >= os.path.getmtime(source):
+            continue
+        print(f"{os.path.basename(source)} -> {os.path.basename(output)}")
+        subprocess.run(command(source, output), check=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
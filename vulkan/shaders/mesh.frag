@@ -0,0 +1,15 @@
+#version 450
+
+layout(location = 0) in vec3 world_position;
+
+layout(location = 0) out vec4 out_color;
+
+const vec3 LIGHT_DIRECTION = normalize(vec3(0.4, 0.8, 0.5));
+const vec3 BASE_COLOR = vec3(0.75, 0.8, 0.9);
+
+void main() {
+    // Flat shading from the triangle's plane: meshes carry no normals
+    vec3 normal = normalize(cross(dFdx(world_position), dFdy(world_position)));
+    float diffuse = abs(dot(normal, LIGHT_DIRECTION));
+    out_color = vec4(BASE_COLOR * (0.3 + 0.7 * diffuse), 1.0);
+}
@@ -0,0 +1,15 @@
+#version 450
+
+// The pane camera's view-projection matrix (VulkanWidget._draw_scene)
+layout(push_constant) uniform PushConstants {
+    mat4 view_projection;
+} pc;
+
+layout(location = 0) in vec3 in_position;
+
+layout(location = 0) out vec3 world_position;
+
+void main() {
+    world_position = in_position;
+    gl_Position = pc.view_projection * vec4(in_position, 1.0);
+}
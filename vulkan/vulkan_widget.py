@@ -1,137 +1,314 @@
-import vulkan as vk
-import ctypes
+import logging
 import os
+import threading
+import time
+import numpy as np
+import shiboken6
 from PySide6.QtWidgets import QWidget
-from PySide6.QtCore import QTimer
+from PySide6.QtCore import QEvent, QTimer, Qt, Signal
 
 # For X11 integration
 from PySide6.QtGui import QWindow
-from ctypes.util import find_library
+from profiler import profiled, span
+from vulkan.frame_pacer import FramePacer, choose_present_mode
+from vulkan import context
+from vulkan.camera import PANE_LAYOUTS, Camera, pane_rects
+
+# The Vulkan bindings are slow to import; load_vulkan() imports them on first use
+vk = None
+# Swapchain format the pipeline is built for before the surface exists. It is
+# what X11 drivers (including lavapipe) list first; other formats rebuild the
+# render pass and pipeline once the surface is known.
+PIPELINE_FORMAT = "VK_FORMAT_B8G8R8A8_UNORM"
+# The swapchain is recreated once resizing pauses for RESIZE_DEBOUNCE_MS, but
+# at least every RESIZE_MAX_DELAY_MS during a continuous drag
+RESIZE_DEBOUNCE_MS = 40
+RESIZE_MAX_DELAY_MS = 150
+# Frames the CPU may record ahead of the GPU; 1 serializes CPU and GPU
+DEFAULT_FRAMES_IN_FLIGHT = 2
+MAX_FRAMES_IN_FLIGHT = 3
+# Smallest indirect draw buffer of a frame; it grows to twice what a frame needs
+INDIRECT_MIN_BYTES = 64 * 1024
+# A press and release closer than this (pixels) is a click, which picks
+CLICK_DISTANCE = 3
+# Screen-space error (pixels) allowed for meshes with levels of detail, at
+# rest and while the camera moves
+LOD_PIXEL_ERROR = 2.0
+INTERACTIVE_PIXEL_ERROR = 16.0
+# Full detail returns once the camera has been still this long (ms)
+SETTLE_MS = 150
+
+def load_vulkan():
+    """Import the Vulkan bindings into this module, once."""
+    global vk
+    if vk is None:
+        # Imported through this package, which shares the bindings' name
+        from vulkan import _vulkan as vk
+    return vk
+
+class FrameResources:
+    """What one frame in flight owns: its semaphores, fence, command buffer and indirect draw buffer."""
+    def __init__(self, image_available, render_finished, fence, command_buffer):
+        self.image_available = image_available
+        self.render_finished = render_finished
+        self.fence = fence
+        self.command_buffer = command_buffer
+        # Host-visible; rewritten each time the frame is recorded
+        self.indirect_buffer = None
+        self.indirect_allocation = None
+        self.indirect_capacity = 0
 
 class VulkanWidget(QWidget):
     """
     VulkanWidget handles Vulkan initialization, rendering, overlays, and input.
-    Rendering logic is stubbed for demonstration; replace with real Vulkan code as needed.
+    It draws the meshes given to ``set_meshes()`` (vulkan/geometry.py) with
+    depth testing.
+
+    Instance, device, queue, command pool, shader modules and pipelines
+    belong to the VulkanContext shared by all widgets (vulkan/context.py);
+    the first widget creates it and the last one's ``cleanup()`` destroys
+    it. Initialization happens in two phases so the window stays
+    responsive: acquiring the context and the pipeline for PIPELINE_FORMAT
+    runs on a worker thread while a placeholder is painted, then the
+    surface, swapchain, framebuffers and sync objects are created on the
+    GUI thread.
+
+    Up to ``frames_in_flight`` frames are recorded ahead of the GPU, each
+    with its own semaphores, fence and command buffer. A paint whose frame
+    is still executing is skipped instead of waiting on its fence, so the
+    GUI thread only blocks when a swapchain image is still in use by an
+    older frame. ``frame_stats()`` reports frame and blocked times.
+
+    Frames are rendered on demand. Anything that changes what is shown
+    (scene, camera, overlay, swapchain) calls ``request_frame()``; the pacer
+    runs only while a frame is pending or an animation holds it with
+    ``begin_animation()``, and stops while the widget is hidden (another
+    stacked page or tab) or its window is minimized. Frame deadlines that
+    pass with nothing to render count as skipped in ``frame_stats()``.
+
+    Resizing marks the swapchain stale. It is recreated (reusing the old
+    handle) after resize events settle, or immediately when the surface
+    reports it out of date; meanwhile frames keep rendering at the old
+    extent. Only the swapchain, image views and framebuffers are rebuilt:
+    viewport and scissor are dynamic pipeline state. The context keeps
+    pipelines per swapchain format, so recreation never rebuilds one it has
+    seen, and compiles them through a pipeline cache persisted per GPU and
+    driver.
+
+    The widget can be split into 1, 2 or 4 panes (``set_pane_count``) to
+    compare results side by side. All panes are drawn into the same
+    swapchain image by one command buffer, each with its own viewport and
+    camera, so there is still a single submit per frame and the panes use
+    the same device buffers. With ``set_cameras_linked(True)`` every pane
+    follows the first pane's camera.
+
+    Meshes with a BVH (mesh/bvh.py) are frustum culled per pane before a
+    frame is recorded: only chunks in view are drawn, by indirect draw
+    commands written to the frame's indirect buffer. ``set_culling(False)``
+    draws everything. Clicking (a press without a drag) picks the
+    triangle under the cursor against the same BVH.
+
+    Meshes with levels of detail (mesh/lod.py) draw each visible chunk at
+    the coarsest level whose error stays within LOD_PIXEL_ERROR pixels. While
+    a drag or the wheel moves a camera the tolerance is
+    INTERACTIVE_PIXEL_ERROR, and SETTLE_MS after the last motion the
+    frame is drawn again in full detail. ``set_lod(False)`` always draws
+    full detail.
     """
+    # Emitted from the initialization thread with None or the exception raised
+    device_ready = Signal(object)
+    # (mesh, triangle, point) under a click, or None if it hit nothing
+    picked = Signal(object)
+
+    @profiled()
     def __init__(self, parent=None):
         super().__init__(parent)
         # Vulkan handles (pseudo-code, replace with actual Vulkan objects)
         self.vk_instance = None
+        self.vk_physical_device = None
         self.vk_device = None
         self.vk_swapchain = None
         self.vk_command_buffers = None
         self.vk_surface = None
         self.vk_queue = None
+        self.queue_family_index = None
         self.swapchain_images = None
         self.swapchain_image_format = None
         self.swapchain_extent = None
         self.image_views = []
         self.framebuffers = []
+        self.depth_image = None
+        self.depth_view = None
+        self.depth_allocation = None
         self.render_pass = None
+        self.render_pass_format = None
         self.command_pool = None
+        self.command_buffers = []
+        self.shader_modules = []
+        self.pipeline_cache = None
         self.pipeline_layout = None
         self.pipeline = None
-        self.image_available_semaphore = None
-        self.render_finished_semaphore = None
-        self.in_flight_fence = None
-        # Timer for continuous rendering
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update)
-        self.timer.start(16)  # ~60 FPS
+        # Shared with every other widget; set by _create_device_objects
+        self.context = None
+        self.frames_in_flight = DEFAULT_FRAMES_IN_FLIGHT
+        self.frames = []
+        self.current_frame = 0
+        # Fence of the frame that last rendered to each swapchain image
+        self.images_in_flight = []
+        self.swapchain_stale = False
+        self._resize_pending_since = None
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.timeout.connect(self.recreate_swapchain)
+        # On-demand rendering, paced against frame deadlines; showEvent starts it
+        self.vsync = True
+        self.present_mode = None
+        self.pacer = FramePacer(60, self)
+        self.pacer.frame_due.connect(self._on_frame_due)
+        self._dirty = True
+        self._animations = 0
+        self._idle_since = None
         self.initialized = False
+        self.init_error = None
+        self._init_thread = None
+        self._init_cancelled = False
+        self.device_ready.connect(self._on_device_ready)
         self.debug_message = ""
         self.debug_overlay_enabled = True
         self.overlay_options = {}
         self._drag_active = False
         self._last_mouse_pos = None
+        # Meshes drawn in every pane; the caller owns them (vulkan/geometry.py)
+        self.meshes = []
+        self.pane_count = 1
+        self.cameras_linked = True
+        self.cameras = [Camera() for _ in range(max(PANE_LAYOUTS))]
+        self._drag_pane = 0
+        self._press_pos = None
+        self.culling = True
+        self.lod = True
+        self._interacting = False
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(SETTLE_MS)
+        self._settle_timer.timeout.connect(self._settle)
         self._last_frame_time = None
         self._fps = 0
+        self.reset_frame_stats()
+
+    def start_initialization(self):
+        """Start creating the device-side objects on a worker thread; returns immediately."""
+        if self._init_thread is not None or self.initialized:
+            return
+        self._init_thread = threading.Thread(target=self._initialize_in_background,
+                                             name="vulkan-init", daemon=True)
+        self._init_thread.start()
+
+    def _initialize_in_background(self):
+        error = None
+        try:
+            with span("initialize device (worker)"):
+                self._create_device_objects()
+        except Exception as e:
+            error = e
+        # The widget may have been closed while the device was being created
+        if shiboken6.isValid(self):
+            self.device_ready.emit(error)
 
+    def _on_device_ready(self, error):
+        if self._init_cancelled:
+            # cleanup() ran while the worker was busy
+            self._init_cancelled = False
+            self._init_thread = None
+            self._release_context()
+            self.request_frame()
+            return
+        if error is None:
+            try:
+                with span("bind surface"):
+                    self._bind_surface()
+                self.initialized = True
+            except Exception as e:
+                error = e
+        if error is not None:
+            self.init_error = f"{type(error).__name__}: {error}"
+            logging.getLogger(__name__).error("Vulkan initialization failed: %s", self.init_error)
+        self.request_frame()
+
+    @profiled()
     def initialize_vulkan(self):
+        """Initialize synchronously on the calling (GUI) thread."""
         if self.initialized:
             return
-        # 1. Create Vulkan instance (fix: use dicts for struct args)
-        app_info = {
-            'sType': vk.VK_STRUCTURE_TYPE_APPLICATION_INFO,
-            'pApplicationName': 'PyVulkanApp',
-            'applicationVersion': vk.VK_MAKE_VERSION(1, 0, 0),
-            'pEngineName': 'NoEngine',
-            'engineVersion': vk.VK_MAKE_VERSION(1, 0, 0),
-            'apiVersion': vk.VK_API_VERSION_1_0
-        }
-        extensions = [vk.VK_KHR_SURFACE_EXTENSION_NAME, vk.VK_KHR_XLIB_SURFACE_EXTENSION_NAME]
-        create_info = {
-            'sType': vk.VK_STRUCTURE_TYPE_INSTANCE_CREATE_INFO,
-            'pApplicationInfo': app_info,
-            'enabledExtensionCount': len(extensions),
-            'ppEnabledExtensionNames': extensions
-        }
-        self.vk_instance = vk.vkCreateInstance(create_info, None)
-        # 2. Create Xlib surface for this widget
-        self._create_xlib_surface()
-        # 3. Select physical device and queue family
-        physical_devices = vk.vkEnumeratePhysicalDevices(self.vk_instance)
-        self.vk_physical_device = physical_devices[0]
-        # 4. Create logical device and queues
-        queue_family_index = self._find_graphics_queue_family()
-        queue_info = vk.VkDeviceQueueCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_DEVICE_QUEUE_CREATE_INFO,
-            queueFamilyIndex=queue_family_index,
-            queueCount=1,
-            pQueuePriorities=[1.0]
-        )
-        device_info = vk.VkDeviceCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_DEVICE_CREATE_INFO,
-            queueCreateInfoCount=1,
-            pQueueCreateInfos=[queue_info]
-        )
-        self.vk_device = vk.vkCreateDevice(self.vk_physical_device, device_info, None)
-        self.vk_queue = vk.vkGetDeviceQueue(self.vk_device, queue_family_index, 0)
-        # 5. Create swapchain
-        self._create_swapchain(queue_family_index)
-        # 6. Create image views and framebuffers
-        self._create_image_views_and_framebuffers()
-        # 7. Create render pass and pipeline
-        self._create_render_pass_and_pipeline()
-        # 8. Allocate command buffers
-        self._allocate_command_buffers()
-        # 9. Create synchronization objects
-        self._create_sync_objects()
+        self._create_device_objects()
+        self._bind_surface()
         self.initialized = True
 
+    def _create_device_objects(self):
+        """Everything that does not need the window surface; safe to run on a worker thread."""
+        # Instance, device, queue, command pool and shader modules are shared
+        # by all widgets; the first one creates them
+        self.context = context.acquire()
+        self.vk_instance = self.context.instance
+        self.vk_physical_device = self.context.physical_device
+        self.vk_device = self.context.device
+        self.vk_queue = self.context.queue
+        self.queue_family_index = self.context.queue_family_index
+        self.command_pool = self.context.command_pool
+        self.shader_modules = self.context.shader_modules
+        self.pipeline_cache = self.context.pipeline_cache
+        # Render pass and pipeline for the expected swapchain format
+        with span("create render pass and pipeline", warm=self.pipeline_cache.loaded):
+            self._use_pipeline(getattr(vk, PIPELINE_FORMAT))
+
+    def _bind_surface(self):
+        """Create the surface, swapchain and what depends on them; runs on the GUI thread."""
+        # 1. Create Xlib surface for this widget
+        with span("create Xlib surface"):
+            self._create_xlib_surface()
+            supported = self._ext_fn('vkGetPhysicalDeviceSurfaceSupportKHR')(
+                self.vk_physical_device, self.queue_family_index, self.vk_surface)
+            if not supported:
+                raise RuntimeError("the graphics queue cannot present to this window")
+        # 2. Create swapchain
+        with span("create swapchain"):
+            self._create_swapchain()
+        if self.swapchain_image_format != self.render_pass_format:
+            with span("create render pass and pipeline for surface format"):
+                self._use_pipeline(self.swapchain_image_format)
+        # 3. Create image views and framebuffers
+        with span("create image views and framebuffers"):
+            self._create_image_views_and_framebuffers()
+        self.images_in_flight = [None] * len(self.swapchain_images)
+        # The shared command pool is only used on the GUI thread
+        with span("create sync objects"):
+            self._create_sync_objects()
+
+    def _ext_fn(self, name):
+        return self.context.proc(name)
+
     def _create_xlib_surface(self):
-        # Extract X11 display and window from QWidget
-        # This is Linux/X11-specific and may require python-xlib or ctypes
-        # Use QWidget.winId() for window handle
-        win_id = int(self.winId())
-        # Get display pointer using ctypes
-        libX11 = ctypes.cdll.LoadLibrary(find_library('X11'))
-        libX11.XOpenDisplay.restype = ctypes.c_void_p
-        display = libX11.XOpenDisplay(None)
-        xlib_surface_info = vk.VkXlibSurfaceCreateInfoKHR(
-            sType=vk.VK_STRUCTURE_TYPE_XLIB_SURFACE_CREATE_INFO_KHR,
-            dpy=ctypes.c_void_p(display),
-            window=win_id
-        )
-        self.vk_surface = vk.vkCreateXlibSurfaceKHR(self.vk_instance, xlib_surface_info, None)
-
-    def _find_graphics_queue_family(self):
-        # Find a queue family that supports graphics and present
-        queue_families = vk.vkGetPhysicalDeviceQueueFamilyProperties(self.vk_physical_device)
-        for i, qf in enumerate(queue_families):
-            supports_present = vk.vkGetPhysicalDeviceSurfaceSupportKHR(self.vk_physical_device, i, self.vk_surface)
-            if qf.queueFlags & vk.VK_QUEUE_GRAPHICS_BIT and supports_present:
-                return i
-        return 0
+        # The context opens one X display connection for all widgets
+        self.vk_surface = self.context.create_xlib_surface(int(self.winId()))
 
-    def _create_swapchain(self, queue_family_index):
+    def _swapchain_extent(self, caps):
+        """The surface's extent, or the widget's size in pixels when the surface leaves it to us."""
+        if caps.currentExtent.width != 0xFFFFFFFF:
+            return caps.currentExtent
+        ratio = self.devicePixelRatioF()
+        width = min(max(int(self.width() * ratio), caps.minImageExtent.width), caps.maxImageExtent.width)
+        height = min(max(int(self.height() * ratio), caps.minImageExtent.height), caps.maxImageExtent.height)
+        return vk.VkExtent2D(width=width, height=height)
+
+    def _create_swapchain(self):
         # Query surface capabilities
-        caps = vk.vkGetPhysicalDeviceSurfaceCapabilitiesKHR(self.vk_physical_device, self.vk_surface)
-        formats = vk.vkGetPhysicalDeviceSurfaceFormatsKHR(self.vk_physical_device, self.vk_surface)
-        present_modes = vk.vkGetPhysicalDeviceSurfacePresentModesKHR(self.vk_physical_device, self.vk_surface)
-        surface_format = formats[0]
-        present_mode = vk.VK_PRESENT_MODE_FIFO_KHR if vk.VK_PRESENT_MODE_FIFO_KHR in present_modes else present_modes[0]
-        extent = caps.currentExtent
+        caps = self._ext_fn('vkGetPhysicalDeviceSurfaceCapabilitiesKHR')(self.vk_physical_device, self.vk_surface)
+        formats = self._ext_fn('vkGetPhysicalDeviceSurfaceFormatsKHR')(self.vk_physical_device, self.vk_surface)
+        present_modes = self._ext_fn('vkGetPhysicalDeviceSurfacePresentModesKHR')(self.vk_physical_device, self.vk_surface)
+        # Prefer the format the pipeline was built for
+        surface_format = next((f for f in formats if f.format == self.render_pass_format), formats[0])
+        present_mode = choose_present_mode(vk, present_modes, self.vsync, self.pacer.uncapped)
+        extent = self._swapchain_extent(caps)
         swapchain_info = vk.VkSwapchainCreateInfoKHR(
             sType=vk.VK_STRUCTURE_TYPE_SWAPCHAIN_CREATE_INFO_KHR,
             surface=self.vk_surface,
@@ -146,12 +323,13 @@ class VulkanWidget(QWidget):
             compositeAlpha=vk.VK_COMPOSITE_ALPHA_OPAQUE_BIT_KHR,
             presentMode=present_mode,
             clipped=vk.VK_TRUE,
-            oldSwapchain=vk.VK_NULL_HANDLE
+            oldSwapchain=self.vk_swapchain or vk.VK_NULL_HANDLE
         )
-        self.vk_swapchain = vk.vkCreateSwapchainKHR(self.vk_device, swapchain_info, None)
-        self.swapchain_images = vk.vkGetSwapchainImagesKHR(self.vk_device, self.vk_swapchain)
+        self.vk_swapchain = self._ext_fn('vkCreateSwapchainKHR')(self.vk_device, swapchain_info, None)
+        self.swapchain_images = self._ext_fn('vkGetSwapchainImagesKHR')(self.vk_device, self.vk_swapchain)
         self.swapchain_image_format = surface_format.format
         self.swapchain_extent = extent
+        self.present_mode = present_mode
 
     def _create_image_views_and_framebuffers(self):
         self.image_views = []
@@ -171,243 +349,449 @@ class VulkanWidget(QWidget):
                 )
             )
             self.image_views.append(vk.vkCreateImageView(self.vk_device, view_info, None))
-        # Framebuffers will be created after render pass
-
-    def _create_render_pass_and_pipeline(self):
-        # Render pass
-        color_attachment = vk.VkAttachmentDescription(
-            format=self.swapchain_image_format,
-            samples=vk.VK_SAMPLE_COUNT_1_BIT,
-            loadOp=vk.VK_ATTACHMENT_LOAD_OP_CLEAR,
-            storeOp=vk.VK_ATTACHMENT_STORE_OP_STORE,
-            stencilLoadOp=vk.VK_ATTACHMENT_LOAD_OP_DONT_CARE,
-            stencilStoreOp=vk.VK_ATTACHMENT_STORE_OP_DONT_CARE,
-            initialLayout=vk.VK_IMAGE_LAYOUT_UNDEFINED,
-            finalLayout=vk.VK_IMAGE_LAYOUT_PRESENT_SRC_KHR
-        )
-        color_attachment_ref = vk.VkAttachmentReference(
-            attachment=0,
-            layout=vk.VK_IMAGE_LAYOUT_COLOR_ATTACHMENT_OPTIMAL
-        )
-        subpass = vk.VkSubpassDescription(
-            pipelineBindPoint=vk.VK_PIPELINE_BIND_POINT_GRAPHICS,
-            colorAttachmentCount=1,
-            pColorAttachments=[color_attachment_ref]
-        )
-        render_pass_info = vk.VkRenderPassCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_RENDER_PASS_CREATE_INFO,
-            attachmentCount=1,
-            pAttachments=[color_attachment],
-            subpassCount=1,
-            pSubpasses=[subpass]
-        )
-        self.render_pass = vk.vkCreateRenderPass(self.vk_device, render_pass_info, None)
-        # Framebuffers
+        self._create_depth_buffer()
         self.framebuffers = []
         for view in self.image_views:
             fb_info = vk.VkFramebufferCreateInfo(
                 sType=vk.VK_STRUCTURE_TYPE_FRAMEBUFFER_CREATE_INFO,
                 renderPass=self.render_pass,
-                attachmentCount=1,
-                pAttachments=[view],
+                attachmentCount=2,
+                pAttachments=[view, self.depth_view],
                 width=self.swapchain_extent.width,
                 height=self.swapchain_extent.height,
                 layers=1
             )
             self.framebuffers.append(vk.vkCreateFramebuffer(self.vk_device, fb_info, None))
-        # Pipeline: load SPIR-V shaders and create pipeline layout and pipeline
-        vert_shader_path = os.path.join(os.path.dirname(__file__), 'shaders/vert.spv')
-        frag_shader_path = os.path.join(os.path.dirname(__file__), 'shaders/frag.spv')
-        vert_shader_module = self.load_shader_module(vert_shader_path)
-        frag_shader_module = self.load_shader_module(frag_shader_path)
-        shader_stages = [
-            vk.VkPipelineShaderStageCreateInfo(
-                sType=vk.VK_STRUCTURE_TYPE_PIPELINE_SHADER_STAGE_CREATE_INFO,
-                stage=vk.VK_SHADER_STAGE_VERTEX_BIT,
-                module=vert_shader_module,
-                pName='main',
-            ),
-            vk.VkPipelineShaderStageCreateInfo(
-                sType=vk.VK_STRUCTURE_TYPE_PIPELINE_SHADER_STAGE_CREATE_INFO,
-                stage=vk.VK_SHADER_STAGE_FRAGMENT_BIT,
-                module=frag_shader_module,
-                pName='main',
-            )
-        ]
-        vertex_input_info = vk.VkPipelineVertexInputStateCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_VERTEX_INPUT_STATE_CREATE_INFO,
-            vertexBindingDescriptionCount=0,
-            vertexAttributeDescriptionCount=0
-        )
-        input_assembly = vk.VkPipelineInputAssemblyStateCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_INPUT_ASSEMBLY_STATE_CREATE_INFO,
-            topology=vk.VK_PRIMITIVE_TOPOLOGY_TRIANGLE_LIST,
-            primitiveRestartEnable=vk.VK_FALSE
-        )
-        viewport = vk.VkViewport(
-            x=0.0, y=0.0,
-            width=float(self.swapchain_extent.width),
-            height=float(self.swapchain_extent.height),
-            minDepth=0.0, maxDepth=1.0
-        )
-        scissor = vk.VkRect2D(
-            offset=vk.VkOffset2D(x=0, y=0),
-            extent=self.swapchain_extent
-        )
-        viewport_state = vk.VkPipelineViewportStateCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_VIEWPORT_STATE_CREATE_INFO,
-            viewportCount=1,
-            pViewports=[viewport],
-            scissorCount=1,
-            pScissors=[scissor]
-        )
-        rasterizer = vk.VkPipelineRasterizationStateCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_RASTERIZATION_STATE_CREATE_INFO,
-            depthClampEnable=vk.VK_FALSE,
-            rasterizerDiscardEnable=vk.VK_FALSE,
-            polygonMode=vk.VK_POLYGON_MODE_FILL,
-            lineWidth=1.0,
-            cullMode=vk.VK_CULL_MODE_BACK_BIT,
-            frontFace=vk.VK_FRONT_FACE_CLOCKWISE,
-            depthBiasEnable=vk.VK_FALSE
-        )
-        multisampling = vk.VkPipelineMultisampleStateCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_MULTISAMPLE_STATE_CREATE_INFO,
-            sampleShadingEnable=vk.VK_FALSE,
-            rasterizationSamples=vk.VK_SAMPLE_COUNT_1_BIT
-        )
-        color_blend_attachment = vk.VkPipelineColorBlendAttachmentState(
-            colorWriteMask=vk.VK_COLOR_COMPONENT_R_BIT | vk.VK_COLOR_COMPONENT_G_BIT |
-                          vk.VK_COLOR_COMPONENT_B_BIT | vk.VK_COLOR_COMPONENT_A_BIT,
-            blendEnable=vk.VK_FALSE
+
+    def _create_depth_buffer(self):
+        """One depth image at the swapchain extent, shared by all swapchain images and panes."""
+        image_info = vk.VkImageCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_IMAGE_CREATE_INFO,
+            imageType=vk.VK_IMAGE_TYPE_2D,
+            format=self.context.depth_format,
+            extent=vk.VkExtent3D(width=self.swapchain_extent.width, height=self.swapchain_extent.height, depth=1),
+            mipLevels=1,
+            arrayLayers=1,
+            samples=vk.VK_SAMPLE_COUNT_1_BIT,
+            tiling=vk.VK_IMAGE_TILING_OPTIMAL,
+            usage=vk.VK_IMAGE_USAGE_DEPTH_STENCIL_ATTACHMENT_BIT,
+            sharingMode=vk.VK_SHARING_MODE_EXCLUSIVE,
+            initialLayout=vk.VK_IMAGE_LAYOUT_UNDEFINED
         )
-        color_blending = vk.VkPipelineColorBlendStateCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_COLOR_BLEND_STATE_CREATE_INFO,
-            logicOpEnable=vk.VK_FALSE,
-            logicOp=vk.VK_LOGIC_OP_COPY,
-            attachmentCount=1,
-            pAttachments=[color_blend_attachment],
-            blendConstants=[0.0, 0.0, 0.0, 0.0]
+        self.depth_image = vk.vkCreateImage(self.vk_device, image_info, None)
+        self.depth_allocation = self.context.allocator.bind_image(self.depth_image, vk.VK_MEMORY_PROPERTY_DEVICE_LOCAL_BIT)
+        view_info = vk.VkImageViewCreateInfo(
+            sType=vk.VK_STRUCTURE_TYPE_IMAGE_VIEW_CREATE_INFO,
+            image=self.depth_image,
+            viewType=vk.VK_IMAGE_VIEW_TYPE_2D,
+            format=self.context.depth_format,
+            components=vk.VkComponentMapping(),
+            subresourceRange=vk.VkImageSubresourceRange(
+                aspectMask=vk.VK_IMAGE_ASPECT_DEPTH_BIT,
+                baseMipLevel=0,
+                levelCount=1,
+                baseArrayLayer=0,
+                layerCount=1
+            )
         )
-        pipeline_layout_info = vk.VkPipelineLayoutCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_PIPELINE_LAYOUT_CREATE_INFO
+        self.depth_view = vk.vkCreateImageView(self.vk_device, view_info, None)
+
+    def _use_pipeline(self, image_format):
+        """Make the render pass and pipeline for ``image_format`` current; the context creates each once."""
+        self.render_pass, self.pipeline_layout, self.pipeline = self.context.pipeline(image_format)
+        self.render_pass_format = image_format
+
+    def recreate_swapchain(self):
+        """Replace the swapchain and its size-dependent resources at the current window size."""
+        self._resize_timer.stop()
+        self._resize_pending_since = None
+        if not self.initialized:
+            return
+        caps = self._ext_fn('vkGetPhysicalDeviceSurfaceCapabilitiesKHR')(self.vk_physical_device, self.vk_surface)
+        extent = self._swapchain_extent(caps)
+        if extent.width == 0 or extent.height == 0:
+            # Minimized: nothing to present to until the window is restored
+            self.swapchain_stale = True
+            return
+        with span("recreate swapchain"):
+            # Only frames still executing can use the old images
+            fences = [frame.fence for frame in self.frames]
+            vk.vkWaitForFences(self.vk_device, len(fences), fences, vk.VK_TRUE, 0xFFFFFFFFFFFFFFFF)
+            self._destroy_framebuffers()
+            old_swapchain = self.vk_swapchain
+            self._create_swapchain()
+            self._ext_fn('vkDestroySwapchainKHR')(self.vk_device, old_swapchain, None)
+            if self.swapchain_image_format != self.render_pass_format:
+                self._use_pipeline(self.swapchain_image_format)
+            self._create_image_views_and_framebuffers()
+            self.images_in_flight = [None] * len(self.swapchain_images)
+        self.swapchain_stale = False
+        self.request_frame()
+
+    def _destroy_framebuffers(self):
+        for framebuffer in self.framebuffers:
+            vk.vkDestroyFramebuffer(self.vk_device, framebuffer, None)
+        for view in self.image_views:
+            vk.vkDestroyImageView(self.vk_device, view, None)
+        self.framebuffers = []
+        self.image_views = []
+        if self.depth_image is not None:
+            vk.vkDestroyImageView(self.vk_device, self.depth_view, None)
+            vk.vkDestroyImage(self.vk_device, self.depth_image, None)
+            self.context.allocator.free(self.depth_allocation)
+            self.depth_image = self.depth_view = self.depth_allocation = None
+
+    def _record_command_buffer(self, frame, image_index):
+        """Record drawing into the framebuffer of swapchain image ``image_index``."""
+        cmd_buf = frame.command_buffer
+        extent = self.swapchain_extent
+        rects = pane_rects(self.pane_count, extent.width, extent.height)
+        # Cull first: the indirect buffer must be big enough before any draw refers to it
+        with span("frustum culling"):
+            draws = [self._pane_draws(pane, width, height) for pane, (_, _, width, height) in enumerate(rects)]
+        self._fill_indirect_buffer(frame, [commands for pane in draws for _, commands in pane if commands is not None])
+        begin_info = vk.VkCommandBufferBeginInfo(
+            sType=vk.VK_STRUCTURE_TYPE_COMMAND_BUFFER_BEGIN_INFO,
+            flags=vk.VK_COMMAND_BUFFER_USAGE_ONE_TIME_SUBMIT_BIT
         )
-        self.pipeline_layout = vk.vkCreatePipelineLayout(self.vk_device, pipeline_layout_info, None)
-        pipeline_info = vk.VkGraphicsPipelineCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_GRAPHICS_PIPELINE_CREATE_INFO,
-            stageCount=2,
-            pStages=shader_stages,
-            pVertexInputState=vertex_input_info,
-            pInputAssemblyState=input_assembly,
-            pViewportState=viewport_state,
-            pRasterizationState=rasterizer,
-            pMultisampleState=multisampling,
-            pColorBlendState=color_blending,
-            layout=self.pipeline_layout,
+        vk.vkBeginCommandBuffer(cmd_buf, begin_info)
+        clear_color = vk.VkClearValue(color=vk.VkClearColorValue(float32=[0.1, 0.1, 0.2, 1.0]))
+        clear_depth = vk.VkClearValue(depthStencil=vk.VkClearDepthStencilValue(depth=1.0, stencil=0))
+        render_pass_info = vk.VkRenderPassBeginInfo(
+            sType=vk.VK_STRUCTURE_TYPE_RENDER_PASS_BEGIN_INFO,
             renderPass=self.render_pass,
-            subpass=0
+            framebuffer=self.framebuffers[image_index],
+            renderArea=vk.VkRect2D(offset=vk.VkOffset2D(x=0, y=0), extent=extent),
+            clearValueCount=2,
+            pClearValues=[clear_color, clear_depth]
         )
-        self.pipeline = vk.vkCreateGraphicsPipelines(self.vk_device, vk.VK_NULL_HANDLE, 1, [pipeline_info], None)[0]
+        vk.vkCmdBeginRenderPass(cmd_buf, render_pass_info, vk.VK_SUBPASS_CONTENTS_INLINE)
+        vk.vkCmdBindPipeline(cmd_buf, vk.VK_PIPELINE_BIND_POINT_GRAPHICS, self.pipeline)
+        # One render pass for all panes; each is a viewport into the same image
+        offset = 0
+        for pane, (x, y, width, height) in enumerate(rects):
+            viewport = vk.VkViewport(x=float(x), y=float(y), width=float(width), height=float(height),
+                                     minDepth=0.0, maxDepth=1.0)
+            vk.vkCmdSetViewport(cmd_buf, 0, 1, [viewport])
+            vk.vkCmdSetScissor(cmd_buf, 0, 1, [vk.VkRect2D(offset=vk.VkOffset2D(x=x, y=y),
+                                                           extent=vk.VkExtent2D(width=width, height=height))])
+            offset = self._draw_scene(frame, draws[pane], pane, width / max(1, height), offset)
+        vk.vkCmdEndRenderPass(cmd_buf)
+        vk.vkEndCommandBuffer(cmd_buf)
 
-    def _allocate_command_buffers(self):
-        # Command pool
-        pool_info = vk.VkCommandPoolCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_COMMAND_POOL_CREATE_INFO,
-            queueFamilyIndex=self._find_graphics_queue_family()
-        )
-        self.command_pool = vk.vkCreateCommandPool(self.vk_device, pool_info, None)
+    def _pane_draws(self, pane, width, height):
+        """(mesh, draw commands) for each mesh in view of ``pane``; commands are None to draw it whole."""
+        camera = self.pane_camera(pane)
+        planes = camera.frustum_planes(width / max(1, height)) if self.culling else None
+        tolerance = INTERACTIVE_PIXEL_ERROR if self._interacting else LOD_PIXEL_ERROR
+        draws = []
+        for mesh in self.meshes:
+            lod = mesh.lod if self.lod else None
+            if mesh.bvh is None or (planes is None and lod is None):
+                draws.append((mesh, None))
+                self._stats["triangles"] += mesh.triangle_count
+                continue
+            visible = mesh.bvh.cull(planes) if planes is not None else np.ones(mesh.bvh.chunk_count, dtype=bool)
+            if lod is None:
+                commands = mesh.bvh.draw_commands(visible)
+            else:
+                commands = lod.draw_commands(visible, lod.select(camera.eye(), camera.pixels_per_unit(height),
+                                                                 tolerance))
+            if len(commands):
+                draws.append((mesh, commands))
+                self._stats["triangles"] += int(commands["index_count"].sum()) // 3
+        return draws
+
+    def _fill_indirect_buffer(self, frame, commands):
+        """Write ``commands`` (arrays of VkDrawIndexedIndirectCommand) back to back into the frame's buffer."""
+        size = sum(c.nbytes for c in commands)
+        if size > frame.indirect_capacity:
+            # The frame's previous submission has finished, so its buffer is free
+            if frame.indirect_buffer is not None:
+                self.context.allocator.destroy_buffer(frame.indirect_buffer, frame.indirect_allocation)
+            frame.indirect_capacity = max(INDIRECT_MIN_BYTES, 2 * size)
+            frame.indirect_buffer, frame.indirect_allocation = self.context.allocator.create_buffer(
+                frame.indirect_capacity, vk.VK_BUFFER_USAGE_INDIRECT_BUFFER_BIT,
+                vk.VK_MEMORY_PROPERTY_HOST_VISIBLE_BIT | vk.VK_MEMORY_PROPERTY_HOST_COHERENT_BIT)
+        if size:
+            memory = np.frombuffer(frame.indirect_allocation.mapped, dtype=np.uint8)
+            memory[:size] = np.concatenate(commands).view(np.uint8)
+
+    def _draw_scene(self, frame, draws, pane, aspect, offset):
+        """Record the scene as seen by the camera of ``pane``; returns the next indirect buffer offset."""
+        matrix = self.pane_camera(pane).push_constants(aspect)
+        vk.vkCmdPushConstants(frame.command_buffer, self.pipeline_layout, vk.VK_SHADER_STAGE_VERTEX_BIT, 0,
+                              len(matrix), vk.ffi.from_buffer(matrix))
+        for mesh, commands in draws:
+            if commands is None:
+                mesh.draw(frame.command_buffer)
+            else:
+                mesh.draw_indirect(frame.command_buffer, frame.indirect_buffer, offset, len(commands))
+                offset += commands.nbytes
+        return offset
+
+    def _create_sync_objects(self):
+        """Create the semaphores, fence and command buffer of every frame in flight."""
+        semaphore_info = vk.VkSemaphoreCreateInfo(sType=vk.VK_STRUCTURE_TYPE_SEMAPHORE_CREATE_INFO)
+        # Signaled, so the first use of each frame does not wait
+        fence_info = vk.VkFenceCreateInfo(sType=vk.VK_STRUCTURE_TYPE_FENCE_CREATE_INFO, flags=vk.VK_FENCE_CREATE_SIGNALED_BIT)
         alloc_info = vk.VkCommandBufferAllocateInfo(
             sType=vk.VK_STRUCTURE_TYPE_COMMAND_BUFFER_ALLOCATE_INFO,
             commandPool=self.command_pool,
             level=vk.VK_COMMAND_BUFFER_LEVEL_PRIMARY,
-            commandBufferCount=len(self.framebuffers)
+            commandBufferCount=self.frames_in_flight
         )
-        self.command_buffers = vk.vkAllocateCommandBuffers(self.vk_device, alloc_info)
-        # Record commands for each framebuffer
-        for i, cmd_buf in enumerate(self.command_buffers):
-            begin_info = vk.VkCommandBufferBeginInfo(
-                sType=vk.VK_STRUCTURE_TYPE_COMMAND_BUFFER_BEGIN_INFO
-            )
-            vk.vkBeginCommandBuffer(cmd_buf, begin_info)
-            clear_color = vk.VkClearValue(color=vk.VkClearColorValue(float32=[0.1, 0.1, 0.2, 1.0]))
-            render_pass_info = vk.VkRenderPassBeginInfo(
-                sType=vk.VK_STRUCTURE_TYPE_RENDER_PASS_BEGIN_INFO,
-                renderPass=self.render_pass,
-                framebuffer=self.framebuffers[i],
-                renderArea=vk.VkRect2D(offset=vk.VkOffset2D(x=0, y=0), extent=self.swapchain_extent),
-                clearValueCount=1,
-                pClearValues=[clear_color]
-            )
-            vk.vkCmdBeginRenderPass(cmd_buf, render_pass_info, vk.VK_SUBPASS_CONTENTS_INLINE)
-            vk.vkCmdBindPipeline(cmd_buf, vk.VK_PIPELINE_BIND_POINT_GRAPHICS, self.pipeline)
-            vk.vkCmdDraw(cmd_buf, 3, 1, 0, 0)  # Draw a triangle
-            vk.vkCmdEndRenderPass(cmd_buf)
-            vk.vkEndCommandBuffer(cmd_buf)
+        command_buffers = vk.vkAllocateCommandBuffers(self.vk_device, alloc_info)
+        self.frames = [FrameResources(vk.vkCreateSemaphore(self.vk_device, semaphore_info, None),
+                                      vk.vkCreateSemaphore(self.vk_device, semaphore_info, None),
+                                      vk.vkCreateFence(self.vk_device, fence_info, None),
+                                      command_buffer)
+                       for command_buffer in command_buffers]
+        self.current_frame = 0
 
-    def _create_sync_objects(self):
-        # Create semaphores and fences for frame sync
-        semaphore_info = vk.VkSemaphoreCreateInfo(sType=vk.VK_STRUCTURE_TYPE_SEMAPHORE_CREATE_INFO)
-        fence_info = vk.VkFenceCreateInfo(sType=vk.VK_STRUCTURE_TYPE_FENCE_CREATE_INFO, flags=vk.VK_FENCE_CREATE_SIGNALED_BIT)
-        self.image_available_semaphore = vk.vkCreateSemaphore(self.vk_device, semaphore_info, None)
-        self.render_finished_semaphore = vk.vkCreateSemaphore(self.vk_device, semaphore_info, None)
-        self.in_flight_fence = vk.vkCreateFence(self.vk_device, fence_info, None)
+    def _destroy_sync_objects(self):
+        """Destroy the per-frame objects; the device must be idle."""
+        for frame in self.frames:
+            vk.vkDestroySemaphore(self.vk_device, frame.image_available, None)
+            vk.vkDestroySemaphore(self.vk_device, frame.render_finished, None)
+            vk.vkDestroyFence(self.vk_device, frame.fence, None)
+            if frame.indirect_buffer is not None:
+                self.context.allocator.destroy_buffer(frame.indirect_buffer, frame.indirect_allocation)
+        if self.frames:
+            vk.vkFreeCommandBuffers(self.vk_device, self.command_pool, len(self.frames),
+                                    [frame.command_buffer for frame in self.frames])
+        self.frames = []
+        self.images_in_flight = [None] * len(self.images_in_flight)
+
+    def set_frames_in_flight(self, count):
+        """Let up to ``count`` (1 to MAX_FRAMES_IN_FLIGHT) frames be recorded ahead of the GPU."""
+        count = max(1, min(MAX_FRAMES_IN_FLIGHT, int(count)))
+        if count == self.frames_in_flight:
+            return
+        self.frames_in_flight = count
+        if self.initialized:
+            self.context.wait_idle()
+            self._destroy_sync_objects()
+            self._create_sync_objects()
+
+    def reset_frame_stats(self):
+        self._stats = {"rendered": 0, "skipped": 0, "busy": 0, "frame_time": 0.0, "blocked": 0.0, "max_blocked": 0.0,
+                       "triangles": 0}
+        self._fps_window = (time.perf_counter(), 0)
+        if getattr(self, "_idle_since", None) is not None:
+            self._idle_since = time.perf_counter()
+
+    def frame_stats(self):
+        """Counters and average times (ms) of the frames rendered since the last reset.
+
+        ``skipped`` counts frame deadlines with nothing to render (including
+        while idle or hidden), ``busy`` paints dropped because the GPU was
+        behind. ``triangles`` is the average drawn per frame after culling.
+        """
+        stats = self._stats
+        rendered = max(1, stats["rendered"])
+        return {
+            "frames_in_flight": self.frames_in_flight,
+            "rendered": stats["rendered"],
+            "skipped": stats["skipped"] + self._idle_frames(),
+            "busy": stats["busy"],
+            "frame_ms": stats["frame_time"] * 1000 / rendered,
+            "blocked_ms": stats["blocked"] * 1000 / rendered,
+            "max_blocked_ms": stats["max_blocked"] * 1000,
+            "triangles": stats["triangles"] // rendered,
+        }
+
+    def request_frame(self):
+        """Render a frame at the next deadline because something visible changed."""
+        self._dirty = True
+        if not self.pacer.is_running() and self._can_render():
+            self._resume()
+
+    def begin_animation(self):
+        """Render every frame until the matching ``end_animation()``; calls nest."""
+        self._animations += 1
+        self.request_frame()
+
+    def end_animation(self):
+        self._animations = max(0, self._animations - 1)
+
+    def is_animating(self):
+        return self._animations > 0 or self.pacer.uncapped
+
+    def _can_render(self):
+        return self.isVisible() and not self.window().isMinimized()
+
+    def _on_frame_due(self):
+        if not self._can_render() or not (self._dirty or self.is_animating()):
+            self._pause()
+            return
+        self.update()
+
+    def _pause(self):
+        """Stop the pacer until the next ``request_frame()``."""
+        if self.pacer.is_running():
+            self.pacer.stop()
+            self._idle_since = time.perf_counter()
+
+    def _resume(self):
+        self._stats["skipped"] += self._idle_frames()
+        self._idle_since = None
+        self.pacer.start()
+
+    def _idle_frames(self):
+        """Frame deadlines that passed while the pacer was stopped."""
+        if self._idle_since is None or self.pacer.uncapped:
+            return 0
+        return int((time.perf_counter() - self._idle_since) / self.pacer.interval)
+
+    def _fence_signaled(self, fence):
+        try:
+            vk.vkGetFenceStatus(self.vk_device, fence)
+            return True
+        except vk.VkNotReady:
+            return False
+
+    def _wait_fence(self, fence):
+        """Block until ``fence`` signals; returns the seconds spent waiting."""
+        start = time.perf_counter()
+        vk.vkWaitForFences(self.vk_device, 1, [fence], vk.VK_TRUE, 0xFFFFFFFFFFFFFFFF)
+        return time.perf_counter() - start
 
     def load_shader_module(self, filename):
-        """Load a SPIR-V shader file and create a VkShaderModule."""
-        with open(filename, 'rb') as f:
-            code = f.read()
-        shader_module_info = vk.VkShaderModuleCreateInfo(
-            sType=vk.VK_STRUCTURE_TYPE_SHADER_MODULE_CREATE_INFO,
-            codeSize=len(code),
-            pCode=ctypes.cast(ctypes.create_string_buffer(code), ctypes.POINTER(ctypes.c_uint32))
-        )
-        return vk.vkCreateShaderModule(self.vk_device, shader_module_info, None)
+        """Load a SPIR-V shader file as a VkShaderModule, shared with identical code already loaded."""
+        return self.context.shader_cache.load(filename)
 
     def set_overlay_options(self, overlay_options):
         """Set overlay display options (dict)."""
         self.overlay_options = overlay_options
-        self.update()
+        self.request_frame()
+
+    def set_meshes(self, meshes, frame=True):
+        """Draw ``meshes`` (geometry.Mesh) and, with ``frame``, point every camera at them."""
+        self.meshes = list(meshes)
+        if frame and self.meshes:
+            lo = np.min([mesh.bounds[0] for mesh in self.meshes], axis=0)
+            hi = np.max([mesh.bounds[1] for mesh in self.meshes], axis=0)
+            for camera in self.cameras:
+                camera.frame(lo, hi)
+        self.request_frame()
+
+    def set_pane_count(self, count):
+        """Split the view into 1, 2 (side by side) or 4 (2 x 2) panes."""
+        count = int(count)
+        if count not in PANE_LAYOUTS:
+            raise ValueError(f"pane count must be one of {sorted(PANE_LAYOUTS)}, not {count}")
+        self.pane_count = count
+        self.request_frame()
+
+    def set_cameras_linked(self, linked):
+        """Make every pane follow the first pane's camera, or give each its own."""
+        linked = bool(linked)
+        if linked == self.cameras_linked:
+            return
+        if not linked:
+            # Unlinked panes start from the view they were showing
+            for camera in self.cameras[1:]:
+                camera.copy_from(self.cameras[0])
+        self.cameras_linked = linked
+        self.request_frame()
+
+    def pane_camera(self, pane):
+        return self.cameras[0 if self.cameras_linked else pane]
+
+    def set_culling(self, enabled):
+        """Draw only the chunks of meshes with a BVH that are in view, or everything."""
+        self.culling = bool(enabled)
+        self.request_frame()
+
+    def set_lod(self, enabled):
+        """Draw meshes with levels of detail at the coarsest level that looks the same, or in full detail."""
+        self.lod = bool(enabled)
+        self.request_frame()
+
+    def _camera_moved(self):
+        # Coarse levels until the camera has been still for SETTLE_MS
+        self._interacting = True
+        self._settle_timer.start()
+        self.request_frame()
+
+    def _settle(self):
+        self._interacting = False
+        self.request_frame()
+
+    def pick(self, pos):
+        """(mesh, triangle, point) of the nearest triangle under widget position ``pos``, or None.
+
+        Only meshes with a BVH can be picked.
+        """
+        pane = self.pane_at(pos)
+        x, y, width, height = pane_rects(self.pane_count, self.width(), self.height())[pane]
+        origin, direction = self.pane_camera(pane).ray(width / max(1, height), (pos.x() - x) / max(1, width),
+                                                       (pos.y() - y) / max(1, height))
+        best = None
+        for mesh in self.meshes:
+            hit = mesh.bvh.pick(origin, direction) if mesh.bvh is not None else None
+            if hit is not None and (best is None or hit[1] < best[2]):
+                best = (mesh, hit[0], hit[1])
+        return None if best is None else (best[0], best[1], origin + best[2] * direction)
+
+    def pane_at(self, pos):
+        """Index of the pane under widget position ``pos``."""
+        for pane, (x, y, width, height) in enumerate(pane_rects(self.pane_count, self.width(), self.height())):
+            if x <= pos.x() < x + width and y <= pos.y() < y + height:
+                return pane
+        return 0
 
     def set_max_fps(self, max_fps):
         """Set the maximum frames per second for rendering."""
-        self.timer.setInterval(int(1000 / max_fps))
+        self.pacer.set_max_fps(max_fps)
+
+    def set_vsync(self, enabled):
+        """Wait for vertical blank (FIFO) or not (MAILBOX, else IMMEDIATE); takes a new swapchain."""
+        enabled = bool(enabled)
+        if enabled == self.vsync:
+            return
+        self.vsync = enabled
+        if self.initialized:
+            self.recreate_swapchain()
+
+    def set_uncapped(self, enabled):
+        """Benchmark mode: render as fast as possible, ignoring vsync and max_fps."""
+        enabled = bool(enabled)
+        if enabled == self.pacer.uncapped:
+            return
+        self.pacer.set_uncapped(enabled)
+        if self.initialized:
+            self.recreate_swapchain()
+        self.request_frame()
 
     def show_debug_overlay(self, enabled):
         """Enable or disable the debug overlay."""
         self.debug_overlay_enabled = enabled
-        self.update()
+        self.request_frame()
 
     def paintEvent(self, event):
         if not self.initialized:
-            self.initialize_vulkan()
-        # Rendering loop: acquire, submit, present
-        vk.vkWaitForFences(self.vk_device, 1, [self.in_flight_fence], vk.VK_TRUE, 1000000000)
-        vk.vkResetFences(self.vk_device, 1, [self.in_flight_fence])
-        img_idx = vk.vkAcquireNextImageKHR(self.vk_device, self.vk_swapchain, 1000000000, self.image_available_semaphore, vk.VK_NULL_HANDLE)
-        submit_info = vk.VkSubmitInfo(
-            sType=vk.VK_STRUCTURE_TYPE_SUBMIT_INFO,
-            waitSemaphoreCount=1,
-            pWaitSemaphores=[self.image_available_semaphore],
-            pWaitDstStageMask=[vk.VK_PIPELINE_STAGE_COLOR_ATTACHMENT_OUTPUT_BIT],
-            commandBufferCount=1,
-            pCommandBuffers=[self.command_buffers[img_idx]],
-            signalSemaphoreCount=1,
-            pSignalSemaphores=[self.render_finished_semaphore]
-        )
-        vk.vkQueueSubmit(self.vk_queue, 1, [submit_info], self.in_flight_fence)
-        present_info = vk.VkPresentInfoKHR(
-            sType=vk.VK_STRUCTURE_TYPE_PRESENT_INFO_KHR,
-            waitSemaphoreCount=1,
-            pWaitSemaphores=[self.render_finished_semaphore],
-            swapchainCount=1,
-            pSwapchains=[self.vk_swapchain],
-            pImageIndices=[img_idx]
-        )
-        vk.vkQueuePresentKHR(self.vk_queue, present_info)
+            # Device objects are created in the background; show a placeholder meanwhile
+            self.start_initialization()
+            self._paint_placeholder()
+            # The placeholder is static; device_ready requests the next frame
+            self._dirty = False
+            return
+        # Rendering loop: acquire, record, submit, present
+        if not self._render_frame():
+            # Still dirty, so the next deadline retries
+            return
+        self._dirty = False
         # Optionally, draw overlays with QPainter as before
         from PySide6.QtGui import QPainter, QColor, QFont
         painter = QPainter(self)
         painter.fillRect(self.rect(), QColor(30, 30, 40))
+        if self.pane_count > 1:
+            painter.setPen(QColor(90, 90, 110))
+            for pane, (x, y, width, height) in enumerate(pane_rects(self.pane_count, self.width(), self.height())):
+                painter.drawRect(x, y, width - 1, height - 1)
+                painter.drawText(x + width - 60, y + 20, f"View {pane + 1}")
         opts = getattr(self, 'overlay_options', {})
         if getattr(self, 'debug_overlay_enabled', True):
             painter.setPen(QColor(200, 200, 200))
@@ -427,6 +811,112 @@ class VulkanWidget(QWidget):
             painter.drawText(10, y, f"Debug: {self.debug_message}")
         painter.end()
 
+    def _render_frame(self):
+        """Render one frame; returns False if it was skipped because the GPU is behind."""
+        start = time.perf_counter()
+        frame = self.frames[self.current_frame]
+        if self.frames_in_flight == 1:
+            # CPU and GPU fully serialized, as before frames in flight existed
+            blocked = self._wait_fence(frame.fence)
+        elif self._fence_signaled(frame.fence):
+            blocked = 0.0
+        else:
+            # This frame's previous submission is still executing; a later paint retries
+            self._stats["busy"] += 1
+            return False
+        image_index = vk.ffi.new('uint32_t*')
+        try:
+            self._ext_fn('vkAcquireNextImageKHR')(self.vk_device, self.vk_swapchain, 0,
+                                                  frame.image_available, vk.VK_NULL_HANDLE, image_index)
+        except vk.VkSuboptimalKhr:
+            # An image was acquired; render it and recreate afterwards
+            self.swapchain_stale = True
+        except vk.VkErrorOutOfDateKhr:
+            self.recreate_swapchain()
+            self._stats["busy"] += 1
+            return False
+        except (vk.VkNotReady, vk.VkTimeout):
+            self._stats["busy"] += 1
+            return False
+        img_idx = image_index[0]
+        # The image may still be rendered to by an older frame
+        image_fence = self.images_in_flight[img_idx]
+        if image_fence is not None and image_fence != frame.fence:
+            blocked += self._wait_fence(image_fence)
+        vk.vkResetCommandBuffer(frame.command_buffer, 0)
+        try:
+            self._record_command_buffer(frame, img_idx)
+        except BaseException:
+            self._abandon_image(frame, img_idx)
+            raise
+        self.images_in_flight[img_idx] = frame.fence
+        # Reset only once a submit will signal it again: an unsignaled fence
+        # with nothing submitted would block every later wait on it
+        vk.vkResetFences(self.vk_device, 1, [frame.fence])
+        self.context.submit(frame.command_buffer, frame.fence,
+                            wait_semaphores=[frame.image_available],
+                            wait_stages=[vk.VK_PIPELINE_STAGE_COLOR_ATTACHMENT_OUTPUT_BIT],
+                            signal_semaphores=[frame.render_finished])
+        present_info = vk.VkPresentInfoKHR(
+            sType=vk.VK_STRUCTURE_TYPE_PRESENT_INFO_KHR,
+            waitSemaphoreCount=1,
+            pWaitSemaphores=[frame.render_finished],
+            swapchainCount=1,
+            pSwapchains=[self.vk_swapchain],
+            pImageIndices=[img_idx]
+        )
+        try:
+            # Meshes may be uploading on another thread
+            with self.context.queue_lock:
+                self._ext_fn('vkQueuePresentKHR')(self.vk_queue, present_info)
+        except (vk.VkSuboptimalKhr, vk.VkErrorOutOfDateKhr):
+            self.swapchain_stale = True
+        self.current_frame = (self.current_frame + 1) % len(self.frames)
+        self._count_frame(start, blocked)
+        if self.swapchain_stale and self._resize_pending_since is None:
+            # Not caused by a resize still in progress: recreate right away
+            self.recreate_swapchain()
+        return True
+
+    def _abandon_image(self, frame, img_idx):
+        """Give back image ``img_idx``, acquired for ``frame`` but never recorded."""
+        # The older frame was waited for; nothing of this one will use the image
+        self.images_in_flight[img_idx] = None
+        # An empty batch waits on the acquire, so the semaphore is unsignaled for
+        # the next one, and signals the fence, so later waits on it return
+        vk.vkResetFences(self.vk_device, 1, [frame.fence])
+        self.context.submit(None, frame.fence,
+                            wait_semaphores=[frame.image_available],
+                            wait_stages=[vk.VK_PIPELINE_STAGE_COLOR_ATTACHMENT_OUTPUT_BIT])
+        # The image was never rendered, so it cannot be presented; only a new swapchain returns it
+        self.recreate_swapchain()
+
+    def _count_frame(self, start, blocked):
+        now = time.perf_counter()
+        stats = self._stats
+        stats["rendered"] += 1
+        stats["frame_time"] += now - start
+        stats["blocked"] += blocked
+        stats["max_blocked"] = max(stats["max_blocked"], blocked)
+        window_start, frames = self._fps_window
+        frames += 1
+        if now - window_start >= 1.0:
+            self._fps = round(frames / (now - window_start))
+            window_start, frames = now, 0
+        self._fps_window = (window_start, frames)
+
+    def _paint_placeholder(self):
+        from PySide6.QtGui import QPainter, QColor
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(30, 30, 40))
+        painter.setPen(QColor(200, 200, 200))
+        if self.init_error:
+            text = f"Vulkan unavailable\n{self.init_error}"
+        else:
+            text = "Initializing Vulkan..."
+        painter.drawText(self.rect(), Qt.AlignCenter | Qt.TextWordWrap, text)
+        painter.end()
+
     def keyPressEvent(self, event):
         # Example: Print key pressed (extend for real input handling)
         print(f"Key pressed: {event.key()}")
@@ -436,6 +926,8 @@ class VulkanWidget(QWidget):
     def mousePressEvent(self, event):
         self._drag_active = True
         self._last_mouse_pos = event.position() if hasattr(event, 'position') else event.pos()
+        self._press_pos = self._last_mouse_pos
+        self._drag_pane = self.pane_at(self._last_mouse_pos)
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
@@ -443,31 +935,97 @@ class VulkanWidget(QWidget):
             pos = event.position() if hasattr(event, 'position') else event.pos()
             dx = pos.x() - self._last_mouse_pos.x()
             dy = pos.y() - self._last_mouse_pos.y()
-            # Stub: Print rotation deltas (replace with 3D scene rotation logic)
-            print(f"Rotate scene: dx={dx}, dy={dy}")
+            # Orbit the camera of the pane the drag started in
+            self.pane_camera(self._drag_pane).orbit(dx, dy)
             self._last_mouse_pos = pos
+            self._camera_moved()
         super().mouseMoveEvent(event)
 
+    def wheelEvent(self, event):
+        self.pane_camera(self.pane_at(event.position())).zoom(event.angleDelta().y() / 120)
+        self._camera_moved()
+        event.accept()
+
     def mouseReleaseEvent(self, event):
         self._drag_active = False
+        pos = event.position() if hasattr(event, 'position') else event.pos()
+        if self._press_pos is not None and (pos - self._press_pos).manhattanLength() < CLICK_DISTANCE:
+            with span("pick"):
+                hit = self.pick(pos)
+            if hit is not None:
+                self.debug_message = f"Picked triangle {hit[1]} at ({hit[2][0]:.4g}, {hit[2][1]:.4g}, {hit[2][2]:.4g})"
+                self.request_frame()
+            self.picked.emit(hit)
+        self._press_pos = None
         super().mouseReleaseEvent(event)
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.request_frame()
+
+    def hideEvent(self, event):
+        # Also sent to the widgets of a window being minimized
+        super().hideEvent(event)
+        self._pause()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange and self.isWindow():
+            if self.isMinimized():
+                self._pause()
+            else:
+                self.request_frame()
+
     def resizeEvent(self, event):
-        # Pseudo-code for swapchain recreation
-        # 1. Wait for device idle
-        # 2. Destroy old swapchain
-        # 3. Create new swapchain with new size
-        # 4. Recreate framebuffers and command buffers
-        pass
+        """Schedule swapchain recreation; resize storms are coalesced into few recreations."""
+        super().resizeEvent(event)
+        self.request_frame()
+        if not self.initialized:
+            return
+        self.swapchain_stale = True
+        now = time.monotonic()
+        if self._resize_pending_since is None:
+            self._resize_pending_since = now
+        elapsed_ms = (now - self._resize_pending_since) * 1000
+        self._resize_timer.start(int(max(0, min(RESIZE_DEBOUNCE_MS, RESIZE_MAX_DELAY_MS - elapsed_ms))))
 
     def cleanup(self):
-        # Pseudo-code for Vulkan cleanup
-        # 1. Destroy command buffers
-        # 2. Destroy swapchain
-        # 3. Destroy device
-        # 4. Destroy surface
-        # 5. Destroy instance
+        """Destroy this widget's Vulkan objects and release the shared context.
+
+        The widget initializes again when it is next painted.
+        """
+        self._resize_timer.stop()
+        self._pause()
+        if self._init_thread is not None and not self.initialized and self.init_error is None:
+            # Still creating device objects: _on_device_ready releases them
+            self._init_cancelled = True
+            return
         self.initialized = False
+        if self.context is not None:
+            if self.frames:
+                fences = [frame.fence for frame in self.frames]
+                vk.vkWaitForFences(self.vk_device, len(fences), fences, vk.VK_TRUE, 0xFFFFFFFFFFFFFFFF)
+                self._destroy_sync_objects()
+            self._destroy_framebuffers()
+            if self.vk_swapchain is not None:
+                self._ext_fn('vkDestroySwapchainKHR')(self.vk_device, self.vk_swapchain, None)
+            if self.vk_surface is not None:
+                self.context.destroy_surface(self.vk_surface)
+            self._release_context()
+        self._init_thread = None
+        self.init_error = None
+
+    def _release_context(self):
+        if self.context is None:
+            return
+        self.context = None
+        self.vk_instance = self.vk_physical_device = self.vk_device = self.vk_queue = None
+        self.command_pool = self.pipeline_cache = None
+        self.vk_swapchain = self.vk_surface = None
+        self.swapchain_images = None
+        self.images_in_flight = []
+        self.render_pass = self.pipeline_layout = self.pipeline = self.render_pass_format = None
+        context.release()
 
     def closeEvent(self, event):
         self.cleanup()